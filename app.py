@@ -2,6 +2,7 @@
 # import
 from fastapi import Request, FastAPI, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 import openai
 from openai import OpenAI
 from google import genai
@@ -18,9 +19,11 @@ import tempfile
 import shutil
 from dotenv import load_dotenv
 from pinecone_helper import query_pinecone, format_pinecone_results_for_gpt
-from rag_chatbot import rag_answer
+from rag_chatbot import rag_answer, rag_answer_batch, low_relevance_reply, warm_local_index, BATCH_MAX_QUERIES
+from intent_gate import check_intent
 from commission_detector import detect_commission_query
-from commission_service import query_commission, format_commission_for_gpt
+from hanwha_policy_tables import is_policy_table_query
+from commission_service import query_commission, format_commission_for_gpt, start_dataset_watcher
 
 # Load environment variables
 load_dotenv()
@@ -29,6 +32,13 @@ load_dotenv()
 API_KEY = os.getenv("OPENAI_API_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# 로컬 벡터 인덱스 스냅샷 준비 (요청 경로에서는 동기화하지 않음)
+warm_local_index()
+
+# 수수료 데이터셋 inbox 감시 (새 엑셀 → 재생성 + 활성화 + 무중단 리로드)
+if os.getenv("COMMISSION_DATASET_WATCH", "false").lower() not in ("0", "false", "no"):
+    start_dataset_watcher()
+
 ##### 기능함수 구현 단계 #####
 
 # 메시지 전송
@@ -68,6 +78,12 @@ def getTextFromGPT(prompt):
     - If commission query detected: routes to commission system
     - Otherwise: uses RAG chatbot with Gemini Flash + Pinecone + Gemini 2.5 Pro
     """
+    # === STEP 0: Intent Gate (greetings / abuse / junk, no upstream calls) ===
+    gate = check_intent(prompt)
+    if not gate.allowed:
+        print(f"🚧 Intent gate: {gate.category} (p={gate.probability}{', cached' if gate.cached else ''})")
+        return low_relevance_reply()
+
     # === STEP 1: Commission Detection ===
     print("=" * 80)
     print("🔍 Step 1: Commission Detection")
@@ -79,7 +95,10 @@ def getTextFromGPT(prompt):
     print("=" * 80)
 
     # === STEP 2: Route Based on Detection ===
-    if detection_result['is_commission_query'] and detection_result['confidence'] >= 0.5:
+    # Hanwha policy-table questions (종합/시책 x 익월/13차월) are looked up by rag_answer
+    if is_policy_table_query(prompt):
+        print("💰 한화생명 시책 테이블 질문 - RAG 시스템의 구조화 조회 사용")
+    elif detection_result['is_commission_query'] and detection_result['confidence'] >= 0.5:
         print("🎯 Routing to COMMISSION SYSTEM")
         print("=" * 80)
         try:
@@ -769,6 +788,37 @@ async def callback(request: Request):
 
     return processCallback(callback_data)
 
+@app.post("/batch-answer")
+async def batch_answer(request: Request):
+    """
+    일괄 질의응답 (평가 / 관리자 점검용)
+
+    Body: {"queries": [...], "top_k": 10, "concurrency": 8}
+          질문은 최대 RAG_BATCH_MAX_QUERIES개 (초과 시 400), concurrency는 RAG_MAX_WORKERS 이하로 제한
+    Response: NDJSON 스트림, 완료되는 순서대로 한 줄에 하나씩
+              {"index", "query", "answer" | "error", "elapsed_ms"}
+    """
+    body = await request.json()
+    queries = body.get("queries")
+    if not isinstance(queries, list) or not queries or not all(isinstance(query, str) for query in queries):
+        raise HTTPException(status_code=400, detail="queries must be a non-empty list of strings")
+    if len(queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"at most {BATCH_MAX_QUERIES} queries per batch")
+
+    try:
+        top_k = int(body.get("top_k", 10))
+        concurrency = body.get("concurrency")
+        # rag_answer_batch clamps concurrency to RAG_MAX_WORKERS
+        concurrency = int(concurrency) if concurrency else None
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="top_k and concurrency must be integers")
+
+    def stream():
+        for item in rag_answer_batch(queries, top_k=top_k, concurrency=concurrency):
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 @app.post("/upload-pdf")
 async def upload_pdf(file: UploadFile = File(...)):
     """PDF 파일 업로드 및 처리 엔드포인트 (즉시 응답)"""
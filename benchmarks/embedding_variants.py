@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Recall / latency benchmark for reduced-dimension and quantized embeddings.
+
+Baseline: exact float32 top-k over the full 3072-dimension vectors of the
+namespace (local snapshot, synced from Pinecone if missing). Each variant
+truncates the stored vectors to D dimensions and re-normalizes them - which is
+what text-embedding-3-large returns for `dimensions=D` - optionally with an
+int8 or binary resident representation plus float rescoring, and is scored by
+recall@k against the baseline on our own query set.
+
+Usage:
+    python benchmarks/embedding_variants.py
+    python benchmarks/embedding_variants.py --dimensions 3072 1024 512 --k 10 --output report.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from local_vector_index import LocalVectorIndex, get_local_index  # noqa: E402
+
+BENCHMARK_DIR = Path(__file__).parent
+DEFAULT_QUERIES = BENCHMARK_DIR / "embedding_queries.json"
+NAMESPACE = "hof-knowledge-base-max"
+BASE_INDEX_NAME = "hof-branch-chatbot"
+BASE_DIMENSIONS = 3072
+
+
+def load_queries(path: Path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data["queries"] if isinstance(data, dict) else data
+
+
+def embed_queries(queries):
+    """Full-dimension query embeddings (served from the embedding cache when possible)."""
+    from openai import OpenAI
+    from embedding_cache import embed_texts
+
+    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return np.asarray(embed_texts(client, queries, "text-embedding-3-large", BASE_DIMENSIONS), dtype=np.float32)
+
+
+def load_baseline() -> LocalVectorIndex:
+    from pinecone import Pinecone
+
+    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+    baseline = get_local_index(NAMESPACE, index_factory=lambda: pc.Index(BASE_INDEX_NAME))
+    if baseline is None or baseline.size == 0:
+        raise SystemExit("❌ 로컬 인덱스 스냅샷이 없습니다 (LOCAL_INDEX_AUTO_SYNC 확인)")
+    if baseline.dimensions != BASE_DIMENSIONS:
+        raise SystemExit(f"❌ 기준 스냅샷 차원이 {baseline.dimensions}입니다 ({BASE_DIMENSIONS} 필요)")
+    return baseline
+
+
+def build_variant(baseline: LocalVectorIndex, dimensions: int, quantization: str) -> LocalVectorIndex:
+    variant = LocalVectorIndex(NAMESPACE, dimensions, quantization)
+    variant.upsert(
+        (vector_id, np.asarray(baseline.vectors[row]), {})
+        for row, vector_id in enumerate(baseline.ids)
+    )
+    return variant
+
+
+def resident_bytes(variant: LocalVectorIndex) -> int:
+    if variant.quantization == "none":
+        return variant.vectors.nbytes
+    return variant._quantized_codes().nbytes
+
+
+def run_variant(variant: LocalVectorIndex, query_vectors, truth, k: int) -> dict:
+    latencies, recalls = [], []
+    variant.query(query_vectors[0], top_k=k, include_metadata=False)  # warm-up (builds codes)
+
+    for query_vector, expected in zip(query_vectors, truth):
+        start = time.perf_counter()
+        results = variant.query(query_vector, top_k=k, include_metadata=False)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found = {m.id for m in results.matches}
+        recalls.append(len(found & expected) / len(expected) if expected else 1.0)
+
+    return {
+        "dimensions": variant.dimensions,
+        "quantization": variant.quantization,
+        f"recall@{k}": round(float(np.mean(recalls)), 4),
+        "min_recall": round(float(np.min(recalls)), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "resident_mb": round(resident_bytes(variant) / 1e6, 3),
+        "pinecone_bytes_per_vector": variant.dimensions * 4,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding dimension / quantization benchmark")
+    parser.add_argument("--queries", type=Path, default=DEFAULT_QUERIES)
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[3072, 1536, 1024, 512, 256])
+    parser.add_argument("--quantization", nargs="+", default=["none", "int8", "binary"])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--output", type=Path, help="Write the JSON report here")
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries)
+    baseline = load_baseline()
+    query_vectors = embed_queries(queries)
+    print(f"📊 기준: {baseline.size}개 벡터 x {BASE_DIMENSIONS}차원, 쿼리 {len(queries)}개, k={args.k}")
+
+    truth = [
+        {m.id for m in baseline.query(q, top_k=args.k, include_metadata=False).matches}
+        for q in query_vectors
+    ]
+
+    report = []
+    for dimensions in args.dimensions:
+        for quantization in args.quantization:
+            variant = build_variant(baseline, dimensions, quantization)
+            row = run_variant(variant, query_vectors, truth, args.k)
+            report.append(row)
+            print(f"  {dimensions:>5}d {quantization:<6} recall@{args.k}={row[f'recall@{args.k}']:.3f} "
+                  f"(min {row['min_recall']:.2f})  p50={row['p50_ms']:.2f}ms p95={row['p95_ms']:.2f}ms  "
+                  f"resident={row['resident_mb']:.2f}MB")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "namespace": NAMESPACE,
+                "vectors": baseline.size,
+                "queries": len(queries),
+                "k": args.k,
+                "variants": report
+            }, f, ensure_ascii=False, indent=2)
+        print(f"✅ 리포트 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
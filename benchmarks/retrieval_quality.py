@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Retrieval-quality and latency benchmark over the golden question set.
+
+Each golden question (benchmarks/golden_set.json, versioned) lists the chunks
+that should be retrieved - by vector id or by a metadata selector, since
+upload ids are not stable across re-uploads - and answer facts. Every question
+runs through the rag_chatbot stages, timed individually:
+
+    lookup   - Step 0 structured schedule / policy-table lookup
+    rewrite  - Gemini Flash rewrite + filter lint           (live only)
+    embed    - query embedding (embedding cache first)
+    retrieve - vector (+ hybrid lexical) retrieval with filter fallback
+    context  - dedup + token-budget packing
+    generate - Gemini Pro answer                            (live only)
+
+Modes:
+    live   - the configured services (Gemini, OpenAI, Pinecone or the local mirror)
+    local  - local stand-ins: no Gemini calls (the raw question is the search
+             query and facts are checked against the packed context), vectors
+             from the local mirror snapshot (RAG_VECTOR_BACKEND=local; the run
+             exits when no snapshot exists, and queries that still fall back
+             to Pinecone are counted in the report);
+             --lexical-only also skips the query embedding (BM25 only)
+
+The report holds recall@k, MRR, answer-fact hit rate, per-stage p50/p95
+latency, per-tag metrics and per-question details; metrics are checked
+against the golden set's thresholds (or --thresholds) and the exit code is 1
+on a regression.
+
+Usage:
+    python benchmarks/retrieval_quality.py --mode local --output report.json
+    python benchmarks/retrieval_quality.py --mode live --tags hanwha
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+BENCHMARK_DIR = Path(__file__).parent
+DEFAULT_GOLDEN_SET = BENCHMARK_DIR / "golden_set.json"
+STAGES = ["lookup", "rewrite", "embed", "retrieve", "context", "generate", "total"]
+
+
+def load_golden_set(path: Path) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        golden = json.load(f)
+    if "version" not in golden or "questions" not in golden:
+        raise SystemExit(f"❌ 골든셋 형식 오류: {path} (version / questions 필요)")
+    return golden
+
+
+def _normalize(text: str) -> str:
+    return "".join(str(text).split()).lower()
+
+
+def selector_matches(selector: dict, match_id: str, metadata: dict) -> bool:
+    """Whether a retrieved chunk satisfies one expected-chunk selector."""
+    for field, expected in selector.items():
+        if field == "id":
+            if match_id != expected:
+                return False
+        elif field == "text_contains":
+            text = metadata.get("searchable_text") or metadata.get("text") or metadata.get("full_text") or ""
+            if _normalize(expected) not in _normalize(text):
+                return False
+        else:
+            value = metadata.get(field)
+            allowed = expected if isinstance(expected, list) else [expected]
+            if value not in allowed:
+                return False
+    return True
+
+
+def score_retrieval(question: dict, matches, k: int) -> dict:
+    """recall@k and reciprocal rank for one question (None when it has no expectations)."""
+    expected = [{"id": i} for i in question.get("expected_ids", [])] + question.get("expected_chunks", [])
+    if not expected:
+        return {"recall": None, "reciprocal_rank": None, "first_relevant_rank": None}
+
+    top = matches[:k]
+    satisfied = set()
+    first_rank = None
+    for rank, match in enumerate(top, start=1):
+        metadata = match.metadata or {}
+        hit = [i for i, selector in enumerate(expected) if selector_matches(selector, match.id, metadata)]
+        if hit and first_rank is None:
+            first_rank = rank
+        satisfied.update(hit)
+
+    return {
+        "recall": len(satisfied) / len(expected),
+        "reciprocal_rank": 1.0 / first_rank if first_rank else 0.0,
+        "first_relevant_rank": first_rank,
+    }
+
+
+def score_facts(question: dict, text: str):
+    facts = question.get("facts", [])
+    if not facts:
+        return None, []
+    normalized = _normalize(text)
+    missing = [fact for fact in facts if _normalize(fact) not in normalized]
+    return (len(facts) - len(missing)) / len(facts), missing
+
+
+class Runner:
+    """Runs golden questions through the rag_chatbot stages."""
+
+    def __init__(self, mode: str, k: int, generate: bool, lexical_only: bool):
+        if mode == "local":
+            os.environ["RAG_VECTOR_BACKEND"] = "local"
+        import rag_chatbot
+        from hanwha_policy_tables import lookup_policy_rates
+        from local_vector_index import get_local_index, snapshot_dir
+        from schedule_service import lookup_schedule
+
+        self.rag = rag_chatbot
+        self.local_index = None
+        self.pinecone_queries = 0
+        if mode == "local":
+            # Without a snapshot retrieval would quietly fall back to live Pinecone
+            self.local_index = get_local_index(rag_chatbot.NAMESPACE, sync=False)
+            if self.local_index is None or not self.local_index.size:
+                raise SystemExit(f"❌ 로컬 인덱스 스냅샷이 없습니다: {snapshot_dir(rag_chatbot.NAMESPACE)} "
+                                 f"(python local_vector_index.py {rag_chatbot.NAMESPACE} 로 생성)")
+            self._count_pinecone_queries()
+        self.lookup_schedule = lookup_schedule
+        self.lookup_policy_rates = lookup_policy_rates
+        self.mode = mode
+        self.k = k
+        self.generate = generate and mode == "live"
+        self.lexical_only = lexical_only and mode == "local"
+        self.metadata_key = rag_chatbot.load_metadata_key()
+
+        # Warm-up: load the schedule / policy-table stores outside the timings
+        lookup_schedule("11월 일정")
+        lookup_policy_rates("")
+
+    def _count_pinecone_queries(self):
+        """Count queries that reach Pinecone (the local mirror's fallback path)."""
+        runner = self
+        open_index = self.rag.pc.Index
+
+        class CountingIndex:
+            def __init__(self, index):
+                self.index = index
+
+            def query(self, *args, **kwargs):
+                runner.pinecone_queries += 1
+                return self.index.query(*args, **kwargs)
+
+            def __getattr__(self, name):
+                return getattr(self.index, name)
+
+        self.rag.pc.Index = lambda *args, **kwargs: CountingIndex(open_index(*args, **kwargs))
+
+    @property
+    def backend(self) -> str:
+        """Which services actually served retrieval in this run."""
+        if self.mode == "live":
+            return f"live ({self.rag.VECTOR_BACKEND})"
+        vectors = f"로컬 스냅샷 {self.local_index.size}개 벡터"
+        if self.pinecone_queries:
+            vectors += f" + Pinecone 대체 {self.pinecone_queries}회"
+        embeddings = "없음 (BM25만)" if self.lexical_only else "OpenAI (임베딩 캐시 우선)"
+        return f"local ({vectors}, 쿼리 임베딩: {embeddings})"
+
+    def _lexical_search(self, query: str):
+        from lexical_index import get_lexical_index
+
+        return get_lexical_index(self.local_index).search(query, top_k=self.k)
+
+    def run(self, question: dict) -> dict:
+        rag = self.rag
+        query = question["question"]
+        timings = {}
+
+        @contextlib.contextmanager
+        def stage(name):
+            start = time.perf_counter()
+            yield
+            timings[name] = (time.perf_counter() - start) * 1000
+
+        total_start = time.perf_counter()
+        answer = None
+
+        with stage("lookup"):
+            structured = self.lookup_schedule(query) if rag.SCHEDULE_MODE != "off" else None
+            if structured is None and rag.POLICY_TABLE_MODE != "off":
+                structured = self.lookup_policy_rates(query)
+
+        if structured is not None:
+            results = structured.as_results()
+        else:
+            enhanced_query, filters = query, None
+            if self.mode == "live":
+                with stage("rewrite"):
+                    rewrite = rag.rewrite_query(query, self.metadata_key)
+                enhanced_query, filters = rewrite["enhanced_query"], rewrite["filters"]
+
+            if self.lexical_only:
+                with stage("retrieve"):
+                    results = self._lexical_search(enhanced_query)
+            else:
+                with stage("embed"):
+                    embedding = rag.get_embedding(enhanced_query)
+                with stage("retrieve"):
+                    results = rag.retrieve_with_fallback(enhanced_query, filters, top_k=self.k,
+                                                         query_embedding=embedding)
+
+        with stage("context"):
+            context = rag.format_context_for_gemini(results)
+
+        if self.generate:
+            with stage("generate"):
+                answer = rag.generate_answer_with_gemini_pro(query, context)
+
+        timings["total"] = (time.perf_counter() - total_start) * 1000
+
+        retrieval = score_retrieval(question, results.matches, self.k)
+        fact_rate, missing_facts = score_facts(question, answer if answer is not None else context)
+        return {
+            "id": question["id"],
+            "question": query,
+            "tags": question.get("tags", []),
+            "structured": structured is not None,
+            **retrieval,
+            "fact_hit_rate": fact_rate,
+            "missing_facts": missing_facts,
+            "retrieved": [m.id for m in results.matches[:self.k]],
+            "timings_ms": {name: round(ms, 2) for name, ms in timings.items()},
+        }
+
+
+def _mean(values):
+    values = [v for v in values if v is not None]
+    return round(float(np.mean(values)), 4) if values else None
+
+
+def summarize(rows: list) -> dict:
+    latency = {}
+    for name in STAGES:
+        samples = [row["timings_ms"][name] for row in rows if name in row["timings_ms"]]
+        if samples:
+            latency[name] = {
+                "p50": round(float(np.percentile(samples, 50)), 2),
+                "p95": round(float(np.percentile(samples, 95)), 2),
+                "n": len(samples),
+            }
+    return {
+        "questions": len(rows),
+        "recall@k": _mean(row["recall"] for row in rows),
+        "mrr": _mean(row["reciprocal_rank"] for row in rows),
+        "fact_hit_rate": _mean(row["fact_hit_rate"] for row in rows),
+        "latency_ms": latency,
+    }
+
+
+def _metric(metrics: dict, path: str):
+    value = metrics
+    for part in path.split(".") if path.startswith("latency_ms.") else [path]:
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def check_thresholds(metrics: dict, thresholds: dict) -> list:
+    """Threshold violations as readable strings (missing metrics are skipped)."""
+    failures = []
+    for path, bounds in thresholds.items():
+        value = _metric(metrics, path)
+        if value is None:
+            continue
+        if "min" in bounds and value < bounds["min"]:
+            failures.append(f"{path}={value} < {bounds['min']}")
+        if "max" in bounds and value > bounds["max"]:
+            failures.append(f"{path}={value} > {bounds['max']}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Golden-set retrieval quality / latency benchmark")
+    parser.add_argument("--golden", type=Path, default=DEFAULT_GOLDEN_SET)
+    parser.add_argument("--mode", choices=["live", "local"], default="local")
+    parser.add_argument("--k", type=int, help="Override the golden set's k")
+    parser.add_argument("--tags", nargs="+", help="Only questions with one of these tags")
+    parser.add_argument("--no-generate", action="store_true", help="Live mode: skip Gemini Pro (facts checked on context)")
+    parser.add_argument("--lexical-only", action="store_true", help="Local mode: BM25 only, no query embedding")
+    parser.add_argument("--thresholds", type=Path, help="JSON file overriding the golden set's thresholds")
+    parser.add_argument("--output", type=Path, help="Write the JSON report here")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline logs")
+    args = parser.parse_args()
+
+    golden = load_golden_set(args.golden)
+    k = args.k or golden.get("k", 10)
+    questions = golden["questions"]
+    if args.tags:
+        questions = [q for q in questions if set(q.get("tags", [])) & set(args.tags)]
+
+    thresholds = golden.get("thresholds", {})
+    if args.thresholds:
+        with open(args.thresholds, "r", encoding="utf-8") as f:
+            thresholds = {**thresholds, **json.load(f)}
+
+    with contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO()):
+        runner = Runner(args.mode, k, generate=not args.no_generate, lexical_only=args.lexical_only)
+    print(f"📊 골든셋 v{golden['version']}: {len(questions)}개 질문, mode={args.mode}, k={k}")
+
+    rows = []
+    for question in questions:
+        logs = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        try:
+            with logs:
+                row = runner.run(question)
+        except Exception as e:
+            row = {"id": question["id"], "question": question["question"], "tags": question.get("tags", []),
+                   "error": str(e), "recall": 0.0, "reciprocal_rank": 0.0, "fact_hit_rate": 0.0,
+                   "timings_ms": {}}
+        rows.append(row)
+
+        status = "❌" if "error" in row else ("✅" if row["recall"] in (None, 1.0) else "⚠️")
+        recall = "-" if row["recall"] is None else f"{row['recall']:.2f}"
+        facts = "-" if row["fact_hit_rate"] is None else f"{row['fact_hit_rate']:.2f}"
+        total = row["timings_ms"].get("total", 0)
+        print(f"  {status} {row['id']:<40} recall={recall} facts={facts} {total:8.1f}ms"
+              + (f"  ({row['error']})" if "error" in row else ""))
+
+    metrics = summarize(rows)
+    by_tag = {}
+    for tag in sorted({tag for row in rows for tag in row["tags"]}):
+        tagged = summarize([row for row in rows if tag in row["tags"]])
+        by_tag[tag] = {key: tagged[key] for key in ("questions", "recall@k", "mrr", "fact_hit_rate")}
+
+    failures = check_thresholds(metrics, thresholds)
+    latency = metrics["latency_ms"].get("total", {})
+    print(f"\n  recall@{k}={metrics['recall@k']}  MRR={metrics['mrr']}  fact_hit_rate={metrics['fact_hit_rate']}  "
+          f"total p50={latency.get('p50')}ms p95={latency.get('p95')}ms")
+    for failure in failures:
+        print(f"  ❌ 임계값 위반: {failure}")
+    print(f"  🔌 검색 백엔드: {runner.backend}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "golden_set": {"path": str(args.golden), "version": golden["version"]},
+                "mode": args.mode,
+                "backend": runner.backend,
+                "pinecone_queries": runner.pinecone_queries,
+                "k": k,
+                "generated": runner.generate,
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "metrics": metrics,
+                "by_tag": by_tag,
+                "thresholds": thresholds,
+                "failures": failures,
+                "passed": not failures,
+                "questions": rows,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"✅ 리포트 저장: {args.output}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+"""
+Compact columnar commission data (memory-mapped).
+
+regenerate_json_v3_dynamic.py writes commission_data_base_60pct_only.json and
+commission_metadata_index.json with indent=2, and every consumer parses both
+in full and builds one dict per product. The columnar artifact
+(commission_data_columnar.bin, written next to the JSON) holds the same data
+as flat arrays that are memory-mapped on load:
+
+    MAGIC (8 bytes) | header length (uint32 LE) | header JSON | sections
+
+The header carries the small dictionaries (rate keys, companies with their
+index info, distinct payment periods with their normalized form, source
+metadata) and a table of sections (dtype, shape, byte offset; 8-byte
+aligned, little-endian):
+
+- rates / mask: products x rate-keys float64 base rates and presence flags
+- key_order (+ offsets): each product's own rate-key order
+- company / period: dictionary codes into the header tables
+- row_number, conversion_rate (+ conversion_rate_int: 환산율 was an int 0)
+- names / names_normalized / name_length: UTF-8 string tables (blob + offsets)
+- product_keywords (+ offsets): codes into the sorted keyword table
+- unigram / bigram / keyword postings over the normalized names, for
+  product_search_index (sorted term tables, looked up by bisection)
+
+Strings are decoded only when accessed, so loading is a header parse plus
+mmap, and memory does not grow with per-product objects. The Node engine
+reads the same file (commission_query_system_dynamic/src/commission_columnar.js).
+"""
+
+import bisect
+import json
+import mmap
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+MAGIC = b"CMSNCOL1"
+FORMAT_VERSION = 1
+COLUMNAR_FILE = "commission_data_columnar.bin"
+_ALIGN = 8
+
+
+class StringTable:
+    """Read-only sequence of strings over a UTF-8 blob and offsets."""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def find(self, value: str) -> Optional[int]:
+        """Position of value in a sorted table, or None."""
+        i = bisect.bisect_left(self, value)
+        if i < len(self) and self[i] == value:
+            return i
+        return None
+
+
+class Postings:
+    """Sorted term table -> product ids (and optional per-product counts)."""
+
+    def __init__(self, terms: StringTable, offsets: np.ndarray, ids: np.ndarray, counts: Optional[np.ndarray] = None):
+        self.terms = terms
+        self.offsets = offsets
+        self.ids = ids
+        self.counts = counts
+
+    def get(self, term: str) -> Optional[np.ndarray]:
+        i = self.terms.find(term)
+        if i is None:
+            return None
+        return self.ids[self.offsets[i]:self.offsets[i + 1]]
+
+    def get_counts(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        i = self.terms.find(term)
+        if i is None:
+            return None
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.ids[start:end], self.counts[start:end]
+
+
+# ----------------------------------------------------------------------
+# Writing
+# ----------------------------------------------------------------------
+
+def _string_sections(name: str, values: Sequence[str]) -> Dict[str, np.ndarray]:
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(e) for e in encoded])
+    return {
+        f"{name}_blob": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        f"{name}_offsets": offsets,
+    }
+
+
+def _posting_sections(name: str, postings: Dict[str, List[Tuple[int, int]]], with_counts: bool) -> Dict[str, np.ndarray]:
+    terms = sorted(postings)
+    sections = _string_sections(f"{name}_terms", terms)
+    lengths = [len(postings[t]) for t in terms]
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(lengths)
+    sections[f"{name}_offsets"] = offsets
+    sections[f"{name}_ids"] = np.asarray([i for t in terms for i, _ in postings[t]], dtype=np.int32)
+    if with_counts:
+        sections[f"{name}_counts"] = np.asarray([c for t in terms for _, c in postings[t]], dtype=np.int32)
+    return sections
+
+
+def build_columnar(base_data: dict, metadata_index: dict) -> bytes:
+    """
+    Serialize the regenerated commission data into the columnar format.
+
+    Args:
+        base_data: commission_data_base_60pct_only.json contents
+        metadata_index: commission_metadata_index.json contents
+
+    Returns:
+        The artifact bytes
+    """
+    base_products = [
+        (company, product)
+        for company, company_data in base_data["companies"].items()
+        for product in company_data["products"]
+    ]
+    index_products = metadata_index["products"]
+    if [(c, p["row_number"]) for c, p in base_products] != [(p["company"], p["row_number"]) for p in index_products]:
+        raise ValueError("commission data and metadata index list different products")
+
+    n = len(index_products)
+    keys: Dict[str, int] = {}
+    for _, product in base_products:
+        for key in product["base_commission_rates"]:
+            keys.setdefault(key, len(keys))
+
+    companies = list(metadata_index["companies"].keys())
+    for company, _ in base_products:
+        if company not in companies:
+            companies.append(company)
+    company_codes = {c: i for i, c in enumerate(companies)}
+
+    periods: List[list] = []
+    period_codes: Dict[str, int] = {}
+
+    rates = np.zeros((n, len(keys)), dtype=np.float64)
+    mask = np.zeros((n, len(keys)), dtype=np.uint8)
+    key_order: List[int] = []
+    key_order_offsets = np.zeros(n + 1, dtype=np.int64)
+    company = np.zeros(n, dtype=np.int32)
+    period = np.zeros(n, dtype=np.int32)
+    row_number = np.zeros(n, dtype=np.int64)
+    conversion_rate = np.zeros(n, dtype=np.float64)
+    conversion_rate_int = np.zeros(n, dtype=np.uint8)
+
+    keyword_codes: Dict[str, int] = {}
+    product_keywords: List[str] = []
+    product_keywords_offsets = np.zeros(n + 1, dtype=np.int64)
+    unigrams: Dict[str, List[Tuple[int, int]]] = {}
+    bigrams: Dict[str, List[Tuple[int, int]]] = {}
+    keyword_postings: Dict[str, List[Tuple[int, int]]] = {}
+
+    for i, ((company_name, base), product) in enumerate(zip(base_products, index_products)):
+        for key, value in base["base_commission_rates"].items():
+            if value is None:
+                continue
+            rates[i, keys[key]] = value
+            mask[i, keys[key]] = 1
+            key_order.append(keys[key])
+        key_order_offsets[i + 1] = len(key_order)
+
+        company[i] = company_codes[company_name]
+        period_key = json.dumps([product["payment_period"], product["payment_period_normalized"]], ensure_ascii=False)
+        if period_key not in period_codes:
+            period_codes[period_key] = len(periods)
+            periods.append([product["payment_period"], product["payment_period_normalized"]])
+        period[i] = period_codes[period_key]
+        row_number[i] = product["row_number"]
+        rate = product["metadata"]["환산율"]
+        conversion_rate[i] = rate
+        conversion_rate_int[i] = isinstance(rate, int)
+
+        for keyword in product["keywords"]:
+            keyword_codes.setdefault(keyword, len(keyword_codes))
+            product_keywords.append(keyword)
+        product_keywords_offsets[i + 1] = len(product_keywords)
+        for keyword in dict.fromkeys(product["keywords"]):
+            keyword_postings.setdefault(keyword, []).append((i, 0))
+
+        name = product["product_name_normalized"]
+        for ch, count in Counter(name).items():
+            unigrams.setdefault(ch, []).append((i, count))
+        for gram in dict.fromkeys(name[k:k + 2] for k in range(len(name) - 1)):
+            bigrams.setdefault(gram, []).append((i, 0))
+
+    # Keyword table sorted for bisection; occurrence counts / first positions
+    # keep Counter.most_common order for the metadata sample
+    sorted_keywords = sorted(keyword_codes)
+    keyword_rank = {k: r for r, k in enumerate(sorted_keywords)}
+    occurrences = Counter(product_keywords)
+    first_seen = {}
+    for position, keyword in enumerate(product_keywords):
+        first_seen.setdefault(keyword, position)
+
+    sections: Dict[str, np.ndarray] = {
+        "rates": rates,
+        "mask": mask,
+        "key_order": np.asarray(key_order, dtype=np.int32),
+        "key_order_offsets": key_order_offsets,
+        "company": company,
+        "period": period,
+        "row_number": row_number,
+        "conversion_rate": conversion_rate,
+        "conversion_rate_int": conversion_rate_int,
+        "name_length": np.asarray([len(p["product_name_normalized"]) for p in index_products], dtype=np.int32),
+        "product_keywords": np.asarray([keyword_rank[k] for k in product_keywords], dtype=np.int32),
+        "product_keywords_offsets": product_keywords_offsets,
+        "keyword_occurrences": np.asarray([occurrences[k] for k in sorted_keywords], dtype=np.int32),
+        "keyword_first_seen": np.asarray([first_seen[k] for k in sorted_keywords], dtype=np.int64),
+    }
+    sections.update(_string_sections("names", [p["product_name"] for p in index_products]))
+    sections.update(_string_sections("names_normalized", [p["product_name_normalized"] for p in index_products]))
+    sections.update(_string_sections("keywords", sorted_keywords))
+    sections.update(_posting_sections("unigram", unigrams, with_counts=True))
+    sections.update(_posting_sections("bigram", bigrams, with_counts=False))
+    sections.update(_posting_sections("keyword_postings", keyword_postings, with_counts=False))
+
+    header = {
+        "version": FORMAT_VERSION,
+        "source_metadata": base_data.get("metadata", {}),
+        "index_metadata": metadata_index.get("metadata", {}),
+        "companies": [[c, metadata_index["companies"].get(c, {})] for c in companies],
+        "periods": periods,
+        "keys": list(keys),
+        "products": n,
+        "sections": {},
+    }
+
+    offset = 0
+    layout = []
+    for name, array in sections.items():
+        array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<"))
+        offset = -(-offset // _ALIGN) * _ALIGN
+        header["sections"][name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        layout.append((offset, array))
+        offset += array.nbytes
+
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    prefix = len(MAGIC) + 4 + len(header_bytes)
+    data_start = -(-prefix // _ALIGN) * _ALIGN
+    header_bytes += b" " * (data_start - prefix)
+
+    out = bytearray(data_start + offset)
+    out[:len(MAGIC)] = MAGIC
+    out[len(MAGIC):len(MAGIC) + 4] = len(header_bytes).to_bytes(4, "little")
+    out[len(MAGIC) + 4:data_start] = header_bytes
+    for section_offset, array in layout:
+        start = data_start + section_offset
+        out[start:start + array.nbytes] = array.tobytes()
+    return bytes(out)
+
+
+def write_columnar(base_data: dict, metadata_index: dict, path: Union[str, Path]) -> int:
+    """Write the artifact atomically (readers keep their old mapping). Returns its size."""
+    data = build_columnar(base_data, metadata_index)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+# ----------------------------------------------------------------------
+# Reading
+# ----------------------------------------------------------------------
+
+class ColumnarCatalog:
+    """Commission products as column views over one buffer (usually an mmap)."""
+
+    def __init__(self, buffer):
+        view = memoryview(buffer)
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            raise ValueError("not a commission columnar file")
+        header_length = int.from_bytes(view[len(MAGIC):len(MAGIC) + 4], "little")
+        data_start = len(MAGIC) + 4 + header_length
+        header = json.loads(bytes(view[len(MAGIC) + 4:data_start]).decode("utf-8"))
+        if header["version"] != FORMAT_VERSION:
+            raise ValueError(f"unsupported columnar format version {header['version']}")
+
+        self._buffer = buffer
+        self.header = header
+        sections = {}
+        for name, spec in header["sections"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"])) if spec["shape"] else 1
+            array = np.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + spec["offset"])
+            sections[name] = array.reshape(spec["shape"])
+        self._sections = sections
+
+        self.keys: List[str] = header["keys"]
+        self.companies: List[str] = [c for c, _ in header["companies"]]
+        self.company_info: Dict[str, dict] = {c: info for c, info in header["companies"]}
+        self.periods: List[list] = header["periods"]
+        self.source_metadata: dict = header["source_metadata"]
+        self.index_metadata: dict = header["index_metadata"]
+
+        self.rates = sections["rates"]
+        self.mask = sections["mask"].view(bool)
+        self.key_order_values = sections["key_order"]
+        self.key_order_offsets = sections["key_order_offsets"]
+        self.company_code = sections["company"]
+        self.period_code = sections["period"]
+        self.row_number = sections["row_number"]
+        self.conversion_rate = sections["conversion_rate"]
+        self.conversion_rate_int = sections["conversion_rate_int"]
+        self.name_length = sections["name_length"]
+        self.names = StringTable(sections["names_blob"], sections["names_offsets"])
+        self.names_normalized = StringTable(sections["names_normalized_blob"], sections["names_normalized_offsets"])
+        self.keywords = StringTable(sections["keywords_blob"], sections["keywords_offsets"])
+        self.product_keyword_codes = sections["product_keywords"]
+        self.product_keyword_offsets = sections["product_keywords_offsets"]
+        self.keyword_occurrences = sections["keyword_occurrences"]
+        self.keyword_first_seen = sections["keyword_first_seen"]
+        self.unigrams = self._postings("unigram", with_counts=True)
+        self.bigrams = self._postings("bigram")
+        self.keyword_postings = self._postings("keyword_postings")
+
+    def _postings(self, name: str, with_counts: bool = False) -> Postings:
+        s = self._sections
+        return Postings(
+            StringTable(s[f"{name}_terms_blob"], s[f"{name}_terms_offsets"]),
+            s[f"{name}_offsets"], s[f"{name}_ids"],
+            s[f"{name}_counts"] if with_counts else None
+        )
+
+    @classmethod
+    def open(cls, path: Union[str, Path]) -> "ColumnarCatalog":
+        """Memory-map an artifact file (read-only)."""
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped)
+
+    @classmethod
+    def from_json(cls, base_data: dict, metadata_index: dict) -> "ColumnarCatalog":
+        """Catalog over an in-memory artifact built from the JSON files."""
+        return cls(build_columnar(base_data, metadata_index))
+
+    def __len__(self) -> int:
+        return len(self.row_number)
+
+    # ------------------------------------------------------------------
+    # Per-product access (materialized on demand)
+    # ------------------------------------------------------------------
+
+    def company(self, i: int) -> str:
+        return self.companies[self.company_code[i]]
+
+    def payment_period(self, i: int):
+        return self.periods[self.period_code[i]][0]
+
+    def payment_period_normalized(self, i: int) -> str:
+        return self.periods[self.period_code[i]][1]
+
+    def key_order(self, i: int) -> np.ndarray:
+        return self.key_order_values[self.key_order_offsets[i]:self.key_order_offsets[i + 1]]
+
+    def product_keywords(self, i: int) -> List[str]:
+        codes = self.product_keyword_codes[self.product_keyword_offsets[i]:self.product_keyword_offsets[i + 1]]
+        return [self.keywords[c] for c in codes]
+
+    def metadata(self, i: int) -> dict:
+        rate = self.conversion_rate[i]
+        return {
+            "상품명": self.names[i],
+            "납입기간": self.payment_period(i),
+            "환산율": int(rate) if self.conversion_rate_int[i] else float(rate),
+        }
+
+    def product(self, i: int) -> dict:
+        """Metadata-index product dict (commission_metadata_index.json shape)."""
+        return {
+            "product_name": self.names[i],
+            "product_name_normalized": self.names_normalized[i],
+            "payment_period": self.payment_period(i),
+            "payment_period_normalized": self.payment_period_normalized(i),
+            "company": self.company(i),
+            "row_number": int(self.row_number[i]),
+            "keywords": self.product_keywords(i),
+            "metadata": self.metadata(i),
+        }
+
+    def base_rates(self, i: int) -> Dict[str, float]:
+        columns = self.key_order(i)
+        return {self.keys[c]: float(v) for c, v in zip(columns, self.rates[i, columns])}
+
+    def find_row(self, company: str, row_number: int) -> Optional[int]:
+        """Product position of (company, row_number), or None."""
+        if company not in self.company_info:
+            return None
+        code = self.companies.index(company)
+        hits = np.flatnonzero((self.company_code == code) & (self.row_number == row_number))
+        return int(hits[0]) if len(hits) else None
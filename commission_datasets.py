@@ -0,0 +1,370 @@
+"""
+Versioned commission datasets with atomic activation.
+
+Serving used to read the regenerated files straight from
+commission_query_system_dynamic/data, so a new monthly file.xlsx was only
+picked up by Node workers spawned afterwards (or a restart), and a
+half-written regeneration could be read mid-way. Datasets make the switch
+explicit:
+
+    data/datasets/
+        2025-12/                 one immutable directory per version
+            file.xlsx            source workbook (copy)
+            commission_data_base_60pct_only.json
+            commission_metadata_index.json
+            commission_data_columnar.bin
+            manifest.json        version, source sha256, per-file sha256/size,
+                                 overall checksum, product / company counts
+        active.json              {"version", "activated_at", "previous"}
+        inbox/                   drop a new workbook here (DatasetWatcher)
+        regenerate_sheet_cache.json   sheet cache shared by all builds
+
+- build_dataset regenerates into a temporary directory next to the
+  versions, writes the manifest and renames the directory into place
+- activate verifies the manifest checksums and replaces active.json
+  atomically (os.replace); the previous version stays on disk for rollback
+- active_data_dir is what serving loads: the active version, or the legacy
+  data directory while no dataset has been activated
+- DatasetWatcher polls the inbox and builds + activates every new workbook
+  (once its size / mtime are stable), then calls on_activate so the serving
+  process can swap its index (commission_service.reload_commission_data)
+
+Regeneration runs regenerate_json_v3_dynamic.py in a subprocess, so its
+memory and process pool never live in the serving process.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DATA_DIR = Path(__file__).parent / "commission_query_system_dynamic" / "data"
+DATASETS_DIR = Path(os.getenv("COMMISSION_DATASETS_DIR", str(DATA_DIR / "datasets")))
+REGENERATE_SCRIPT = DATA_DIR / "regenerate_json_v3_dynamic.py"
+ACTIVE_FILE = "active.json"
+MANIFEST_FILE = "manifest.json"
+SOURCE_FILE = "file.xlsx"
+INBOX_DIR = "inbox"
+SHEET_CACHE_FILE = "regenerate_sheet_cache.json"
+DATASET_FILES = (
+    "commission_data_base_60pct_only.json",
+    "commission_metadata_index.json",
+    "commission_data_columnar.bin",
+)
+WATCH_INTERVAL = float(os.getenv("COMMISSION_DATASET_WATCH_INTERVAL", "10"))
+
+_VERSION = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+
+
+class DatasetError(Exception):
+    """A dataset is missing, incomplete or does not match its manifest."""
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_json_atomic(path: Path, data: dict):
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+# ----------------------------------------------------------------------
+# Manifest
+# ----------------------------------------------------------------------
+
+def _checksum(files: dict) -> str:
+    """Overall checksum over the per-file hashes (name order)."""
+    digest = hashlib.sha256()
+    for name in sorted(files):
+        digest.update(f"{name}:{files[name]['sha256']}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def write_manifest(dataset_dir: Path, version: str) -> dict:
+    """Hash the dataset files and write manifest.json."""
+    files = {}
+    for name in DATASET_FILES:
+        path = dataset_dir / name
+        if not path.exists():
+            raise DatasetError(f"{version}: {name} was not generated")
+        files[name] = {"sha256": file_sha256(path), "size": path.stat().st_size}
+
+    with open(dataset_dir / "commission_metadata_index.json", "r", encoding="utf-8") as f:
+        totals = json.load(f)["metadata"]
+    source = dataset_dir / SOURCE_FILE
+    manifest = {
+        "version": version,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "source": {"file": SOURCE_FILE, "sha256": file_sha256(source), "size": source.stat().st_size},
+        "files": files,
+        "checksum": _checksum(files),
+        "total_products": totals["total_products"],
+        "total_companies": totals["total_companies"],
+    }
+    _write_json_atomic(dataset_dir / MANIFEST_FILE, manifest)
+    return manifest
+
+
+def read_manifest(version: str, datasets_dir: Path = DATASETS_DIR) -> dict:
+    path = datasets_dir / version / MANIFEST_FILE
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        raise DatasetError(f"{version}: unreadable manifest ({e})")
+
+
+def verify_dataset(version: str, datasets_dir: Path = DATASETS_DIR) -> dict:
+    """
+    Check every dataset file against the manifest.
+
+    Returns:
+        The manifest
+
+    Raises:
+        DatasetError: missing file, size / sha256 mismatch, bad checksum or
+            a manifest of another version
+    """
+    manifest = read_manifest(version, datasets_dir)
+    if manifest.get("version") != version:
+        raise DatasetError(f"{version}: manifest is for {manifest.get('version')!r}")
+    files = manifest.get("files", {})
+    if _checksum(files) != manifest.get("checksum"):
+        raise DatasetError(f"{version}: manifest checksum mismatch")
+    for name, expected in files.items():
+        path = datasets_dir / version / name
+        if not path.exists():
+            raise DatasetError(f"{version}: {name} is missing")
+        if path.stat().st_size != expected["size"] or file_sha256(path) != expected["sha256"]:
+            raise DatasetError(f"{version}: {name} does not match the manifest")
+    return manifest
+
+
+def list_datasets(datasets_dir: Path = DATASETS_DIR) -> List[dict]:
+    """Manifests of all complete datasets, oldest first."""
+    manifests = []
+    if not datasets_dir.exists():
+        return manifests
+    for path in datasets_dir.iterdir():
+        if path.is_dir() and (path / MANIFEST_FILE).exists():
+            try:
+                manifest = read_manifest(path.name, datasets_dir)
+            except DatasetError:
+                continue
+            if manifest.get("version") == path.name:
+                manifests.append(manifest)
+    return sorted(manifests, key=lambda m: (m.get("created_at", ""), m["version"]))
+
+
+# ----------------------------------------------------------------------
+# Build / activate
+# ----------------------------------------------------------------------
+
+def build_dataset(xlsx_path: Path, version: Optional[str] = None, full: bool = False,
+                  datasets_dir: Path = DATASETS_DIR) -> dict:
+    """
+    Regenerate a workbook into a new dataset version.
+
+    Args:
+        xlsx_path: Monthly commission workbook
+        version: Dataset name (default: YYYYMMDD-HHMMSS-<source sha256[:8]>)
+        full: Rebuild every sheet (ignore the shared sheet cache)
+        datasets_dir: Root of the dataset versions
+
+    Returns:
+        The new dataset's manifest
+
+    Raises:
+        DatasetError: invalid / existing version or failed regeneration
+    """
+    xlsx_path = Path(xlsx_path)
+    if version is None:
+        version = f"{datetime.now():%Y%m%d-%H%M%S}-{file_sha256(xlsx_path)[:8]}"
+    if not _VERSION.match(version):
+        raise DatasetError(f"invalid dataset version: {version!r}")
+    target = datasets_dir / version
+    if target.exists():
+        raise DatasetError(f"dataset {version} already exists")
+
+    datasets_dir.mkdir(parents=True, exist_ok=True)
+    build_dir = datasets_dir / f".build-{version}-{os.getpid()}"
+    build_dir.mkdir()
+    try:
+        shutil.copy2(xlsx_path, build_dir / SOURCE_FILE)
+        command = [sys.executable, str(REGENERATE_SCRIPT), "--cache", str(datasets_dir.resolve() / SHEET_CACHE_FILE)]
+        if full:
+            command.append("--full")
+        completed = subprocess.run(command, cwd=str(build_dir), capture_output=True, text=True, encoding="utf-8")
+        if completed.returncode != 0:
+            raise DatasetError(f"regeneration failed for {version}: {completed.stderr.strip()[-2000:]}")
+
+        manifest = write_manifest(build_dir, version)
+        os.rename(build_dir, target)
+    except BaseException:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+
+    print(f"[Commission] 데이터셋 생성: {version} ({manifest['total_products']}개 상품)")
+    return manifest
+
+
+def active_version(datasets_dir: Path = DATASETS_DIR) -> Optional[str]:
+    try:
+        with open(datasets_dir / ACTIVE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)["version"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def active_data_dir(datasets_dir: Path = DATASETS_DIR) -> Path:
+    """Directory serving loads from: the active dataset, else the legacy data directory."""
+    version = active_version(datasets_dir)
+    return datasets_dir / version if version else DATA_DIR
+
+
+def activate(version: str, datasets_dir: Path = DATASETS_DIR) -> dict:
+    """
+    Verify a dataset and make it the active one (atomic pointer replace).
+
+    Returns:
+        The activated dataset's manifest
+    """
+    manifest = verify_dataset(version, datasets_dir)
+    _write_json_atomic(datasets_dir / ACTIVE_FILE, {
+        "version": version,
+        "activated_at": datetime.now().isoformat(timespec="seconds"),
+        "previous": active_version(datasets_dir),
+    })
+    print(f"[Commission] 데이터셋 활성화: {version}")
+    return manifest
+
+
+# ----------------------------------------------------------------------
+# Inbox watcher
+# ----------------------------------------------------------------------
+
+class DatasetWatcher:
+    """Builds and activates every new workbook dropped into the inbox."""
+
+    def __init__(self, on_activate: Optional[Callable[[dict], None]] = None,
+                 datasets_dir: Path = DATASETS_DIR, interval: float = WATCH_INTERVAL):
+        """
+        Args:
+            on_activate: Called with the manifest after each activation
+            datasets_dir: Root of the dataset versions (inbox/ inside it)
+            interval: Poll interval in seconds
+        """
+        self.on_activate = on_activate
+        self.datasets_dir = datasets_dir
+        self.inbox = datasets_dir / INBOX_DIR
+        self.interval = interval
+        self.seen = {}        # path -> (size, mtime) of the previous poll
+        self.handled = set()  # (path, size, mtime) already built or failed
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self) -> "DatasetWatcher":
+        self.inbox.mkdir(parents=True, exist_ok=True)
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+        print(f"[Commission] 데이터셋 감시 시작: {self.inbox}")
+        return self
+
+    def stop(self):
+        self.stopped.set()
+
+    def _loop(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"[Commission] 데이터셋 감시 오류: {e}")
+
+    def poll(self) -> List[dict]:
+        """One scan of the inbox; returns the manifests activated."""
+        activated = []
+        current = {}
+        for path in sorted(self.inbox.glob("*.xlsx"), key=lambda p: p.stat().st_mtime):
+            if path.name.startswith(("~$", ".")):
+                continue
+            stat = path.stat()
+            state = (stat.st_size, stat.st_mtime)
+            current[path] = state
+            # Wait until the upload has finished (unchanged since the last poll)
+            if self.seen.get(path) != state or (path, *state) in self.handled:
+                continue
+            self.handled.add((path, *state))
+
+            source_sha = file_sha256(path)
+            if any(m["source"]["sha256"] == source_sha for m in list_datasets(self.datasets_dir)):
+                continue
+            try:
+                manifest = build_dataset(path, datasets_dir=self.datasets_dir)
+                activate(manifest["version"], self.datasets_dir)
+            except DatasetError as e:
+                print(f"[Commission] 데이터셋 생성 실패 ({path.name}): {e}")
+                continue
+            activated.append(manifest)
+            if self.on_activate is not None:
+                self.on_activate(manifest)
+        self.seen = current
+        return activated
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Versioned commission datasets")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="regenerate a workbook into a new dataset")
+    build.add_argument("xlsx")
+    build.add_argument("--version")
+    build.add_argument("--full", action="store_true")
+    build.add_argument("--activate", action="store_true")
+    commands.add_parser("activate", help="make a dataset active").add_argument("version")
+    commands.add_parser("verify", help="check a dataset against its manifest").add_argument("version")
+    commands.add_parser("list", help="list datasets")
+    commands.add_parser("watch", help="build + activate workbooks dropped into the inbox")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        manifest = build_dataset(Path(args.xlsx), args.version, args.full)
+        if args.activate:
+            activate(manifest["version"])
+    elif args.command == "activate":
+        activate(args.version)
+    elif args.command == "verify":
+        print(json.dumps(verify_dataset(args.version), ensure_ascii=False, indent=2))
+    elif args.command == "list":
+        current = active_version()
+        for m in list_datasets():
+            marker = "*" if m["version"] == current else " "
+            print(f"{marker} {m['version']:32s} {m['created_at']}  {m['total_products']} products  {m['source']['sha256'][:12]}")
+    elif args.command == "watch":
+        watcher = DatasetWatcher().start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            watcher.stop()
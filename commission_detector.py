@@ -3,6 +3,13 @@ Commission Query Detector
 Detects if a user query is related to insurance commission
 """
 
+import re
+
+from keyword_matcher import scan_keywords
+
+PERCENTAGE_PATTERN = re.compile(r'(\d+)\s*[%프프로센트]')
+
+
 def detect_commission_query(query: str) -> dict:
     """
     Detect if a query is about commission
@@ -11,41 +18,12 @@ def detect_commission_query(query: str) -> dict:
         dict with keys: is_commission_query, confidence, matched_keywords, reasoning
     """
     query_lower = query.lower().strip()
-    matched_keywords = []
-    strong_match = False
-
-    # Keywords that indicate a commission query
-    COMMISSION_KEYWORDS = [
-        # Commission-related
-        '수수료', '커미션', 'commission', '보험료', '수당',
-
-        # Insurance types
-        '종신보험', '변액연금', '건강보험', '실손보험', '암보험',
-        '종신', '변액', '연금', '보험',
-
-        # Common insurance products
-        '약속플러스', '변액유니버셜', '무배당', '유니버셜', '어린이보험',
-
-        # Companies
-        'KB', '삼성', '미래에셋', '한화', '교보', '동양', '메트라이프',
-        '처브', '라이나', '흥국', 'AIA', '푸르덴셜', 'DB',
-
-        # Payment periods
-        '년납', '일시납', '전기납', '평생납',
-
-        # Percentage indicators
-        '%', '프로', '퍼센트', '프로센트'
-    ]
-
-    # Strong indicators
-    STRONG_INDICATORS = ['수수료', '커미션', 'commission', '%', '프로']
 
-    # Check for keyword matches
-    for keyword in COMMISSION_KEYWORDS:
-        if keyword.lower() in query_lower:
-            matched_keywords.append(keyword)
-            if any(strong.lower() in keyword.lower() for strong in STRONG_INDICATORS):
-                strong_match = True
+    # Keywords (commission / insurance types / products / companies / payment
+    # periods / percentage words) come from keyword_vocab.json, matched in one pass
+    hits = scan_keywords(query_lower)
+    matched_keywords = list(hits.get('commission'))
+    strong_match = hits.has('commission_strong')
 
     # Calculate confidence
     confidence = 0.0
@@ -60,15 +38,13 @@ def detect_commission_query(query: str) -> dict:
         confidence = 0.3
 
     # Check for percentage patterns
-    import re
-    percentage_pattern = re.compile(r'(\d+)\s*[%프프로센트]')
-    if percentage_pattern.search(query_lower):
+    has_percentage = PERCENTAGE_PATTERN.search(query_lower) is not None
+    if has_percentage:
         confidence = max(confidence, 0.85)
         matched_keywords.append('percentage_indicator')
 
     # Check for product + percentage combination
-    has_insurance = any(k in matched_keywords for k in ['종신보험', '변액연금', '보험'])
-    has_percentage = percentage_pattern.search(query_lower) is not None
+    has_insurance = hits.has('commission_insurance')
 
     if has_insurance and has_percentage:
         confidence = 0.95
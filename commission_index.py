@@ -0,0 +1,455 @@
+"""
+In-process commission lookup over the regenerated base-rate data.
+
+Python port of NaturalLanguageCommissionSystem (commission_query_system_dynamic/
+src/nl_query_system_dynamic.js): loads the output of regenerate_json_v3_dynamic.py
+once and answers queries with the same result shape as executeQuery, so
+commission_service can serve lookups without a Node process
+(COMMISSION_BACKEND=python).
+
+The data is read as a commission_columnar.ColumnarCatalog - memory-mapped
+from commission_data_columnar.bin when the regeneration wrote it, otherwise
+built in memory from commission_data_base_60pct_only.json +
+commission_metadata_index.json. Products are looked up by (company,
+row_number) and by (normalized name, normalized payment period); product
+dicts are only materialized for results. Fuzzy matching scores exactly like
+the JS engine and goes through product_search_index.ProductSearchIndex.
+
+get_commission_index serves the active dataset (commission_datasets) and
+swaps in a new index when another version is activated.
+"""
+
+import copy
+import json
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from commission_columnar import COLUMNAR_FILE, ColumnarCatalog
+from commission_datasets import active_data_dir
+from commission_rate_matrix import RateMatrix
+from commission_query_parser import LocalQueryParser
+from product_search_index import ProductSearchIndex
+
+load_dotenv()
+
+DATA_DIR = Path(__file__).parent / "commission_query_system_dynamic" / "data"
+BASE_DATA_FILE = "commission_data_base_60pct_only.json"
+METADATA_INDEX_FILE = "commission_metadata_index.json"
+BASE_PERCENTAGE = 60
+GEMINI_MODEL = "gemini-flash-latest"
+PARSE_CACHE_SIZE = int(os.getenv("COMMISSION_PARSE_CACHE_SIZE", "512"))
+# Local parser first, Gemini only for ambiguous queries
+FAST_PARSE_ENABLED = os.getenv("COMMISSION_FAST_PARSE", "true").lower() not in ("0", "false", "no")
+# auto: columnar artifact when present and not older than the JSON | columnar | json
+DATA_FORMAT = os.getenv("COMMISSION_DATA_FORMAT", "auto").lower()
+
+_PERCENT = re.compile(r"([0-9]+)\s*[%프]")
+_PERIOD = re.compile(r"([0-9]+년납|일시납|전기납|평생납)")
+_NON_KEYWORD = re.compile(r"[%프0-9년납일시전기평생]")
+_JSON_OBJECT = re.compile(r"\{[\s\S]*\}")
+
+
+def _js_number(value) -> str:
+    """Number formatting of a JS template literal (75.0 -> '75')."""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def rule_based_parse(query: str) -> dict:
+    """GeminiQueryParser._ruleBasedParse."""
+    result = {
+        "product_keywords": [],
+        "payment_period": None,
+        "percentage": None,
+        "company_hint": None,
+        "query_type": "commission_lookup",
+        "confidence": 0.6,
+        "parsed_by": "rule_based",
+    }
+
+    pct_match = _PERCENT.search(query)
+    if pct_match:
+        pct = int(pct_match.group(1))
+        if 1 <= pct <= 200:
+            result["percentage"] = pct
+
+    period_match = _PERIOD.search(query)
+    if period_match:
+        result["payment_period"] = period_match.group(1)
+
+    words = _NON_KEYWORD.sub(" ", query).strip().split()
+    result["product_keywords"] = [w for w in words if len(w) > 1]
+    return result
+
+
+def data_files(data_dir: Path = DATA_DIR) -> List[Path]:
+    """Files the index is loaded from: the columnar artifact or the two JSON files."""
+    columnar = data_dir / COLUMNAR_FILE
+    json_files = [data_dir / BASE_DATA_FILE, data_dir / METADATA_INDEX_FILE]
+    if DATA_FORMAT == "json":
+        return json_files
+    if DATA_FORMAT == "columnar" or (
+        columnar.exists()
+        and all(not p.exists() or p.stat().st_mtime <= columnar.stat().st_mtime for p in json_files)
+    ):
+        return [columnar]
+    return json_files
+
+
+class CommissionIndex:
+    """Base-rate commission data indexed for in-process lookups."""
+
+    def __init__(self, catalog: ColumnarCatalog):
+        self.catalog = catalog
+        self.search_index = ProductSearchIndex(catalog)
+        self.local_parser = LocalQueryParser(catalog.companies, self.search_index)
+        self.rate_matrix = RateMatrix(catalog)
+
+        # Gemini prompt context - fixed for the loaded data, so computed once
+        self._metadata_sample = self._build_metadata_sample()
+        # Gemini parse results per normalized query (LRU)
+        self._parse_cache: "OrderedDict[str, dict]" = OrderedDict()
+        self._parse_lock = threading.Lock()
+
+    @classmethod
+    def load(cls, data_dir: Path = DATA_DIR) -> "CommissionIndex":
+        """Memory-map the columnar artifact, or build it in memory from the JSON files."""
+        files = data_files(data_dir)
+        if files[0].name == COLUMNAR_FILE:
+            return cls(ColumnarCatalog.open(files[0]))
+        with open(data_dir / BASE_DATA_FILE, "r", encoding="utf-8") as f:
+            base_data = json.load(f)
+        with open(data_dir / METADATA_INDEX_FILE, "r", encoding="utf-8") as f:
+            metadata_index = json.load(f)
+        return cls(ColumnarCatalog.from_json(base_data, metadata_index))
+
+    # ------------------------------------------------------------------
+    # Keyed lookups
+    # ------------------------------------------------------------------
+
+    def get_product(self, company: str, row_number: int) -> Optional[dict]:
+        """Base product (row_number, metadata, base_commission_rates) or None."""
+        i = self.catalog.find_row(company, row_number)
+        if i is None:
+            return None
+        return {
+            "row_number": int(self.catalog.row_number[i]),
+            "metadata": self.catalog.metadata(i),
+            "base_commission_rates": self.catalog.base_rates(i),
+        }
+
+    def find(self, product_name: str, payment_period: Optional[str] = None) -> List[dict]:
+        """Index products with this exact name (and period), normalized like the index."""
+        name = product_name.lower().replace(" ", "")
+        period = payment_period.lower().replace(" ", "") if payment_period is not None else None
+        found = []
+        for i in self.search_index.containing(name):
+            if self.catalog.names_normalized[i] != name:
+                continue
+            if period is not None and self.catalog.payment_period_normalized(i) != period:
+                continue
+            found.append(self.catalog.product(i))
+        return found
+
+    # ------------------------------------------------------------------
+    # Commission calculation
+    # ------------------------------------------------------------------
+
+    def get_commission_data(self, company: str, row_number: int, percentage) -> dict:
+        if company not in self.catalog.company_info:
+            return {"error": f"Company '{company}' not found"}
+        if percentage < 1 or percentage > 200:
+            return {"error": f"Percentage {_js_number(percentage)}% not in range (1%-200%)"}
+
+        i = self.catalog.find_row(company, row_number)
+        if i is None:
+            return {"error": f"Product not found at row {row_number}"}
+
+        multiplier = percentage / BASE_PERCENTAGE
+        return {
+            "company": company,
+            "percentage": percentage,
+            "multiplier_ratio": multiplier,
+            "calculation_formula": f"{_js_number(percentage)}% = (60% × {multiplier:.6f})",
+            "product": {
+                "row_number": int(self.catalog.row_number[i]),
+                "metadata": self.catalog.metadata(i),
+                "commission_rates": self.rate_matrix.product_rates(company, row_number, percentage),
+            },
+        }
+
+    # ------------------------------------------------------------------
+    # Fuzzy matching
+    # ------------------------------------------------------------------
+
+    def fuzzy_match_product(self, keywords: List[str], payment_period: Optional[str] = None,
+                            company_hint: Optional[str] = None, limit: int = 5) -> List[dict]:
+        """fuzzyMatchProduct top-k through the n-gram search index, best first."""
+        return self.search_index.search(keywords, payment_period, company_hint, limit)
+
+    # ------------------------------------------------------------------
+    # Query parsing
+    # ------------------------------------------------------------------
+
+    def metadata_sample(self) -> dict:
+        """getMetadataSample (computed at load time)."""
+        return self._metadata_sample
+
+    def _build_metadata_sample(self) -> dict:
+        catalog = self.catalog
+        company_samples = {}
+        for code, company_name in enumerate(catalog.companies[:5]):
+            company_samples[company_name] = [
+                {
+                    "name": catalog.names[i][:60],
+                    "period": catalog.payment_period(i),
+                    "keywords": catalog.product_keywords(i)[:3],
+                }
+                for i in np.flatnonzero(catalog.company_code == code)[:3]
+            ]
+
+        # Counter insertion order = first occurrence, as in the product scan
+        period_counts = Counter()
+        for code, count in enumerate(np.bincount(catalog.period_code, minlength=len(catalog.periods))):
+            period_counts[catalog.periods[code][0]] += int(count)
+        keyword_counts = Counter()
+        for k in np.argsort(catalog.keyword_first_seen, kind="stable"):
+            keyword_counts[catalog.keywords[k]] = int(catalog.keyword_occurrences[k])
+
+        types = []
+        for name in catalog.names:
+            kind = next((t for word, t in (("종신", "종신보험"), ("변액", "변액연금"), ("건강", "건강보험"),
+                                           ("실손", "실손보험"), ("암", "암보험")) if word in name), None)
+            if kind and kind not in types:
+                types.append(kind)
+
+        return {
+            "companies": list(catalog.companies),
+            "total_products": catalog.index_metadata.get("total_products", len(catalog)),
+            "common_payment_periods": [period for period, _ in period_counts.most_common(15)],
+            "top_keywords": [kw for kw, _ in keyword_counts.most_common(20)],
+            "product_types": types[:10],
+            "sample_products_by_company": company_samples,
+        }
+
+    def parse_query(self, query: str) -> dict:
+        """
+        Local parse when it resolves one product, else GeminiQueryParser.parseWithGemini.
+
+        Without GEMINI_API_KEY or on a Gemini error the local parse is used
+        (the old rule-based parse with COMMISSION_FAST_PARSE=false).
+        """
+        if FAST_PARSE_ENABLED:
+            fallback, accepted = self.local_parser.parse(query)
+            if accepted:
+                return fallback
+        else:
+            fallback = rule_based_parse(query)
+
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            return fallback
+
+        cache_key = " ".join(query.lower().split())
+        with self._parse_lock:
+            cached = self._parse_cache.get(cache_key)
+            if cached is not None:
+                self._parse_cache.move_to_end(cache_key)
+                return copy.deepcopy(cached)
+
+        sample = self.metadata_sample()
+        prompt = f"""You are an expert Korean insurance commission data query parser.
+
+AVAILABLE DATA CONTEXT:
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+📊 DATABASE OVERVIEW:
+- Total Products: {sample['total_products']}
+- Companies: {len(sample['companies'])}
+- Available Percentages: Any percentage from 1% to 200% (dynamic calculation from 60% base)
+
+🏢 COMPANIES (13 total):
+{json.dumps(sample['companies'], ensure_ascii=False, indent=2)}
+
+📋 COMMON PAYMENT PERIODS:
+{', '.join(sample['common_payment_periods'][:10])}
+
+🔑 TOP PRODUCT KEYWORDS:
+{', '.join(sample['top_keywords'][:15])}
+
+📦 PRODUCT TYPES:
+{', '.join(sample['product_types'])}
+
+💼 SAMPLE PRODUCTS BY COMPANY:
+{json.dumps(sample['sample_products_by_company'], ensure_ascii=False, indent=2)}
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+USER QUERY: "{query}"
+
+Parse this query and extract structured information. Return ONLY valid JSON with NO markdown, NO code blocks, NO explanations:
+
+{{
+  "product_keywords": ["keyword1", "keyword2"],
+  "payment_period": "5년납",
+  "percentage": 60,
+  "company_hint": "KB",
+  "query_type": "commission_lookup",
+  "confidence": 0.95,
+  "reasoning": "brief explanation"
+}}
+
+EXTRACTION RULES:
+1. product_keywords: Key words from product name in Korean (e.g., ["약속플러스", "종신보험"])
+2. payment_period: Exact payment term (5년납, 10년납, 전기납, 일시납, null)
+3. percentage: Any integer 1-200 (null if not specified) - System supports dynamic calculation at any percentage
+4. company_hint: Company name if mentioned (KB, 삼성, 미래에셋, etc.)
+5. query_type: Always "commission_lookup"
+6. confidence: 0.0-1.0 based on clarity
+7. reasoning: Why you chose these extractions
+
+IMPORTANT: Return ONLY the JSON object, no other text."""
+
+        try:
+            from google import genai
+
+            client = genai.Client(api_key=api_key)
+            response = client.models.generate_content(model=GEMINI_MODEL, contents=prompt)
+            json_match = _JSON_OBJECT.search(response.text or "")
+            if json_match:
+                parsed = json.loads(json_match.group(0))
+                parsed["parsed_by"] = "gemini"
+                # Only Gemini results are cached - a fallback after an error is retried next time
+                with self._parse_lock:
+                    self._parse_cache[cache_key] = copy.deepcopy(parsed)
+                    while len(self._parse_cache) > PARSE_CACHE_SIZE:
+                        self._parse_cache.popitem(last=False)
+                return parsed
+            print(f"⚠️  Could not parse Gemini response, using {fallback['parsed_by']} parse")
+        except Exception as e:
+            print(f"⚠️  Gemini error: {e}, using {fallback['parsed_by']} parse")
+        return fallback
+
+    # ------------------------------------------------------------------
+    # Query
+    # ------------------------------------------------------------------
+
+    def execute_query(self, query: str, parsed: Optional[dict] = None) -> dict:
+        """
+        executeQuery: parse, fuzzy-match, calculate.
+
+        Args:
+            query: Natural-language commission question
+            parsed: Pre-parsed query (skips parse_query)
+
+        Returns:
+            Same dict shape as NaturalLanguageCommissionSystem.executeQuery
+        """
+        parsed = parsed if parsed is not None else self.parse_query(query)
+
+        matches = self.fuzzy_match_product(
+            parsed.get("product_keywords") or [],
+            parsed.get("payment_period"),
+            parsed.get("company_hint")
+        )
+        if not matches:
+            return {
+                "status": "error",
+                "message": "No matching products found",
+                "parsed_query": parsed,
+            }
+
+        top_matches = matches[:5]
+        best_match = top_matches[0]
+        percentage = parsed.get("percentage") or 60
+
+        commission_result = self.get_commission_data(best_match["company"], best_match["row_number"], percentage)
+
+        return {
+            "status": "success",
+            "query": query,
+            "parsed_query": parsed,
+            "best_match": {
+                "product_name": best_match["product_name"],
+                "company": best_match["company"],
+                "payment_period": best_match["payment_period"],
+                "match_score": best_match["match_score"],
+                "metadata": best_match["metadata"],
+            },
+            "fuzzy_matches": top_matches,
+            "alternatives": [
+                {
+                    "product_name": m["product_name"],
+                    "company": m["company"],
+                    "payment_period": m["payment_period"],
+                    "match_score": m["match_score"],
+                }
+                for m in top_matches[1:4]
+            ],
+            "commission_data": commission_result,
+            "percentage": percentage,
+        }
+
+
+_index: Optional[CommissionIndex] = None
+_index_key = None
+_index_lock = threading.Lock()
+_load_lock = threading.Lock()
+
+
+def _data_key(data_dir: Path) -> tuple:
+    files = data_files(data_dir)
+    return str(data_dir), tuple(f.name for f in files), max(os.path.getmtime(f) for f in files)
+
+
+def reload_commission_index(data_dir: Optional[Path] = None) -> CommissionIndex:
+    """
+    Load the active dataset (or data_dir) and swap it in.
+
+    The new index is built before the swap, which is a single reference
+    assignment: requests that already hold the previous index finish on it.
+    """
+    global _index, _index_key
+    data_dir = data_dir or active_data_dir()
+    with _load_lock:
+        key = _data_key(data_dir)
+        if _index is not None and key == _index_key:
+            return _index
+        index = CommissionIndex.load(data_dir)
+        with _index_lock:
+            _index, _index_key = index, key
+    print(f"[Commission] Python 인덱스 로드: {len(index.catalog)}개 상품 ({data_dir.name}/{key[1][0]})")
+    return index
+
+
+def get_commission_index(data_dir: Optional[Path] = None) -> CommissionIndex:
+    """
+    Process-wide index of the active dataset, reloaded when the active
+    version (or the files of the legacy data directory) changes. While a
+    new dataset loads, other requests keep getting the current index.
+    """
+    with _index_lock:
+        index, current = _index, _index_key
+    try:
+        key = _data_key(data_dir or active_data_dir())
+    except OSError:
+        if index is None:
+            raise
+        return index
+    if index is not None and (key == current or _load_lock.locked()):
+        return index
+    if index is None:
+        return reload_commission_index(data_dir)
+    try:
+        return reload_commission_index(data_dir)
+    except Exception as e:
+        print(f"[Commission] 인덱스 리로드 실패 - 이전 데이터 유지: {e}")
+        return index
@@ -0,0 +1,150 @@
+"""
+Local first-tier parser for commission queries.
+
+parseWithGemini sends every query to Gemini with dynamic thinking, although
+the common shape ("약속플러스 5년납 60%") is fully determined by regexes and
+the product vocabulary. LocalQueryParser parses locally:
+
+- percentage ("60%", "60프로", "60퍼센트") and payment period ("5년납",
+  "5년 납", "일시납") regexes
+- company aliases derived from the index companies ("KB", "삼성", "DB손보" ...),
+  matched at the start of a token and turned into company_hint
+- the remaining tokens (minus stopwords such as "수수료", "알려줘", and a
+  trailing particle unless the token occurs in a product name) are the
+  product keywords
+
+The result is accepted when the keywords resolve to one product through the
+search index: the best match contains (or lists) every keyword and no other
+product name with the same property scores within AMBIGUITY_MARGIN of it.
+Otherwise the caller escalates to Gemini (and uses the local parse when
+Gemini is unavailable or fails).
+
+JS counterpart: commission_query_system_dynamic/src/local_query_parser.js
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+from product_search_index import ProductSearchIndex, normalize
+
+AMBIGUITY_MARGIN = 1.0
+
+_PERCENT = re.compile(r"(\d+)\s*(?:%|프로|퍼센트|퍼|프)")
+_PERIOD = re.compile(r"(\d+)\s*년\s*납|(일시|전기|평생)\s*납")
+_TOKEN_SPLIT = re.compile(r"[\s,?!.]+")
+_COMPANY_SUFFIX = re.compile(r"(생명|손해보험|화재|손보|해상|라이프)$")
+
+STOPWORDS = {
+    "수수료", "수수료율", "수수료는", "수수료가", "요율", "지급률", "지급율", "시책",
+    "알려줘", "알려주세요", "알려", "얼마", "얼마야", "얼마예요", "얼마인가요", "얼마임",
+    "조회", "조회해줘", "기준", "상품", "보험사", "좀", "은", "는", "의",
+    "익월", "초년도", "환산율",
+}
+_PARTICLES = ("은", "는", "을", "를", "의")
+
+EXTRA_COMPANY_ALIASES = {
+    "kb생명": "KB라이프", "kb손보": "KB손해보험", "db손보": "DB손해보험", "한화손보": "한화손해보험",
+    "미래에셋생명": "미래에셋", "라이나": "라이나손보", "라이나생명": "라이나손보",
+    "아이엠라이프": "IM라이프", "메리츠": "메리츠화재", "현대": "현대해상",
+}
+
+
+def company_aliases(companies: List[str]) -> Dict[str, str]:
+    """Lowercase alias -> company hint (a substring of one or more company names)."""
+    aliases = {}
+    for company in companies:
+        aliases[company.lower()] = company
+        short = _COMPANY_SUFFIX.sub("", company)
+        if short and short != company:
+            aliases.setdefault(short.lower(), short)
+    for alias, hint in EXTRA_COMPANY_ALIASES.items():
+        if any(hint in company for company in companies):
+            aliases.setdefault(alias, hint)
+    return aliases
+
+
+class LocalQueryParser:
+    """Regex + vocabulary parser whose result is trusted only when unambiguous."""
+
+    def __init__(self, companies: List[str], search_index: ProductSearchIndex):
+        self.search_index = search_index
+        self.aliases = sorted(company_aliases(companies).items(), key=lambda item: len(item[0]), reverse=True)
+
+    def _split_company(self, token: str) -> Tuple[Optional[str], str]:
+        lowered = token.lower()
+        for alias, hint in self.aliases:
+            if lowered.startswith(alias):
+                return hint, token[len(alias):]
+        return None, token
+
+    def extract(self, query: str) -> dict:
+        """Parse into the parseWithGemini result shape (parsed_by 'local')."""
+        result = {
+            "product_keywords": [],
+            "payment_period": None,
+            "percentage": None,
+            "company_hint": None,
+            "query_type": "commission_lookup",
+            "confidence": 0.6,
+            "parsed_by": "local",
+        }
+
+        text = query
+        pct_match = _PERCENT.search(text)
+        if pct_match:
+            pct = int(pct_match.group(1))
+            if 1 <= pct <= 200:
+                result["percentage"] = pct
+            text = text[:pct_match.start()] + " " + text[pct_match.end():]
+
+        period_match = _PERIOD.search(text)
+        if period_match:
+            years, kind = period_match.groups()
+            result["payment_period"] = f"{years}년납" if years else f"{kind}납"
+            text = text[:period_match.start()] + " " + text[period_match.end():]
+
+        keywords = []
+        for token in _TOKEN_SPLIT.split(text):
+            hint, token = self._split_company(token)
+            if hint and result["company_hint"] is None:
+                result["company_hint"] = hint
+            if len(token) > 2 and token.endswith(_PARTICLES) and not self.search_index.contains_any(token):
+                token = token[:-1]
+            if len(token) > 1 and token.lower() not in STOPWORDS:
+                keywords.append(token)
+        result["product_keywords"] = keywords
+        return result
+
+    @staticmethod
+    def _covers(product: dict, keyword_norms: List[str]) -> bool:
+        name = product["product_name_normalized"]
+        return all(k in name or k in product["keywords"] for k in keyword_norms)
+
+    def parse(self, query: str) -> Tuple[dict, bool]:
+        """
+        Parse locally and decide whether the result can skip Gemini.
+
+        Args:
+            query: Natural-language commission question
+
+        Returns:
+            (parsed query, accepted)
+        """
+        parsed = self.extract(query)
+        keyword_norms = [normalize(k) for k in parsed["product_keywords"]]
+        if not keyword_norms:
+            return parsed, False
+
+        matches = self.search_index.search(parsed["product_keywords"], parsed["payment_period"], parsed["company_hint"])
+        if not matches or not self._covers(matches[0], keyword_norms):
+            return parsed, False
+
+        best = matches[0]
+        for other in matches[1:]:
+            if best["match_score"] - other["match_score"] >= AMBIGUITY_MARGIN:
+                break
+            if other["product_name_normalized"] != best["product_name_normalized"] and self._covers(other, keyword_norms):
+                return parsed, False
+
+        parsed["confidence"] = 0.95
+        return parsed, True
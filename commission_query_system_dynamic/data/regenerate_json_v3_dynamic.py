@@ -2,105 +2,42 @@
 """
 Regenerate commission JSON from Excel file - V3 with DYNAMIC column detection
 Each sheet is analyzed independently to find the correct FC계 column
+
+Incremental, parallel engine:
+- each sheet is fingerprinted from the xlsx package without parsing it
+  (sheet XML + the shared strings it references + its SHEET_CONFIG entry);
+  results of unchanged sheets are reused from regenerate_sheet_cache.json,
+  so a monthly update only rebuilds the sheets that changed (--full rebuilds all)
+- changed sheets are parsed once each, in a process pool (the workbook is
+  opened once per worker; COMMISSION_REGEN_WORKERS / --workers)
+- sheets are streamed with commission_sheet_reader (openpyxl read-only):
+  header keys are computed once per sheet from the first rows, product rows
+  are selected and read by column slicing in bounded row blocks
 """
 
-import pandas as pd
+import argparse
+import hashlib
 import json
+import os
+import re
+import sys
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-def col_name(idx):
-    """Convert column index to Excel column name"""
-    if idx < 26:
-        return chr(65 + idx)
-    first = (idx - 26) // 26
-    second = (idx - 26) % 26
-    return chr(65 + first) + chr(65 + second)
-
-def find_fc_columns(df, company):
-    """Dynamically find FC start and end columns for a company"""
-    # Find rate column (0.6 or 0.65)
-    fc_start = None
-    rate = None
-
-    for col_idx in range(20):
-        for row_idx in [7, 8]:
-            if row_idx < len(df) and col_idx < len(df.iloc[row_idx]):
-                val = str(df.iloc[row_idx, col_idx]) if pd.notna(df.iloc[row_idx, col_idx]) else ''
-                if val in ['0.6', '0.65']:
-                    fc_start = col_idx
-                    rate = val
-                    break
-        if fc_start:
-            break
-
-    if fc_start is None:
-        return None
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from commission_columnar import COLUMNAR_FILE, write_columnar
+from commission_sheet_reader import CommissionSheetReader, col_name
 
-    # Method 1: Look for FC계
-    fc_end = None
-    for col_idx in range(fc_start, min(fc_start + 60, df.shape[1])):
-        for row_idx in [7, 8, 9, 10]:
-            if row_idx < len(df) and col_idx < len(df.iloc[row_idx]):
-                val = str(df.iloc[row_idx, col_idx]) if pd.notna(df.iloc[row_idx, col_idx]) else ''
-                if 'FC계' == val or 'FC 계' == val:
-                    fc_end = col_idx
-                    break
-        if fc_end:
-            break
-
-    # Method 2: If no FC계, analyze data pattern
-    if fc_end is None:
-        # Find first product rows
-        data_start_rows = []
-        for idx in range(10, 25):
-            if idx < len(df):
-                col_a = df.iloc[idx, 0]
-                col_b = df.iloc[idx, 1] if df.shape[1] > 1 else None
-
-                if pd.notna(col_a) and isinstance(col_a, str) and len(col_a) > 3:
-                    if '합계' not in col_a and '상품명' not in col_a:
-                        data_start_rows.append(idx)
-                elif pd.notna(col_b) and isinstance(col_b, str) and len(col_b) > 3:
-                    if '합계' not in col_b and '상품명' not in col_b:
-                        data_start_rows.append(idx)
-
-                if len(data_start_rows) >= 5:
-                    break
-
-        if data_start_rows:
-            last_numeric_cols = []
-
-            for row_idx in data_start_rows[:5]:
-                consecutive_empty = 0
-                last_numeric = None
-
-                for col_idx in range(fc_start, min(fc_start + 60, df.shape[1])):
-                    val = df.iloc[row_idx, col_idx]
-
-                    if pd.notna(val) and isinstance(val, (int, float)) and val != 0:
-                        last_numeric = col_idx
-                        consecutive_empty = 0
-                    else:
-                        consecutive_empty += 1
-                        if consecutive_empty >= 3:
-                            break
-
-                if last_numeric:
-                    last_numeric_cols.append(last_numeric)
-
-            if last_numeric_cols:
-                from collections import Counter
-                fc_end = Counter(last_numeric_cols).most_common(1)[0][0]
-
-    if fc_end:
-        num_cols = fc_end - fc_start + 1
-        return {
-            'fc_start': fc_start,
-            'fc_end': fc_end,
-            'num_cols': num_cols
-        }
+# Bump when extraction changes (invalidates every cached sheet)
+ENGINE_VERSION = 2
+SHEET_CACHE_FILE = "regenerate_sheet_cache.json"
+
+_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+_SHARED_REF = re.compile(rb'<c\b[^>]*\bt="s"[^>]*>\s*<v>(\d+)</v>')
 
-    return None
 
 # Configuration for each sheet (product, payment, rate columns)
 SHEET_CONFIG = {
@@ -119,7 +56,142 @@ SHEET_CONFIG = {
     '라이나손보': {'data_start_row': 12, 'product_col': 0, 'payment_col': 3, 'rate_col': 5},
 }
 
-def regenerate_commission_json():
+def extract_sheet(reader, company, config):
+    """
+    Extract one company sheet.
+
+    Args:
+        reader: Open CommissionSheetReader
+        company: Sheet / company name
+        config: SHEET_CONFIG entry
+
+    Returns:
+        {"fc_columns", "products", "index_products"} or None when the FC
+        columns cannot be found
+    """
+    layout = reader.detect_layout(company)
+    if not layout:
+        return None
+
+    products = []
+    index_products = []
+    rows = reader.iter_products(company, layout, config['data_start_row'], config['product_col'],
+                                config['payment_col'], config['rate_col'])
+    for row in rows:
+        product_name = row.product_name
+        has_period = row.payment_period is not None
+        payment_period = row.payment_period if has_period else ""
+        conversion_rate = row.conversion_rate
+        metadata = {
+            "상품명": product_name,
+            "납입기간": payment_period,
+            "환산율": float(conversion_rate) if isinstance(conversion_rate, (int, float)) else 0
+        }
+
+        products.append({
+            "row_number": row.row_number,
+            "metadata": metadata,
+            "base_commission_rates": row.commission_rates(layout)
+        })
+        index_products.append({
+            "product_name": product_name,
+            "product_name_normalized": product_name.lower().replace(" ", ""),
+            "payment_period": payment_period,
+            "payment_period_normalized": str(payment_period).lower().replace(" ", "") if has_period else "",
+            "company": company,
+            "row_number": row.row_number,
+            "keywords": product_name.lower().split(),
+            "metadata": dict(metadata)
+        })
+
+    return {"fc_columns": layout.fc_info(), "products": products, "index_products": index_products}
+
+
+# ----------------------------------------------------------------------
+# Sheet fingerprints / cache
+# ----------------------------------------------------------------------
+
+def sheet_fingerprints(xlsx_path):
+    """{sheet name: content hash} in workbook order, read from the xlsx package (no parsing)"""
+    with zipfile.ZipFile(xlsx_path) as package:
+        names = set(package.namelist())
+        shared_strings = []
+        if "xl/sharedStrings.xml" in names:
+            for item in ET.fromstring(package.read("xl/sharedStrings.xml")).iter(f"{_MAIN_NS}si"):
+                shared_strings.append("".join(t.text or "" for t in item.iter(f"{_MAIN_NS}t")))
+
+        rels = ET.fromstring(package.read("xl/_rels/workbook.xml.rels"))
+        targets = {rel.get("Id"): rel.get("Target") for rel in rels}
+        workbook = ET.fromstring(package.read("xl/workbook.xml"))
+
+        fingerprints = {}
+        for sheet in workbook.iter(f"{_MAIN_NS}sheet"):
+            name = sheet.get("name")
+            target = targets[sheet.get(_REL_ID)]
+            sheet_xml = package.read(target.lstrip("/") if target.startswith("/") else f"xl/{target}")
+
+            digest = hashlib.sha256()
+            digest.update(json.dumps([ENGINE_VERSION, SHEET_CONFIG.get(name)], ensure_ascii=False).encode("utf-8"))
+            digest.update(sheet_xml)
+            for index in sorted({int(ref) for ref in _SHARED_REF.findall(sheet_xml)}):
+                digest.update(shared_strings[index].encode("utf-8") + b"\0")
+            fingerprints[name] = digest.hexdigest()
+    return fingerprints
+
+
+def load_sheet_cache(cache_path=SHEET_CACHE_FILE):
+    """{sheet name: {"fingerprint", "result"}} from the previous run"""
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get("version") != ENGINE_VERSION:
+        return {}
+    return cache.get("sheets", {})
+
+
+def save_sheet_cache(sheets, cache_path=SHEET_CACHE_FILE):
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"version": ENGINE_VERSION, "sheets": sheets}, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+
+
+# ----------------------------------------------------------------------
+# Sheet processing (process pool)
+# ----------------------------------------------------------------------
+
+_reader = None
+
+
+def _open_workbook(xlsx_path):
+    """Pool initializer: open the workbook (read-only, streaming) once per worker"""
+    global _reader
+    _reader = CommissionSheetReader(xlsx_path)
+
+
+def _process_sheet(company):
+    return company, extract_sheet(_reader, company, SHEET_CONFIG[company])
+
+
+def process_sheets(xlsx_path, companies, workers=None):
+    """Parse and extract the given sheets; [(company, result)] in the given order"""
+    if not companies:
+        return []
+    workers = max(1, min(workers or os.cpu_count() or 1, len(companies)))
+    if workers == 1:
+        _open_workbook(xlsx_path)
+        try:
+            return [_process_sheet(company) for company in companies]
+        finally:
+            _reader.close()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_open_workbook, initargs=(xlsx_path,)) as pool:
+        return list(pool.map(_process_sheet, companies))
+
+
+def regenerate_commission_json(full=False, workers=None, cache_path=SHEET_CACHE_FILE):
     xlsx_path = "file.xlsx"
     output_json = "commission_data_base_60pct_only.json"
     metadata_json = "commission_metadata_index.json"
@@ -128,8 +200,8 @@ def regenerate_commission_json():
     print("REGENERATING COMMISSION JSON - V3 DYNAMIC COLUMN DETECTION")
     print("==" * 40)
 
-    xl_file = pd.ExcelFile(xlsx_path)
-    print(f"\nFound {len(xl_file.sheet_names)} sheets")
+    fingerprints = sheet_fingerprints(xlsx_path)
+    print(f"\nFound {len(fingerprints)} sheets")
 
     commission_data = {
         "metadata": {
@@ -149,113 +221,44 @@ def regenerate_commission_json():
         "products": []
     }
 
-    company_sheets = [s for s in xl_file.sheet_names if s != 'FC 합계']
+    company_sheets = [s for s in fingerprints if s != 'FC 합계' and s in SHEET_CONFIG]
+    for company in fingerprints:
+        if company != 'FC 합계' and company not in SHEET_CONFIG:
+            print(f"  ⚠️  {company}: No configuration found, skipping")
+
+    cache = {} if full else load_sheet_cache(cache_path)
+    reused = {
+        company: cache[company]["result"]
+        for company in company_sheets
+        if company in cache and cache[company].get("fingerprint") == fingerprints[company]
+    }
+    changed = [company for company in company_sheets if company not in reused]
+    print(f"Unchanged sheets: {len(reused)}, rebuilding: {len(changed)}")
+
+    results = dict(reused)
+    results.update(process_sheets(xlsx_path, changed, workers))
+    save_sheet_cache({
+        company: {"fingerprint": fingerprints[company], "result": results[company]}
+        for company in company_sheets
+    }, cache_path)
 
     for company in company_sheets:
+        result = results[company]
+        config = SHEET_CONFIG[company]
         print(f"\n{'--'*40}")
-        print(f"Processing: {company}")
+        print(f"Processing: {company}" + ("" if company in changed else " (unchanged, cached)"))
         print(f"{'--'*40}")
 
-        config = SHEET_CONFIG.get(company)
-        if not config:
-            print(f"  ⚠️  No configuration found, skipping")
-            continue
-
-        df = pd.read_excel(xlsx_path, sheet_name=company, header=None)
-
-        # Dynamically find FC columns
-        fc_info = find_fc_columns(df, company)
-        if not fc_info:
+        if not result:
             print(f"  ⚠️  Could not find FC columns, skipping")
             continue
 
-        fc_col_start = fc_info['fc_start']
-        fc_col_end = fc_info['fc_end']
-        num_fc_cols = fc_info['num_cols']
-
-        data_start_row = config['data_start_row'] - 1
-        product_col = config['product_col']
-        payment_col = config['payment_col']
-        rate_col = config['rate_col']
-
+        fc_info = result["fc_columns"]
         print(f"  Data starts at row: {config['data_start_row']}")
-        print(f"  Product col: {col_name(product_col)}, Payment col: {col_name(payment_col)}, Rate col: {col_name(rate_col)}")
-        print(f"  FC columns: {col_name(fc_col_start)} to {col_name(fc_col_end)} ({num_fc_cols} columns)")
-
-        products = []
-        for row_idx in range(data_start_row, len(df)):
-            product_name = df.iloc[row_idx, product_col]
-
-            if pd.isna(product_name) or not isinstance(product_name, str) or len(product_name) < 3:
-                continue
-
-            if any(keyword in str(product_name).lower() for keyword in ['합계', 'subtotal', 'total', '소계', '상품명', '상품분류']):
-                continue
-
-            payment_period = df.iloc[row_idx, payment_col]
-            conversion_rate = df.iloc[row_idx, rate_col]
-
-            commission_rates = {}
-
-            for col_idx in range(fc_col_start, fc_col_end + 1):
-                if col_idx >= df.shape[1]:
-                    break
-
-                value = df.iloc[row_idx, col_idx]
-
-                if pd.notna(value) and isinstance(value, (int, float)):
-                    h8 = df.iloc[7, col_idx] if col_idx < len(df.iloc[7]) and pd.notna(df.iloc[7, col_idx]) else ''
-                    h9 = df.iloc[8, col_idx] if col_idx < len(df.iloc[8]) and pd.notna(df.iloc[8, col_idx]) else ''
-                    h10 = df.iloc[9, col_idx] if col_idx < len(df.iloc[9]) and pd.notna(df.iloc[9, col_idx]) else ''
-
-                    key_parts = []
-
-                    if col_idx == fc_col_start:
-                        if '수수료' in str(h8):
-                            key_parts.append("2025년 FC 수수료_0.6")
-
-                    if h9 and str(h9).strip():
-                        key_parts.append(str(h9).strip())
-                    if h10 and str(h10).strip():
-                        key_parts.append(str(h10).strip())
-
-                    key = "_".join(key_parts) if key_parts else f"col_{col_idx}"
-
-                    # FC계 is the last column
-                    if col_idx == fc_col_end:
-                        commission_rates["FC계"] = float(value)
-                        commission_rates["Total"] = float(value)
-                        key = "FC계"
-
-                    commission_rates[key] = float(value)
-
-            if commission_rates:
-                product_data = {
-                    "row_number": row_idx + 1,
-                    "metadata": {
-                        "상품명": product_name,
-                        "납입기간": payment_period if pd.notna(payment_period) else "",
-                        "환산율": float(conversion_rate) if pd.notna(conversion_rate) and isinstance(conversion_rate, (int, float)) else 0
-                    },
-                    "base_commission_rates": commission_rates
-                }
-                products.append(product_data)
-
-                metadata_index["products"].append({
-                    "product_name": product_name,
-                    "product_name_normalized": product_name.lower().replace(" ", ""),
-                    "payment_period": payment_period if pd.notna(payment_period) else "",
-                    "payment_period_normalized": str(payment_period).lower().replace(" ", "") if pd.notna(payment_period) else "",
-                    "company": company,
-                    "row_number": row_idx + 1,
-                    "keywords": product_name.lower().split(),
-                    "metadata": {
-                        "상품명": product_name,
-                        "납입기간": payment_period if pd.notna(payment_period) else "",
-                        "환산율": float(conversion_rate) if pd.notna(conversion_rate) and isinstance(conversion_rate, (int, float)) else 0
-                    }
-                })
+        print(f"  Product col: {col_name(config['product_col'])}, Payment col: {col_name(config['payment_col'])}, Rate col: {col_name(config['rate_col'])}")
+        print(f"  FC columns: {col_name(fc_info['fc_start'])} to {col_name(fc_info['fc_end'])} ({fc_info['num_cols']} columns)")
 
+        products = result["products"]
         print(f"  Extracted {len(products)} products")
 
         if products:
@@ -263,11 +266,12 @@ def regenerate_commission_json():
                 "company_name": company,
                 "products": products
             }
+            metadata_index["products"].extend(result["index_products"])
 
             metadata_index["companies"][company] = {
                 "product_count": len(products),
                 "sheet_name": company,
-                "fc_columns": num_fc_cols
+                "fc_columns": fc_info['num_cols']
             }
 
     metadata_index["metadata"]["total_companies"] = len(commission_data["companies"])
@@ -284,9 +288,19 @@ def regenerate_commission_json():
         json.dump(metadata_index, f, ensure_ascii=False, indent=2)
     print(f"✅ Metadata index saved to: {metadata_json}")
 
+    # Memory-mapped columnar copy for the Python commission index
+    columnar_size = write_columnar(commission_data, metadata_index, COLUMNAR_FILE)
+    print(f"✅ Columnar data saved to: {COLUMNAR_FILE} ({columnar_size:,} bytes)")
+
     print(f"\nTotal companies: {metadata_index['metadata']['total_companies']}")
     print(f"Total products: {metadata_index['metadata']['total_products']}")
     print("==" * 40)
 
 if __name__ == "__main__":
-    regenerate_commission_json()
+    parser = argparse.ArgumentParser(description="Regenerate commission JSON from file.xlsx")
+    parser.add_argument("--full", action="store_true", help="rebuild every sheet (ignore the sheet cache)")
+    parser.add_argument("--cache", default=SHEET_CACHE_FILE, help="sheet cache file (shared between dataset builds)")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("COMMISSION_REGEN_WORKERS", "0")) or None,
+                        help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+    regenerate_commission_json(full=args.full, workers=args.workers, cache_path=args.cache)
@@ -0,0 +1,374 @@
+/**
+ * Columnar commission catalog
+ *
+ * Reads commission_data_columnar.bin, the flat-array artifact written by
+ * regenerate_json_v3_dynamic.py next to the JSON files (format and writer:
+ * commission_columnar.py):
+ *
+ *   MAGIC (8 bytes) | header length (uint32 LE) | header JSON | sections
+ *
+ * Loading is one file read plus typed-array views over the sections (rates,
+ * codes, offsets, UTF-8 string blobs, n-gram postings), instead of parsing
+ * both JSON files into one object per product. Strings are decoded and
+ * product objects built only when a result needs them.
+ *
+ * Without the artifact (or with COMMISSION_DATA_FORMAT=json) the same
+ * catalog is built in memory from commission_data_base_60pct_only.json +
+ * commission_metadata_index.json, so callers have one code path.
+ *
+ * Python counterpart: commission_columnar.ColumnarCatalog
+ */
+
+import fs from 'fs';
+import path from 'path';
+
+export const MAGIC = 'CMSNCOL1';
+export const FORMAT_VERSION = 1;
+export const COLUMNAR_FILE = 'commission_data_columnar.bin';
+export const BASE_DATA_FILE = 'commission_data_base_60pct_only.json';
+export const METADATA_INDEX_FILE = 'commission_metadata_index.json';
+
+// auto: columnar artifact when present and not older than the JSON | columnar | json
+const DATA_FORMAT = (process.env.COMMISSION_DATA_FORMAT || 'auto').toLowerCase();
+
+// numpy dtype -> typed array (sections are little-endian, like the hosts we run on)
+const TYPED_ARRAYS = { '<f8': Float64Array, '<i4': Int32Array, '|u1': Uint8Array, '<i8': BigInt64Array };
+
+const decoder = new TextDecoder('utf-8');
+
+/** Read-only string sequence over a UTF-8 blob and offsets (or over a plain array) */
+class StringTable {
+  constructor(blob, offsets) {
+    this.blob = blob;
+    this.offsets = offsets;
+  }
+
+  static of(values) {
+    const table = new StringTable(null, null);
+    table.values = values;
+    return table;
+  }
+
+  get length() {
+    return this.values ? this.values.length : this.offsets.length - 1;
+  }
+
+  get(i) {
+    if (this.values) return this.values[i];
+    return decoder.decode(this.blob.subarray(this.offsets[i], this.offsets[i + 1]));
+  }
+
+  *[Symbol.iterator]() {
+    for (let i = 0; i < this.length; i++) yield this.get(i);
+  }
+}
+
+/** Term -> {ids, counts} (counts only for unigram postings) */
+class Postings {
+  constructor(map) {
+    this.map = map;
+  }
+
+  static fromSections(terms, offsets, ids, counts = null) {
+    const map = new Map();
+    for (let t = 0; t < terms.length; t++) {
+      const start = offsets[t];
+      const end = offsets[t + 1];
+      map.set(terms.get(t), { ids: ids.subarray(start, end), counts: counts ? counts.subarray(start, end) : null });
+    }
+    return new Postings(map);
+  }
+
+  get(term) {
+    return this.map.get(term) || null;
+  }
+}
+
+export class ColumnarCatalog {
+  /**
+   * @param {object} columns - header fields plus the section arrays (see open / fromJson)
+   */
+  constructor(columns) {
+    Object.assign(this, columns);
+    this.companyCodes = new Map(this.companies.map((company, code) => [company, code]));
+  }
+
+  /** Catalog over an artifact file (one read; sections are views into it) */
+  static open(filePath) {
+    let buffer = fs.readFileSync(filePath);
+    if (buffer.toString('latin1', 0, MAGIC.length) !== MAGIC) {
+      throw new Error(`${filePath}: not a commission columnar file`);
+    }
+    // Float64 / BigInt64 views need an 8-byte aligned start
+    if (buffer.byteOffset % 8 !== 0) buffer = Buffer.from(new Uint8Array(buffer).buffer);
+
+    const headerLength = buffer.readUInt32LE(MAGIC.length);
+    const dataStart = MAGIC.length + 4 + headerLength;
+    const header = JSON.parse(buffer.toString('utf-8', MAGIC.length + 4, dataStart));
+    if (header.version !== FORMAT_VERSION) {
+      throw new Error(`unsupported columnar format version ${header.version}`);
+    }
+
+    const s = {};
+    for (const [name, spec] of Object.entries(header.sections)) {
+      const ArrayType = TYPED_ARRAYS[spec.dtype];
+      if (!ArrayType) throw new Error(`unsupported section dtype ${spec.dtype} (${name})`);
+      const count = spec.shape.reduce((a, b) => a * b, 1);
+      const view = new ArrayType(buffer.buffer, buffer.byteOffset + dataStart + spec.offset, count);
+      // int64 sections are offsets / row numbers: plain numbers are exact below 2^53
+      s[name] = ArrayType === BigInt64Array ? Float64Array.from(view, Number) : view;
+    }
+
+    const strings = name => new StringTable(s[`${name}_blob`], s[`${name}_offsets`]);
+    const postings = (name, withCounts = false) => Postings.fromSections(
+      strings(`${name}_terms`), s[`${name}_offsets`], s[`${name}_ids`], withCounts ? s[`${name}_counts`] : null
+    );
+
+    return new ColumnarCatalog({
+      source: filePath,
+      keys: header.keys,
+      companies: header.companies.map(([company]) => company),
+      companyInfo: Object.fromEntries(header.companies),
+      periods: header.periods,
+      sourceMetadata: header.source_metadata,
+      indexMetadata: header.index_metadata,
+      rates: s.rates,
+      mask: s.mask,
+      keyOrderValues: s.key_order,
+      keyOrderOffsets: s.key_order_offsets,
+      companyCode: s.company,
+      periodCode: s.period,
+      rowNumber: s.row_number,
+      conversionRate: s.conversion_rate,
+      nameLength: s.name_length,
+      names: strings('names'),
+      namesNormalized: strings('names_normalized'),
+      keywords: strings('keywords'),
+      productKeywordCodes: s.product_keywords,
+      productKeywordOffsets: s.product_keywords_offsets,
+      keywordOccurrences: s.keyword_occurrences,
+      keywordFirstSeen: s.keyword_first_seen,
+      unigrams: postings('unigram', true),
+      bigrams: postings('bigram'),
+      keywordPostings: postings('keyword_postings')
+    });
+  }
+
+  /** Same catalog built in memory from the two JSON files (build_columnar in commission_columnar.py) */
+  static fromJson(baseData, metadataIndex, source = null) {
+    const baseProducts = [];
+    for (const [company, companyData] of Object.entries(baseData.companies)) {
+      for (const product of companyData.products) baseProducts.push([company, product]);
+    }
+    const products = metadataIndex.products;
+    if (baseProducts.length !== products.length || baseProducts.some(([company, p], i) =>
+      company !== products[i].company || p.row_number !== products[i].row_number)) {
+      throw new Error('commission data and metadata index list different products');
+    }
+
+    const n = products.length;
+    const keys = new Map();
+    for (const [, product] of baseProducts) {
+      for (const key of Object.keys(product.base_commission_rates)) {
+        if (!keys.has(key)) keys.set(key, keys.size);
+      }
+    }
+    const companies = Object.keys(metadataIndex.companies);
+    for (const [company] of baseProducts) {
+      if (!companies.includes(company)) companies.push(company);
+    }
+    const companyCodes = new Map(companies.map((company, code) => [company, code]));
+
+    const k = keys.size;
+    const rates = new Float64Array(n * k);
+    const mask = new Uint8Array(n * k);
+    const keyOrder = [];
+    const keyOrderOffsets = new Float64Array(n + 1);
+    const companyCode = new Int32Array(n);
+    const periodCode = new Int32Array(n);
+    const rowNumber = new Float64Array(n);
+    const conversionRate = new Float64Array(n);
+    const periods = [];
+    const periodCodes = new Map();
+    const productKeywords = [];
+    const productKeywordOffsets = new Float64Array(n + 1);
+    const unigrams = new Map();
+    const bigrams = new Map();
+    const keywordPostings = new Map();
+    const add = (map, term, i, count = null) => {
+      if (!map.has(term)) map.set(term, { ids: [], counts: count === null ? null : [] });
+      const posting = map.get(term);
+      posting.ids.push(i);
+      if (count !== null) posting.counts.push(count);
+    };
+
+    baseProducts.forEach(([company, base], i) => {
+      const product = products[i];
+      for (const [key, value] of Object.entries(base.base_commission_rates)) {
+        if (value === null || value === undefined) continue;
+        const column = keys.get(key);
+        rates[i * k + column] = value;
+        mask[i * k + column] = 1;
+        keyOrder.push(column);
+      }
+      keyOrderOffsets[i + 1] = keyOrder.length;
+
+      companyCode[i] = companyCodes.get(company);
+      const periodKey = JSON.stringify([product.payment_period, product.payment_period_normalized]);
+      if (!periodCodes.has(periodKey)) {
+        periodCodes.set(periodKey, periods.length);
+        periods.push([product.payment_period, product.payment_period_normalized]);
+      }
+      periodCode[i] = periodCodes.get(periodKey);
+      rowNumber[i] = product.row_number;
+      conversionRate[i] = product.metadata['환산율'];
+
+      productKeywords.push(...product.keywords);
+      productKeywordOffsets[i + 1] = productKeywords.length;
+      for (const keyword of new Set(product.keywords)) add(keywordPostings, keyword, i);
+
+      const name = product.product_name_normalized;
+      const counts = new Map();
+      for (const ch of name.split('')) counts.set(ch, (counts.get(ch) || 0) + 1);
+      for (const [ch, count] of counts) add(unigrams, ch, i, count);
+      const grams = new Set();
+      for (let g = 0; g < name.length - 1; g++) grams.add(name.slice(g, g + 2));
+      for (const gram of grams) add(bigrams, gram, i);
+    });
+
+    const sortedKeywords = [...new Set(productKeywords)].sort();
+    const keywordRank = new Map(sortedKeywords.map((keyword, rank) => [keyword, rank]));
+    const occurrences = new Int32Array(sortedKeywords.length);
+    const firstSeen = new Float64Array(sortedKeywords.length).fill(-1);
+    productKeywords.forEach((keyword, position) => {
+      const rank = keywordRank.get(keyword);
+      occurrences[rank] += 1;
+      if (firstSeen[rank] < 0) firstSeen[rank] = position;
+    });
+    const typed = map => {
+      for (const posting of map.values()) {
+        posting.ids = Int32Array.from(posting.ids);
+        if (posting.counts) posting.counts = Int32Array.from(posting.counts);
+      }
+      return new Postings(map);
+    };
+
+    return new ColumnarCatalog({
+      source,
+      keys: [...keys.keys()],
+      companies,
+      companyInfo: Object.fromEntries(companies.map(c => [c, metadataIndex.companies[c] || {}])),
+      periods,
+      sourceMetadata: baseData.metadata || {},
+      indexMetadata: metadataIndex.metadata || {},
+      rates,
+      mask,
+      keyOrderValues: Int32Array.from(keyOrder),
+      keyOrderOffsets,
+      companyCode,
+      periodCode,
+      rowNumber,
+      conversionRate,
+      nameLength: Int32Array.from(products, p => p.product_name_normalized.length),
+      names: StringTable.of(products.map(p => p.product_name)),
+      namesNormalized: StringTable.of(products.map(p => p.product_name_normalized)),
+      keywords: StringTable.of(sortedKeywords),
+      productKeywordCodes: Int32Array.from(productKeywords, keyword => keywordRank.get(keyword)),
+      productKeywordOffsets,
+      keywordOccurrences: occurrences,
+      keywordFirstSeen: firstSeen,
+      unigrams: typed(unigrams),
+      bigrams: typed(bigrams),
+      keywordPostings: typed(keywordPostings)
+    });
+  }
+
+  get length() {
+    return this.rowNumber.length;
+  }
+
+  company(i) {
+    return this.companies[this.companyCode[i]];
+  }
+
+  paymentPeriod(i) {
+    return this.periods[this.periodCode[i]][0];
+  }
+
+  paymentPeriodNormalized(i) {
+    return this.periods[this.periodCode[i]][1];
+  }
+
+  productKeywords(i) {
+    const codes = this.productKeywordCodes.subarray(this.productKeywordOffsets[i], this.productKeywordOffsets[i + 1]);
+    return Array.from(codes, code => this.keywords.get(code));
+  }
+
+  metadata(i) {
+    return {
+      '상품명': this.names.get(i),
+      '납입기간': this.paymentPeriod(i),
+      '환산율': this.conversionRate[i]
+    };
+  }
+
+  /** Metadata-index product object (commission_metadata_index.json shape) */
+  product(i) {
+    return {
+      product_name: this.names.get(i),
+      product_name_normalized: this.namesNormalized.get(i),
+      payment_period: this.paymentPeriod(i),
+      payment_period_normalized: this.paymentPeriodNormalized(i),
+      company: this.company(i),
+      row_number: this.rowNumber[i],
+      keywords: this.productKeywords(i),
+      metadata: this.metadata(i)
+    };
+  }
+
+  /** Base (60%) rates in the product's own key order */
+  baseRates(i) {
+    const rates = {};
+    const row = i * this.keys.length;
+    for (let p = this.keyOrderOffsets[i]; p < this.keyOrderOffsets[i + 1]; p++) {
+      const column = this.keyOrderValues[p];
+      rates[this.keys[column]] = this.rates[row + column];
+    }
+    return rates;
+  }
+
+  /** Product position of (company, rowNumber), or -1 */
+  findRow(company, rowNumber) {
+    const code = this.companyCodes.get(company);
+    if (code === undefined) return -1;
+    for (let i = 0; i < this.length; i++) {
+      if (this.companyCode[i] === code && this.rowNumber[i] === rowNumber) return i;
+    }
+    return -1;
+  }
+}
+
+/** Files loadCatalog reads for a data directory (COMMISSION_DATA_FORMAT, like commission_index.data_files) */
+export function dataFiles(dataDir) {
+  const columnar = path.join(dataDir, COLUMNAR_FILE);
+  const jsonFiles = [path.join(dataDir, BASE_DATA_FILE), path.join(dataDir, METADATA_INDEX_FILE)];
+  if (DATA_FORMAT === 'json') return jsonFiles;
+  if (DATA_FORMAT === 'columnar') return [columnar];
+  if (fs.existsSync(columnar)) {
+    const mtime = fs.statSync(columnar).mtimeMs;
+    if (jsonFiles.every(file => !fs.existsSync(file) || fs.statSync(file).mtimeMs <= mtime)) return [columnar];
+  }
+  return jsonFiles;
+}
+
+/** Catalog for a data directory: the columnar artifact, or built from the JSON files */
+export function loadCatalog(dataDir) {
+  const files = dataFiles(dataDir);
+  if (files.length === 1) return ColumnarCatalog.open(files[0]);
+  const [baseFile, indexFile] = files;
+  return ColumnarCatalog.fromJson(
+    JSON.parse(fs.readFileSync(baseFile, 'utf-8')),
+    JSON.parse(fs.readFileSync(indexFile, 'utf-8')),
+    baseFile
+  );
+}
@@ -0,0 +1,74 @@
+#!/usr/bin/env node
+/**
+ * Long-lived commission query worker (JSON lines over stdin/stdout)
+ *
+ * Loads the base commission data and metadata index once, then answers
+ * requests until stdin closes. stdout carries protocol lines only; all
+ * logging (including the query system's console.log) goes to stderr.
+ *
+ * Request:  {"id": "1", "method": "query", "query": "약속플러스 5년납 60%"}
+ *           {"id": "2", "method": "ping"}
+ * Response: {"id": "1", "ok": true, "result": {...executeQuery result...}}
+ *           {"id": "1", "ok": false, "error": "..."}
+ * On startup the worker writes {"event": "ready", "products": N, "data_dir": ...}
+ * (or {"event": "fatal", "error": "..."} and exits). The data directory comes
+ * from COMMISSION_DATA_DIR (one dataset version per worker generation).
+ */
+
+import readline from 'readline';
+
+// Keep stdout for the protocol
+console.log = (...args) => console.error(...args);
+console.info = console.log;
+
+function send(message) {
+  process.stdout.write(JSON.stringify(message) + '\n');
+}
+
+async function main() {
+  let system;
+  try {
+    const { NaturalLanguageCommissionSystem } = await import('./nl_query_system_dynamic.js');
+    system = new NaturalLanguageCommissionSystem();
+  } catch (error) {
+    send({ event: 'fatal', error: error.message });
+    process.exit(1);
+  }
+
+  const startedAt = Date.now();
+  let served = 0;
+  send({ event: 'ready', products: system.totalProducts, data_dir: system.dataDir, pid: process.pid });
+
+  const rl = readline.createInterface({ input: process.stdin, crlfDelay: Infinity });
+
+  rl.on('line', async (line) => {
+    if (!line.trim()) return;
+
+    let request;
+    try {
+      request = JSON.parse(line);
+    } catch (error) {
+      send({ id: null, ok: false, error: `Invalid JSON: ${error.message}` });
+      return;
+    }
+
+    const { id, method } = request;
+    try {
+      if (method === 'ping') {
+        send({ id, ok: true, result: { uptime_ms: Date.now() - startedAt, served, rss: process.memoryUsage().rss } });
+      } else if (method === 'query') {
+        const result = await system.executeQuery(String(request.query ?? ''));
+        served += 1;
+        send({ id, ok: true, result });
+      } else {
+        send({ id, ok: false, error: `Unknown method: ${method}` });
+      }
+    } catch (error) {
+      send({ id, ok: false, error: error.message });
+    }
+  });
+
+  rl.on('close', () => process.exit(0));
+}
+
+main();
@@ -0,0 +1,134 @@
+/**
+ * Local first-tier parser for commission queries
+ *
+ * Parses percentage / payment period with regexes, company aliases derived
+ * from the index companies (turned into company_hint) and the remaining
+ * tokens minus stopwords as product keywords. The result is accepted when
+ * the keywords resolve to one product through the search index (the best
+ * match contains or lists every keyword and no other product name doing so
+ * scores within AMBIGUITY_MARGIN); otherwise the caller escalates to Gemini.
+ *
+ * Python counterpart: commission_query_parser.py
+ */
+
+import { normalize } from './product_search_index.js';
+
+const AMBIGUITY_MARGIN = 1.0;
+
+const PERCENT = /(\d+)\s*(?:%|프로|퍼센트|퍼|프)/;
+const PERIOD = /(\d+)\s*년\s*납|(일시|전기|평생)\s*납/;
+const TOKEN_SPLIT = /[\s,?!.]+/;
+const COMPANY_SUFFIX = /(생명|손해보험|화재|손보|해상|라이프)$/;
+
+const STOPWORDS = new Set([
+  '수수료', '수수료율', '수수료는', '수수료가', '요율', '지급률', '지급율', '시책',
+  '알려줘', '알려주세요', '알려', '얼마', '얼마야', '얼마예요', '얼마인가요', '얼마임',
+  '조회', '조회해줘', '기준', '상품', '보험사', '좀', '은', '는', '의',
+  '익월', '초년도', '환산율'
+]);
+const PARTICLES = ['은', '는', '을', '를', '의'];
+
+const EXTRA_COMPANY_ALIASES = {
+  'kb생명': 'KB라이프', 'kb손보': 'KB손해보험', 'db손보': 'DB손해보험', '한화손보': '한화손해보험',
+  '미래에셋생명': '미래에셋', '라이나': '라이나손보', '라이나생명': '라이나손보',
+  '아이엠라이프': 'IM라이프', '메리츠': '메리츠화재', '현대': '현대해상'
+};
+
+/** Lowercase alias -> company hint (a substring of one or more company names) */
+export function companyAliases(companies) {
+  const aliases = new Map();
+  for (const company of companies) {
+    aliases.set(company.toLowerCase(), company);
+    const short = company.replace(COMPANY_SUFFIX, '');
+    if (short && short !== company && !aliases.has(short.toLowerCase())) {
+      aliases.set(short.toLowerCase(), short);
+    }
+  }
+  for (const [alias, hint] of Object.entries(EXTRA_COMPANY_ALIASES)) {
+    if (companies.some(company => company.includes(hint)) && !aliases.has(alias)) {
+      aliases.set(alias, hint);
+    }
+  }
+  return aliases;
+}
+
+function covers(product, keywordNorms) {
+  const name = product.product_name_normalized;
+  return keywordNorms.every(k => name.includes(k) || product.keywords.includes(k));
+}
+
+export class LocalQueryParser {
+  constructor(companies, searchIndex) {
+    this.searchIndex = searchIndex;
+    this.aliases = [...companyAliases(companies)].sort((a, b) => b[0].length - a[0].length);
+  }
+
+  _splitCompany(token) {
+    const lowered = token.toLowerCase();
+    for (const [alias, hint] of this.aliases) {
+      if (lowered.startsWith(alias)) return [hint, token.slice(alias.length)];
+    }
+    return [null, token];
+  }
+
+  /** Parse into the parseWithGemini result shape (parsed_by 'local') */
+  extract(query) {
+    const result = {
+      product_keywords: [],
+      payment_period: null,
+      percentage: null,
+      company_hint: null,
+      query_type: 'commission_lookup',
+      confidence: 0.6,
+      parsed_by: 'local'
+    };
+
+    let text = String(query);
+    const pctMatch = text.match(PERCENT);
+    if (pctMatch) {
+      const pct = parseInt(pctMatch[1], 10);
+      if (pct >= 1 && pct <= 200) result.percentage = pct;
+      text = text.slice(0, pctMatch.index) + ' ' + text.slice(pctMatch.index + pctMatch[0].length);
+    }
+
+    const periodMatch = text.match(PERIOD);
+    if (periodMatch) {
+      result.payment_period = periodMatch[1] ? `${periodMatch[1]}년납` : `${periodMatch[2]}납`;
+      text = text.slice(0, periodMatch.index) + ' ' + text.slice(periodMatch.index + periodMatch[0].length);
+    }
+
+    for (let token of text.split(TOKEN_SPLIT)) {
+      const [hint, rest] = this._splitCompany(token);
+      token = rest;
+      if (hint && result.company_hint === null) result.company_hint = hint;
+      if (token.length > 2 && PARTICLES.some(p => token.endsWith(p)) && !this.searchIndex.containsAny(token)) {
+        token = token.slice(0, -1);
+      }
+      if (token.length > 1 && !STOPWORDS.has(token.toLowerCase())) {
+        result.product_keywords.push(token);
+      }
+    }
+    return result;
+  }
+
+  /** {parsed, accepted}: accepted when the keywords resolve to one product */
+  parse(query) {
+    const parsed = this.extract(query);
+    const keywordNorms = parsed.product_keywords.map(normalize);
+    if (keywordNorms.length === 0) return { parsed, accepted: false };
+
+    const matches = this.searchIndex.search(parsed.product_keywords, parsed.payment_period, parsed.company_hint);
+    if (matches.length === 0 || !covers(matches[0], keywordNorms)) return { parsed, accepted: false };
+
+    const best = matches[0];
+    for (const other of matches.slice(1)) {
+      if (best.match_score - other.match_score >= AMBIGUITY_MARGIN) break;
+      if (other.product_name_normalized !== best.product_name_normalized && covers(other, keywordNorms)) {
+        return { parsed, accepted: false };
+      }
+    }
+
+    parsed.confidence = 0.95;
+    return { parsed, accepted: true };
+  }
+}
@@ -10,6 +10,10 @@ import fs from 'fs';
 import path from 'path';
 import { fileURLToPath } from 'url';
 
+import { LocalQueryParser } from './local_query_parser.js';
+import { ProductSearchIndex } from './product_search_index.js';
+import { dataFiles, loadCatalog } from './commission_columnar.js';
+
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = path.dirname(__filename);
 
@@ -17,13 +21,36 @@ const __dirname = path.dirname(__filename);
 import dotenv from 'dotenv';
 dotenv.config({ path: path.join(__dirname, '.env') });
 
-// Data files (NEW: smaller base-only file)
-const BASE_COMMISSION_DATA_PATH = path.join(__dirname, '../data/commission_data_base_60pct_only.json');
-const METADATA_INDEX_PATH = path.join(__dirname, '../data/commission_metadata_index.json');
+// Data directory: COMMISSION_DATA_DIR (set by commission_service per dataset),
+// else the active dataset (data/datasets/active.json), else data/
+function resolveDataDir() {
+  if (process.env.COMMISSION_DATA_DIR) return process.env.COMMISSION_DATA_DIR;
+  const datasetsDir = process.env.COMMISSION_DATASETS_DIR || path.join(__dirname, '../data/datasets');
+  try {
+    const { version } = JSON.parse(fs.readFileSync(path.join(datasetsDir, 'active.json'), 'utf-8'));
+    if (version) return path.join(datasetsDir, version);
+  } catch (error) {
+    // No dataset activated yet
+  }
+  return path.join(__dirname, '../data');
+}
+
+const DATA_DIR = resolveDataDir();
+
+// Gemini parse results kept per normalized query (LRU)
+const PARSE_CACHE_SIZE = parseInt(process.env.COMMISSION_PARSE_CACHE_SIZE || '512', 10);
+
+// Local parser first, Gemini only for ambiguous queries
+const FAST_PARSE = !['0', 'false', 'no'].includes((process.env.COMMISSION_FAST_PARSE || 'true').toLowerCase());
+
+function normalizeQuery(query) {
+  return String(query).toLowerCase().trim().replace(/\s+/g, ' ');
+}
 
 class GeminiQueryParser {
   constructor(apiKey) {
     this.apiKey = apiKey || process.env.GEMINI_API_KEY;
+    this.cache = new Map();
 
     if (!this.apiKey) {
       console.log('⚠️  GEMINI_API_KEY not set. Using rule-based parsing.');
@@ -42,9 +69,18 @@ class GeminiQueryParser {
     }
   }
 
-  async parseWithGemini(query, metadataSample) {
+  async parseWithGemini(query, metadataSample, fallback = null) {
     if (!this.useGemini) {
-      return this._ruleBasedParse(query);
+      return fallback || this._ruleBasedParse(query);
+    }
+
+    const cacheKey = normalizeQuery(query);
+    const cached = this.cache.get(cacheKey);
+    if (cached) {
+      this.cache.delete(cacheKey);
+      this.cache.set(cacheKey, cached);
+      console.log('   ♻️  Parse cache hit');
+      return structuredClone(cached);
     }
 
     // Build comprehensive prompt with metadata
@@ -132,15 +168,20 @@ IMPORTANT: Return ONLY the JSON object, no other text.`;
       if (jsonMatch) {
         const parsed = JSON.parse(jsonMatch[0]);
         parsed.parsed_by = 'gemini';
+        // Only Gemini results are cached - a fallback after an error is retried next time
+        this.cache.set(cacheKey, structuredClone(parsed));
+        if (this.cache.size > PARSE_CACHE_SIZE) {
+          this.cache.delete(this.cache.keys().next().value);
+        }
         return parsed;
       }
 
-      console.log('⚠️  Could not parse Gemini response, using rule-based');
-      return this._ruleBasedParse(query);
+      console.log('⚠️  Could not parse Gemini response, using fallback parse');
+      return fallback || this._ruleBasedParse(query);
 
     } catch (error) {
-      console.log(`⚠️  Gemini error: ${error.message}, using rule-based`);
-      return this._ruleBasedParse(query);
+      console.log(`⚠️  Gemini error: ${error.message}, using fallback parse`);
+      return fallback || this._ruleBasedParse(query);
     }
   }
 
@@ -182,18 +223,23 @@ class NaturalLanguageCommissionSystem {
   constructor() {
     console.log('📂 Loading base data...');
 
-    // Load BASE commission data (60% only)
-    this.baseCommissionData = JSON.parse(
-      fs.readFileSync(BASE_COMMISSION_DATA_PATH, 'utf-8')
-    );
+    // Base (60%) rates + metadata index as one catalog: the columnar artifact
+    // (commission_data_columnar.bin) when present, else built from the JSON files
+    const files = dataFiles(DATA_DIR);
+    this.catalog = loadCatalog(DATA_DIR);
+    this.totalProducts = this.catalog.indexMetadata.total_products ?? this.catalog.length;
 
-    // Load metadata index
-    this.index = JSON.parse(
-      fs.readFileSync(METADATA_INDEX_PATH, 'utf-8')
-    );
+    this.dataDir = DATA_DIR;
+    console.log(`✅ Loaded ${this.totalProducts} products from ${this.catalog.companies.length} companies (${DATA_DIR})`);
+
+    // Candidate-generation index for fuzzy matching
+    this.searchIndex = new ProductSearchIndex(this.catalog);
+    this.localParser = new LocalQueryParser(this.catalog.companies, this.searchIndex);
 
-    console.log(`✅ Loaded ${this.index.metadata.total_products} products from ${this.index.metadata.total_companies} companies`);
-    console.log(`📊 Base data size: ${(fs.statSync(BASE_COMMISSION_DATA_PATH).size / (1024 * 1024)).toFixed(2)} MB`);
+    // Gemini prompt context - fixed for the loaded data, so computed once
+    this.metadataSample = this.getMetadataSample();
+    const dataSize = files.reduce((total, file) => total + fs.statSync(file).size, 0);
+    console.log(`📊 Base data size: ${(dataSize / (1024 * 1024)).toFixed(2)} MB (${files.map(f => path.basename(f)).join(' + ')})`);
     console.log(`🎯 Supported range: 50-90% (calculated on-the-fly)`);
 
     // Initialize parser
@@ -223,9 +269,7 @@ class NaturalLanguageCommissionSystem {
   }
 
   getCommissionData(company, rowNumber, percentage) {
-    const companyData = this.baseCommissionData.companies[company];
-
-    if (!companyData) {
+    if (!(company in this.catalog.companyInfo)) {
       return { error: `Company '${company}' not found` };
     }
 
@@ -235,14 +279,14 @@ class NaturalLanguageCommissionSystem {
     }
 
     // Find product by row number
-    const product = companyData.products.find(p => p.row_number === rowNumber);
+    const i = this.catalog.findRow(company, rowNumber);
 
-    if (!product) {
+    if (i < 0) {
       return { error: `Product not found at row ${rowNumber}` };
     }
 
     // CALCULATE commission rates on-the-fly
-    const baseRates = product.base_commission_rates;
+    const baseRates = this.catalog.baseRates(i);
     const calculation = this.calculateCommissionAtPercentage(baseRates, percentage);
 
     return {
@@ -251,141 +295,62 @@ class NaturalLanguageCommissionSystem {
       multiplier_ratio: calculation.multiplier,
       calculation_formula: calculation.formula,
       product: {
-        row_number: product.row_number,
-        metadata: product.metadata,
+        row_number: this.catalog.rowNumber[i],
+        metadata: this.catalog.metadata(i),
         commission_rates: calculation.calculated_rates  // Dynamically calculated!
       }
     };
   }
 
-  // ... (rest of the methods stay the same)
-  // Copying from original nl_query_system.js
-  fuzzyMatchProduct(keywords, paymentPeriod = null, companyHint = null) {
-    const candidates = [];
-
-    for (const product of this.index.products) {
-      let score = 0;
-      const productName = product.product_name_normalized;
-      const productPeriod = product.payment_period_normalized;
-
-      // Keyword matching
-      for (const keyword of keywords) {
-        const keywordNorm = keyword.toLowerCase().replace(/\s/g, '');
-
-        // Exact match in product name
-        if (productName.includes(keywordNorm)) {
-          score += 1.0;
-        }
-
-        // Fuzzy match
-        const similarity = this._stringSimilarity(keywordNorm, productName);
-        score += similarity * 0.5;
-
-        // Keyword list match
-        if (product.keywords.includes(keywordNorm)) {
-          score += 0.8;
-        }
-      }
-
-      // Payment period match
-      if (paymentPeriod && productPeriod) {
-        const periodNorm = paymentPeriod.toLowerCase().replace(/\s/g, '');
-        if (productPeriod.includes(periodNorm)) {
-          score += 2.0;
-        }
-      }
-
-      // Company hint match
-      if (companyHint && product.company.includes(companyHint)) {
-        score += 1.5;
-      }
-
-      if (score > 0) {
-        candidates.push({
-          ...product,
-          match_score: score
-        });
-      }
-    }
-
-    return candidates.sort((a, b) => b.match_score - a.match_score);
-  }
-
-  _stringSimilarity(str1, str2) {
-    const longer = str1.length > str2.length ? str1 : str2;
-    const shorter = str1.length > str2.length ? str2 : str1;
-
-    if (longer.length === 0) return 1.0;
-
-    const editDistance = this._levenshteinDistance(longer, shorter);
-    return (longer.length - editDistance) / longer.length;
-  }
-
-  _levenshteinDistance(str1, str2) {
-    const matrix = [];
-
-    for (let i = 0; i <= str2.length; i++) {
-      matrix[i] = [i];
-    }
-
-    for (let j = 0; j <= str1.length; j++) {
-      matrix[0][j] = j;
-    }
-
-    for (let i = 1; i <= str2.length; i++) {
-      for (let j = 1; j <= str1.length; j++) {
-        if (str2.charAt(i - 1) === str1.charAt(j - 1)) {
-          matrix[i][j] = matrix[i - 1][j - 1];
-        } else {
-          matrix[i][j] = Math.min(
-            matrix[i - 1][j - 1] + 1,
-            matrix[i][j - 1] + 1,
-            matrix[i - 1][j] + 1
-          );
-        }
-      }
-    }
-
-    return matrix[str2.length][str1.length];
+  /**
+   * Top products by keyword / period / company score.
+   * Served by the n-gram candidate index (same scores and order as a full scan).
+   */
+  fuzzyMatchProduct(keywords, paymentPeriod = null, companyHint = null, limit = 5) {
+    return this.searchIndex.search(keywords, paymentPeriod, companyHint, limit);
   }
 
   getMetadataSample() {
+    const catalog = this.catalog;
+
     // Sample products from each company
     const companySamples = {};
-    for (const [companyName, companyInfo] of Object.entries(this.index.companies).slice(0, 5)) {
-      const products = this.index.products.filter(p => p.company === companyName);
-      companySamples[companyName] = products.slice(0, 3).map(p => ({
-        name: p.product_name.substring(0, 60),
-        period: p.payment_period,
-        keywords: p.keywords.slice(0, 3)
-      }));
-    }
+    catalog.companies.slice(0, 5).forEach((companyName, code) => {
+      const samples = [];
+      for (let i = 0; i < catalog.length && samples.length < 3; i++) {
+        if (catalog.companyCode[i] !== code) continue;
+        samples.push({
+          name: catalog.names.get(i).substring(0, 60),
+          period: catalog.paymentPeriod(i),
+          keywords: catalog.productKeywords(i).slice(0, 3)
+        });
+      }
+      companySamples[companyName] = samples;
+    });
 
-    // Top payment periods
-    const periodCounts = {};
-    this.index.products.forEach(p => {
-      periodCounts[p.payment_period] = (periodCounts[p.payment_period] || 0) + 1;
+    // Top payment periods (counted per distinct period; ties keep first-seen order)
+    const periodCounts = new Map();
+    const perCode = new Int32Array(catalog.periods.length);
+    for (let i = 0; i < catalog.length; i++) perCode[catalog.periodCode[i]] += 1;
+    catalog.periods.forEach(([period], code) => {
+      periodCounts.set(period, (periodCounts.get(period) || 0) + perCode[code]);
     });
-    const topPeriods = Object.entries(periodCounts)
+    const topPeriods = [...periodCounts.entries()]
       .sort((a, b) => b[1] - a[1])
       .slice(0, 15)
       .map(([period]) => period);
 
-    // Top keywords
-    const keywordCounts = {};
-    this.index.products.forEach(p => {
-      p.keywords.forEach(kw => {
-        keywordCounts[kw] = (keywordCounts[kw] || 0) + 1;
-      });
-    });
-    const topKeywords = Object.entries(keywordCounts)
+    // Top keywords (in first-seen order before sorting by count, like the product scan)
+    const keywordOrder = Array.from(catalog.keywordFirstSeen.keys())
+      .sort((a, b) => catalog.keywordFirstSeen[a] - catalog.keywordFirstSeen[b]);
+    const topKeywords = keywordOrder
+      .map(k => [catalog.keywords.get(k), catalog.keywordOccurrences[k]])
       .sort((a, b) => b[1] - a[1])
       .slice(0, 20)
       .map(([kw]) => kw);
 
     // Product types
-    const types = [...new Set(this.index.products.map(p => {
-      const name = p.product_name;
+    const types = [...new Set(Array.from(catalog.names, name => {
       if (name.includes('종신')) return '종신보험';
       if (name.includes('변액')) return '변액연금';
       if (name.includes('건강')) return '건강보험';
@@ -395,8 +360,8 @@ class NaturalLanguageCommissionSystem {
     }).filter(Boolean))].slice(0, 10);
 
     return {
-      companies: Object.keys(this.index.companies),
-      total_products: this.index.metadata.total_products,
+      companies: catalog.companies,
+      total_products: this.totalProducts,
       common_payment_periods: topPeriods,
       top_keywords: topKeywords,
       product_types: types,
@@ -409,10 +374,12 @@ class NaturalLanguageCommissionSystem {
     console.log(`🔍 Query: ${query}`);
     console.log('='.repeat(80));
 
-    // Parse with Gemini
-    console.log('\n📝 Step 1: Parsing with Gemini...');
-    const metadataSample = this.getMetadataSample();
-    const parsed = await this.parser.parseWithGemini(query, metadataSample);
+    // Local parse first; Gemini only when it does not resolve to one product
+    console.log('\n📝 Step 1: Parsing query...');
+    const local = FAST_PARSE ? this.localParser.parse(query) : null;
+    const parsed = local && local.accepted
+      ? local.parsed
+      : await this.parser.parseWithGemini(query, this.metadataSample, local ? local.parsed : null);
 
     console.log(`   Parsed by: ${parsed.parsed_by}`);
     console.log(`   Keywords: ${JSON.stringify(parsed.product_keywords)}`);
@@ -440,7 +407,7 @@ class NaturalLanguageCommissionSystem {
       };
     }
 
-    console.log(`   Found ${matches.length} matches`);
+    console.log(`   Top ${matches.length} matches`);
 
     // Top matches
     const topMatches = matches.slice(0, 5);
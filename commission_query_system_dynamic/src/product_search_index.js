@@ -0,0 +1,295 @@
+/**
+ * Candidate-generation index for fuzzy product matching
+ *
+ * Returns the same top-k as the full fuzzyMatchProduct scan (same scores,
+ * same tie order) while computing edit distances for a handful of products:
+ *
+ * - character (unigram) postings with per-name counts give every product's
+ *   shared-character count with a keyword; since distance >= longer - shared,
+ *   similarity <= shared / longer (exactly 0 without shared characters)
+ * - bigram postings generate "contains" candidates (verified with includes)
+ * - both postings and the keyword postings come precomputed with the
+ *   ColumnarCatalog (commission_columnar.js)
+ * - period / company bonuses come from the distinct period / company values
+ * - products are visited by descending score upper bound; edit distances use
+ *   a bounded two-row DP with early exit against the current top-k (a
+ *   min-heap), and the visit stops once the bound drops below the k-th score
+ *
+ * Python counterpart: product_search_index.py
+ */
+
+const EPS = 1e-9;
+const KEYWORD_CACHE_SIZE = 1024;
+
+export function normalize(text) {
+  return String(text).toLowerCase().replace(/\s/g, '');
+}
+
+/**
+ * Edit distance with two rows; returns maxDistance + 1 as soon as the
+ * distance is known to exceed maxDistance (null: exact).
+ */
+export function boundedLevenshtein(a, b, maxDistance = null) {
+  if (a.length < b.length) [a, b] = [b, a];
+  if (maxDistance !== null && a.length - b.length > maxDistance) return maxDistance + 1;
+  if (b.length === 0) return a.length;
+
+  let previous = new Int32Array(b.length + 1);
+  let current = new Int32Array(b.length + 1);
+  for (let j = 0; j <= b.length; j++) previous[j] = j;
+
+  for (let i = 1; i <= a.length; i++) {
+    current[0] = i;
+    let rowMin = i;
+    const ca = a.charCodeAt(i - 1);
+    for (let j = 1; j <= b.length; j++) {
+      const value = Math.min(
+        previous[j - 1] + (ca === b.charCodeAt(j - 1) ? 0 : 1),
+        current[j - 1] + 1,
+        previous[j] + 1
+      );
+      current[j] = value;
+      if (value < rowMin) rowMin = value;
+    }
+    if (maxDistance !== null && rowMin > maxDistance) return maxDistance + 1;
+    [previous, current] = [current, previous];
+  }
+  return previous[b.length];
+}
+
+function charCounts(text) {
+  const counts = new Map();
+  for (const ch of text.split('')) counts.set(ch, (counts.get(ch) || 0) + 1);
+  return counts;
+}
+
+// Min-heap of [score, -index]; heap[0] is the current k-th best
+function isBetter(x, y) {
+  return x[0] > y[0] || (x[0] === y[0] && x[1] > y[1]);
+}
+
+class TopK {
+  constructor(limit) {
+    this.limit = limit;
+    this.heap = [];
+  }
+
+  get full() {
+    return this.heap.length === this.limit;
+  }
+
+  get min() {
+    return this.heap[0];
+  }
+
+  offer(entry) {
+    const heap = this.heap;
+    if (heap.length < this.limit) {
+      heap.push(entry);
+      let i = heap.length - 1;
+      while (i > 0) {
+        const parent = (i - 1) >> 1;
+        if (!isBetter(heap[parent], heap[i])) break;
+        [heap[parent], heap[i]] = [heap[i], heap[parent]];
+        i = parent;
+      }
+    } else if (this.limit > 0 && isBetter(entry, heap[0])) {
+      heap[0] = entry;
+      let i = 0;
+      for (;;) {
+        const left = 2 * i + 1;
+        const right = left + 1;
+        let smallest = i;
+        if (left < heap.length && isBetter(heap[smallest], heap[left])) smallest = left;
+        if (right < heap.length && isBetter(heap[smallest], heap[right])) smallest = right;
+        if (smallest === i) break;
+        [heap[smallest], heap[i]] = [heap[i], heap[smallest]];
+        i = smallest;
+      }
+    }
+  }
+
+  sorted() {
+    return [...this.heap].sort((x, y) => (isBetter(x, y) ? -1 : 1));
+  }
+}
+
+export class ProductSearchIndex {
+  /**
+   * @param {ColumnarCatalog} catalog - products, normalized names and n-gram postings
+   */
+  constructor(catalog) {
+    this.catalog = catalog;
+    this.names = catalog.namesNormalized;
+    this.nameLengths = catalog.nameLength;
+    this.unigrams = catalog.unigrams;        // char -> {ids, counts}
+    this.bigrams = catalog.bigrams;          // bigram -> {ids}
+    this.keywordIds = catalog.keywordPostings;
+    this.keywordCache = new Map();
+  }
+
+  /** {contains, listed, similarity} upper bounds over all products for one keyword (LRU cached) */
+  keywordBounds(keyword) {
+    const cached = this.keywordCache.get(keyword);
+    if (cached) {
+      this.keywordCache.delete(keyword);
+      this.keywordCache.set(keyword, cached);
+      return cached;
+    }
+
+    const n = this.catalog.length;
+    const contains = new Uint8Array(n);
+    if (keyword.length === 0) {
+      contains.fill(1);
+    } else if (keyword.length === 1) {
+      const posting = this.unigrams.get(keyword);
+      if (posting) for (const i of posting.ids) contains[i] = 1;
+    } else {
+      const grams = new Set();
+      for (let k = 0; k < keyword.length - 1; k++) grams.add(keyword.slice(k, k + 2));
+      const postings = [...grams].map(g => this.bigrams.get(g));
+      if (postings.every(Boolean)) {
+        postings.sort((x, y) => x.ids.length - y.ids.length);
+        let ids = Array.from(postings[0].ids);
+        for (const other of postings.slice(1)) {
+          const members = new Set(other.ids);
+          ids = ids.filter(i => members.has(i));
+        }
+        for (const i of ids) {
+          if (this.names.get(i).includes(keyword)) contains[i] = 1;
+        }
+      }
+    }
+
+    const listed = new Uint8Array(n);
+    const keywordPosting = this.keywordIds.get(keyword);
+    if (keywordPosting) for (const i of keywordPosting.ids) listed[i] = 1;
+
+    const shared = new Int32Array(n);
+    for (const [ch, count] of charCounts(keyword)) {
+      const posting = this.unigrams.get(ch);
+      if (!posting) continue;
+      for (let p = 0; p < posting.ids.length; p++) {
+        shared[posting.ids[p]] += Math.min(posting.counts[p], count);
+      }
+    }
+    const similarity = new Float64Array(n);
+    for (let i = 0; i < n; i++) {
+      const longer = Math.max(this.nameLengths[i], keyword.length);
+      similarity[i] = longer > 0 ? shared[i] / longer : 1.0;
+    }
+
+    const bounds = { contains, listed, similarity };
+    this.keywordCache.set(keyword, bounds);
+    if (this.keywordCache.size > KEYWORD_CACHE_SIZE) {
+      this.keywordCache.delete(this.keywordCache.keys().next().value);
+    }
+    return bounds;
+  }
+
+  /** Whether any product name contains the (normalized) keyword */
+  containsAny(keyword) {
+    return this.keywordBounds(normalize(keyword)).contains.some(Boolean);
+  }
+
+  /**
+   * Top products by fuzzyMatchProduct score (score > 0 only), best first,
+   * each as {...product, match_score}.
+   */
+  search(keywords, paymentPeriod = null, companyHint = null, limit = 5) {
+    const catalog = this.catalog;
+    const n = catalog.length;
+    const keywordNorms = (keywords || []).map(normalize);
+    const bounds = keywordNorms.map(k => this.keywordBounds(k));
+
+    // Bonuses by dictionary code: distinct periods / companies are matched once
+    const periodMatch = new Uint8Array(n);
+    if (paymentPeriod) {
+      const periodNorm = normalize(paymentPeriod);
+      const codes = new Set();
+      catalog.periods.forEach(([, period], code) => {
+        if (period && period.includes(periodNorm)) codes.add(code);
+      });
+      for (let i = 0; i < n; i++) periodMatch[i] = codes.has(catalog.periodCode[i]) ? 1 : 0;
+    }
+    const companyMatch = new Uint8Array(n);
+    if (companyHint) {
+      const codes = new Set();
+      catalog.companies.forEach((company, code) => {
+        if (company.includes(companyHint)) codes.add(code);
+      });
+      for (let i = 0; i < n; i++) companyMatch[i] = codes.has(catalog.companyCode[i]) ? 1 : 0;
+    }
+
+    const upper = new Float64Array(n);
+    const candidates = [];
+    for (let i = 0; i < n; i++) {
+      let bound = periodMatch[i] * 2.0 + companyMatch[i] * 1.5;
+      for (const b of bounds) {
+        bound += b.contains[i] * 1.0 + b.similarity[i] * 0.5 + b.listed[i] * 0.8;
+      }
+      upper[i] = bound;
+      if (bound > 0) candidates.push(i);
+    }
+    candidates.sort((x, y) => upper[y] - upper[x] || x - y);
+
+    const top = new TopK(limit);
+    for (const i of candidates) {
+      let bound = upper[i];
+      const threshold = top.full ? top.min[0] : null;
+      if (threshold !== null && bound + EPS < threshold) break;
+
+      const name = this.names.get(i);
+      const similarities = [];
+      let pruned = false;
+      for (let k = 0; k < keywordNorms.length; k++) {
+        const keyword = keywordNorms[k];
+        const longer = Math.max(name.length, keyword.length);
+        const simBound = bounds[k].similarity[i];
+        if (longer === 0) {
+          similarities.push(1.0);
+          continue;
+        }
+        if (simBound === 0) {
+          similarities.push(0.0);
+          continue;
+        }
+        let maxDistance = null;
+        if (threshold !== null) {
+          maxDistance = Math.floor(longer * (1.0 - simBound + 2.0 * (bound - threshold)) + EPS);
+          if (maxDistance < 0) {
+            pruned = true;
+            break;
+          }
+        }
+        const distance = boundedLevenshtein(keyword, name, maxDistance);
+        if (maxDistance !== null && distance > maxDistance) {
+          pruned = true;
+          break;
+        }
+        const similarity = (longer - distance) / longer;
+        bound -= 0.5 * (simBound - similarity);
+        similarities.push(similarity);
+      }
+      if (pruned) continue;
+
+      // Same accumulation order as the full scan (identical floats)
+      let score = 0;
+      for (let k = 0; k < bounds.length; k++) {
+        if (bounds[k].contains[i]) score += 1.0;
+        score += similarities[k] * 0.5;
+        if (bounds[k].listed[i]) score += 0.8;
+      }
+      if (periodMatch[i]) score += 2.0;
+      if (companyMatch[i]) score += 1.5;
+      if (score <= 0) continue;
+
+      top.offer([score, -i]);
+    }
+
+    return top.sorted().map(([score, negIndex]) => ({
+      ...catalog.product(-negIndex),
+      match_score: score
+    }));
+  }
+}
@@ -24,7 +24,8 @@ class Colors:
 def load_excel_data():
     """Load Excel file and extract test data"""
     print(f"{Colors.BLUE}Loading Excel file...{Colors.RESET}")
-    wb = openpyxl.load_workbook('data/file.xlsx', data_only=True)
+    # Read-only: rows are streamed from the sheet XML instead of loading every cell
+    wb = openpyxl.load_workbook('data/file.xlsx', read_only=True, data_only=True)
     return wb
 
 def load_json_data():
@@ -36,28 +37,32 @@ def load_json_data():
 def extract_excel_product_data(wb, company: str, row: int) -> Dict:
     """Extract product data from Excel for validation"""
     ws = wb[company]
+    values = next(ws.iter_rows(min_row=row, max_row=row, values_only=True), ())
+
+    def cell(col: int):
+        return values[col - 1] if col <= len(values) else None
 
     # Product metadata
-    product_name = ws.cell(row, 1).value  # Column A
-    payment_period = ws.cell(row, 2).value  # Column B
-    conversion_rate = ws.cell(row, 5).value  # Column E (환산율)
+    product_name = cell(1)  # Column A
+    payment_period = cell(2)  # Column B
+    conversion_rate = cell(5)  # Column E (환산율)
 
     # Commission values at 60% (FC 수수료 columns)
     # Column F (6): 초년도 익월
     # Column H (8): 2차년도 13회차
     # Column AJ (36): FC계 (Total)
 
-    초년도_60 = ws.cell(row, 6).value  # F
-    차년도2_60 = ws.cell(row, 8).value  # H
-    total_60 = ws.cell(row, 36).value  # AJ
+    초년도_60 = cell(6)  # F
+    차년도2_60 = cell(8)  # H
+    total_60 = cell(36)  # AJ
 
     # Get 총량 values (100% base) for calculation verification
     # Column BW (75): 총량 초년도
     # Column BY (77): 총량 2차년도
     # Column CC (81): 총량 Total
-    총량_초년도 = ws.cell(row, 75).value  # BW
-    총량_2차년도 = ws.cell(row, 77).value  # BY
-    총량_total = ws.cell(row, 81).value  # CC
+    총량_초년도 = cell(75)  # BW
+    총량_2차년도 = cell(77)  # BY
+    총량_total = cell(81)  # CC
 
     return {
         'product_name': product_name,
@@ -0,0 +1,210 @@
+"""
+Columnar base-rate matrix for vectorized commission calculations.
+
+calculateCommissionAtPercentage walks one product's rate dict per request;
+questions such as "all KB라이프 products at 75%" or "this product at 50-90%"
+turn into loops over hundreds of dicts. RateMatrix works on the 60% base
+rates as a dense products x rate-keys float64 matrix (the rates section of
+the columnar catalog, see commission_columnar):
+
+- keys / key_index: column order (union of all rate keys, first-seen order)
+- mask: True where the product actually has that rate key (companies have
+  different FC column sets - absent cells are NaN in scaled output)
+- company / payment period codes and row numbers for slicing
+- each product's own key order (rate dicts come back in the same order as
+  the source JSON)
+
+Scaling to any set of percentages is one broadcast multiply
+(percentages x products x keys); the per-cell values are identical to the
+scalar base * (pct / 60) of the JS engine.
+"""
+
+import csv
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from commission_columnar import ColumnarCatalog
+
+BASE_PERCENTAGE = 60
+
+
+class RateMatrix:
+    """Dense products x rate-keys matrix of base (60%) commission rates."""
+
+    def __init__(self, catalog: ColumnarCatalog, product_ids: Optional[np.ndarray] = None,
+                 columns: Optional[np.ndarray] = None):
+        """
+        Args:
+            catalog: Commission products (columnar)
+            product_ids: Catalog rows in this matrix (default: all)
+            columns: Catalog rate-key columns in this matrix (default: all)
+        """
+        self.catalog = catalog
+        whole = product_ids is None and columns is None
+        self.product_ids = np.arange(len(catalog)) if product_ids is None else np.asarray(product_ids, dtype=np.int64)
+        self.columns = np.arange(len(catalog.keys)) if columns is None else np.asarray(columns, dtype=np.int64)
+        self.keys = [catalog.keys[c] for c in self.columns]
+        self.key_index = {key: i for i, key in enumerate(self.keys)}
+
+        if whole:
+            self.rates, self.mask = catalog.rates, catalog.mask
+        else:
+            grid = np.ix_(self.product_ids, self.columns)
+            self.rates, self.mask = catalog.rates[grid], catalog.mask[grid]
+        self.company_code = catalog.company_code[self.product_ids]
+        self.period_code = catalog.period_code[self.product_ids]
+        self.row_number = catalog.row_number[self.product_ids]
+
+        # Catalog column -> matrix column (-1 when dropped), for per-product key order
+        self._remap = np.full(len(catalog.keys), -1, dtype=np.int64)
+        self._remap[self.columns] = np.arange(len(self.columns))
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+    def company(self, i: int) -> str:
+        return self.catalog.companies[self.company_code[i]]
+
+    def payment_period(self, i: int):
+        return self.catalog.periods[self.period_code[i]][0]
+
+    def product_name(self, i: int) -> str:
+        return self.catalog.names[self.product_ids[i]]
+
+    def order(self, i: int) -> np.ndarray:
+        """Matrix columns of product i in the product's own key order."""
+        mapped = self._remap[self.catalog.key_order(self.product_ids[i])]
+        return mapped[mapped >= 0]
+
+    # ------------------------------------------------------------------
+    # Slicing
+    # ------------------------------------------------------------------
+
+    def row(self, company: str, row_number: int) -> Optional[int]:
+        """Matrix row of a product, or None."""
+        if company not in self.catalog.company_info:
+            return None
+        code = self.catalog.companies.index(company)
+        hits = np.flatnonzero((self.company_code == code) & (self.row_number == int(row_number)))
+        return int(hits[0]) if len(hits) else None
+
+    def select(self, company: Optional[Union[str, Iterable[str]]] = None,
+               payment_period: Optional[Union[str, Iterable[str]]] = None,
+               keys: Optional[Iterable[str]] = None,
+               rows: Optional[Sequence[int]] = None) -> "RateMatrix":
+        """
+        Sub-matrix by company, payment period (exact 납입기간 values), keys and/or rows.
+
+        Args:
+            company: Company name or names
+            payment_period: Payment period or periods (e.g. "20년납")
+            keys: Rate keys to keep (column order follows the argument)
+            rows: Explicit matrix rows (applied before the other filters)
+
+        Returns:
+            RateMatrix over the selected products / keys
+        """
+        selected = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=np.int64)
+        if company is not None:
+            wanted = [company] if isinstance(company, str) else list(company)
+            codes = [code for code, name in enumerate(self.catalog.companies) if name in wanted]
+            selected = selected[np.isin(self.company_code[selected], codes)]
+        if payment_period is not None:
+            wanted = [payment_period] if isinstance(payment_period, str) else list(payment_period)
+            codes = [code for code, (period, _) in enumerate(self.catalog.periods) if period in wanted]
+            selected = selected[np.isin(self.period_code[selected], codes)]
+
+        if keys is None:
+            columns = self.columns
+        else:
+            keys = list(keys)
+            unknown = [k for k in keys if k not in self.key_index]
+            if unknown:
+                raise KeyError(f"Unknown rate keys: {unknown}")
+            columns = self.columns[[self.key_index[k] for k in keys]]
+
+        return RateMatrix(self.catalog, self.product_ids[selected], columns)
+
+    # ------------------------------------------------------------------
+    # Scaling
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def multipliers(percentages) -> np.ndarray:
+        pct = np.atleast_1d(np.asarray(percentages, dtype=np.float64))
+        if ((pct < 1) | (pct > 200)).any():
+            raise ValueError(f"Percentages must be in range (1%-200%): {pct.tolist()}")
+        return pct / BASE_PERCENTAGE
+
+    def scale(self, percentages) -> np.ndarray:
+        """
+        Rates at one or more percentages (absent cells are NaN).
+
+        Args:
+            percentages: A percentage or a sequence of percentages (1-200)
+
+        Returns:
+            (products, keys) array for a scalar, (percentages, products, keys) otherwise
+        """
+        multipliers = self.multipliers(percentages)
+        scaled = self.rates[None, :, :] * multipliers[:, None, None]
+        scaled[:, ~self.mask] = np.nan
+        return scaled[0] if np.ndim(percentages) == 0 else scaled
+
+    def product_rates(self, company: str, row_number: int, percentage) -> Optional[Dict[str, float]]:
+        """Rates of one product at a percentage (present keys only), like calculated_rates."""
+        i = self.row(company, row_number)
+        if i is None:
+            return None
+        multiplier = self.multipliers(percentage)[0]
+        columns = self.order(i)
+        return {self.keys[c]: float(v) for c, v in zip(columns, self.rates[i, columns] * multiplier)}
+
+    # ------------------------------------------------------------------
+    # Bulk export
+    # ------------------------------------------------------------------
+
+    def rate_sheets(self, percentages: Sequence[float]) -> Dict[float, List[dict]]:
+        """Whole rate sheets at several percentages: {percentage: [row dict, ...]}."""
+        scaled = self.scale(list(percentages))
+        sheets = {}
+        for p, pct in enumerate(percentages):
+            sheet = []
+            for i in range(len(self)):
+                row = {
+                    "company": self.company(i),
+                    "row_number": int(self.row_number[i]),
+                    "product_name": self.product_name(i),
+                    "payment_period": self.payment_period(i),
+                }
+                for c in self.order(i):
+                    row[self.keys[c]] = float(scaled[p, i, c])
+                sheet.append(row)
+            sheets[pct] = sheet
+        return sheets
+
+    def export_csv(self, path: Union[str, Path], percentages: Sequence[float]) -> int:
+        """
+        Write rate sheets at several percentages to one CSV (utf-8-sig, for Excel).
+
+        Args:
+            path: Output file
+            percentages: Percentages to export
+
+        Returns:
+            Number of data rows written
+        """
+        scaled = self.scale(list(percentages))
+        written = 0
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["percentage", "company", "row_number", "product_name", "payment_period", *self.keys])
+            for p, pct in enumerate(percentages):
+                for i in range(len(self)):
+                    values = ["" if np.isnan(v) else repr(float(v)) for v in scaled[p, i]]
+                    writer.writerow([pct, self.company(i), int(self.row_number[i]),
+                                     self.product_name(i), self.payment_period(i), *values])
+                    written += 1
+        return written
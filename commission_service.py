@@ -1,16 +1,368 @@
 """
 Commission Service - Python Wrapper
 Calls the Node.js commission query system and formats results
+
+Queries go to a pool of long-lived Node workers (src/commission_worker.js)
+that load the commission data once and speak JSON lines with request ids over
+stdin/stdout. Dead or unresponsive workers are restarted by a periodic
+health check (ping) and on demand. COMMISSION_BACKEND=python answers in
+process from commission_index.CommissionIndex instead (no Node, no IPC).
+
+Both backends serve the active dataset (commission_datasets). Activating
+another version swaps the data without dropping requests: the Python index
+is replaced by reference, and the Node pool starts a new generation of
+workers on the new dataset directory, swaps it in and stops the old
+workers once their in-flight requests are answered. The pool notices
+activations made elsewhere (CLI) on its health check;
+start_dataset_watcher builds + activates workbooks dropped into the
+dataset inbox and reloads immediately.
 """
 
-import subprocess
+import itertools
 import json
 import os
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from pathlib import Path
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from commission_datasets import DatasetWatcher, active_data_dir
+
+load_dotenv()
 
 # Path to the commission system
 COMMISSION_SYSTEM_PATH = Path(__file__).parent / "commission_query_system_dynamic"
 COMMISSION_SCRIPT = COMMISSION_SYSTEM_PATH / "src" / "nl_query_system_dynamic.js"
+COMMISSION_WORKER_SCRIPT = COMMISSION_SYSTEM_PATH / "src" / "commission_worker.js"
+
+_DEFAULT_NODE = "/opt/bitnami/node/bin/node"
+NODE_BIN = os.getenv("NODE_BIN") or (_DEFAULT_NODE if os.path.exists(_DEFAULT_NODE) else shutil.which("node") or "node")
+POOL_SIZE = int(os.getenv("COMMISSION_WORKERS", "2"))
+QUERY_TIMEOUT = float(os.getenv("COMMISSION_QUERY_TIMEOUT", "30"))
+STARTUP_TIMEOUT = float(os.getenv("COMMISSION_WORKER_STARTUP_TIMEOUT", "30"))
+HEALTH_CHECK_INTERVAL = float(os.getenv("COMMISSION_HEALTH_CHECK_INTERVAL", "30"))
+PING_TIMEOUT = 5.0
+# Old workers get this long before draining starts (requests already routed to them)
+DRAIN_GRACE = 1.0
+# node: worker pool (nl_query_system_dynamic.js) | python: in-process CommissionIndex
+COMMISSION_BACKEND = os.getenv("COMMISSION_BACKEND", "node").lower()
+
+
+class CommissionWorkerError(Exception):
+    """A worker could not be started or did not answer."""
+
+
+class CommissionWorker:
+    """One Node process serving JSON-lines requests."""
+
+    def __init__(self, worker_id: int, data_dir: Optional[Path] = None):
+        self.worker_id = worker_id
+        self.data_dir = data_dir
+        self.pending = {}
+        self.stderr_tail = deque(maxlen=50)
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.ready = threading.Event()
+        self.ready_info = None
+        self.exited = False
+        env = dict(os.environ)
+        if data_dir is not None:
+            env["COMMISSION_DATA_DIR"] = str(data_dir)
+        try:
+            self.process = subprocess.Popen(
+                [NODE_BIN, str(COMMISSION_WORKER_SCRIPT)],
+                cwd=str(COMMISSION_SYSTEM_PATH),
+                env=env,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                encoding="utf-8",
+                bufsize=1
+            )
+        except OSError as e:
+            raise CommissionWorkerError(f"worker {worker_id} failed to start: {NODE_BIN}: {e}")
+        threading.Thread(target=self._read_stdout, daemon=True).start()
+        threading.Thread(target=self._read_stderr, daemon=True).start()
+
+        # ready is also set (without ready_info) when the process exits first
+        started = self.ready.wait(STARTUP_TIMEOUT)
+        info = self.ready_info or {}
+        if not started or info.get("event") != "ready":
+            error = info.get("error") or ("exited before ready" if started else "startup timeout")
+            self.stop()
+            raise CommissionWorkerError(f"worker {worker_id} failed to start: {error} | {' / '.join(self.stderr_tail)}")
+        print(f"[Commission] Worker {worker_id} ready (pid {self.process.pid}, {self.ready_info.get('products')} products, {self.ready_info.get('data_dir')})")
+
+    def _read_stdout(self):
+        for line in self.process.stdout:
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                self.stderr_tail.append(f"stdout: {line.strip()}")
+                continue
+            if "event" in message:
+                self.ready_info = message
+                self.ready.set()
+                continue
+            with self.lock:
+                future = self.pending.pop(message.get("id"), None)
+            if future is not None:
+                future.set_result(message)
+
+        # Process exited: fail everything still waiting
+        self.ready.set()
+        with self.lock:
+            self.exited = True
+            pending, self.pending = self.pending, {}
+        for future in pending.values():
+            future.set_exception(CommissionWorkerError(f"worker {self.worker_id} exited"))
+
+    def _read_stderr(self):
+        for line in self.process.stderr:
+            self.stderr_tail.append(line.rstrip())
+
+    @property
+    def alive(self) -> bool:
+        return not self.exited and self.process.poll() is None
+
+    @property
+    def load(self) -> int:
+        return len(self.pending)
+
+    def request(self, method: str, timeout: float, **params) -> dict:
+        """Send one request and wait for its response."""
+        request_id = str(next(self.ids))
+        future = Future()
+        with self.lock:
+            # Registered after the exit sweep, the future would never be answered
+            if self.exited:
+                raise CommissionWorkerError(f"worker {self.worker_id} exited")
+            self.pending[request_id] = future
+        try:
+            try:
+                self.process.stdin.write(json.dumps({"id": request_id, "method": method, **params}, ensure_ascii=False) + "\n")
+                self.process.stdin.flush()
+            except (OSError, ValueError) as e:
+                raise CommissionWorkerError(f"worker {self.worker_id} write failed: {e}")
+            # Outside the write handler: on Python 3.11+ the timeout is a builtin
+            # TimeoutError (an OSError) and must reach the caller as such
+            response = future.result(timeout=timeout)
+        finally:
+            with self.lock:
+                self.pending.pop(request_id, None)
+
+        if not response.get("ok"):
+            raise CommissionWorkerError(response.get("error", "unknown worker error"))
+        return response["result"]
+
+    def ping(self) -> bool:
+        try:
+            self.request("ping", timeout=PING_TIMEOUT)
+            return True
+        except Exception:
+            return False
+
+    def stop(self):
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=2)
+        except Exception:
+            self.process.kill()
+
+
+class CommissionWorkerPool:
+    """
+    Fixed-size pool of commission workers with health checks and restarts.
+
+    Worker processes are always started outside the pool lock (startup can
+    take up to STARTUP_TIMEOUT); the lock only guards swapping them into
+    their slot, so requests keep being routed to the live workers meanwhile.
+    """
+
+    def __init__(self, size: int = POOL_SIZE):
+        self.size = max(1, size)
+        self.data_dir = active_data_dir()
+        # Condition: _pick waits on it when no worker is alive during restarts
+        self.lock = threading.Condition()
+        self.reload_lock = threading.Lock()
+        self.restarting = set()
+        self.restarts = 0
+        self.workers = self._start_workers(self.data_dir)
+        threading.Thread(target=self._health_loop, daemon=True).start()
+
+    def _start_workers(self, data_dir: Path) -> list:
+        """A full set of workers on data_dir (all stopped again if one fails)."""
+        workers = []
+        try:
+            for slot in range(self.size):
+                workers.append(CommissionWorker(slot, data_dir))
+        except CommissionWorkerError:
+            for worker in workers:
+                worker.stop()
+            raise
+        return workers
+
+    def _restart(self, slot: int, workers: list, data_dir: Path):
+        """
+        Replace the worker in a slot the caller added to self.restarting.
+
+        The process is started without the pool lock; the swap is skipped (and
+        the new worker stopped) when the pool switched to another generation
+        of workers (reload) in the meantime.
+        """
+        worker = None
+        try:
+            worker = CommissionWorker(slot, data_dir)
+        finally:
+            stale = worker
+            with self.lock:
+                if self.workers is workers:
+                    self.restarting.discard(slot)
+                    if worker is not None:
+                        stale, workers[slot] = workers[slot], worker
+                        self.restarts += stale is not None
+                self.lock.notify_all()
+            if stale is not None:
+                stale.stop()
+
+    def _restart_quietly(self, slot: int, workers: list, data_dir: Path):
+        try:
+            self._restart(slot, workers, data_dir)
+        except Exception as e:
+            print(f"[Commission] Worker {slot} restart failed: {e}")
+
+    def _has_live_worker(self) -> bool:
+        return any(w is not None and w.alive for w in self.workers)
+
+    def _pick(self) -> CommissionWorker:
+        with self.lock:
+            workers, data_dir = self.workers, self.data_dir
+            dead = [slot for slot, w in enumerate(workers)
+                    if (w is None or not w.alive) and slot not in self.restarting]
+            self.restarting.update(dead)
+        for slot in dead:
+            print(f"[Commission] Restarting worker {slot}")
+            threading.Thread(target=self._restart_quietly, args=(slot, workers, data_dir), daemon=True).start()
+
+        with self.lock:
+            # Only waits when every worker is down; gives up once no restart is pending
+            self.lock.wait_for(lambda: self._has_live_worker() or not self.restarting, timeout=STARTUP_TIMEOUT)
+            live = [w for w in self.workers if w is not None and w.alive]
+        if not live:
+            raise CommissionWorkerError("no commission worker available")
+        return min(live, key=lambda w: w.load)
+
+    def reload(self, data_dir: Optional[Path] = None) -> bool:
+        """
+        Serve another dataset (default: the active one) without dropping requests.
+
+        A full set of new workers is started on the new data directory while
+        the old ones keep serving; then the sets are swapped and the old
+        workers are stopped once their in-flight requests are answered.
+
+        Returns:
+            True if the pool switched datasets
+        """
+        data_dir = data_dir or active_data_dir()
+        with self.reload_lock:
+            if data_dir == self.data_dir:
+                return False
+            workers = self._start_workers(data_dir)
+            with self.lock:
+                old, self.workers, self.data_dir = self.workers, workers, data_dir
+                # Restarts still running belong to the old generation
+                self.restarting = set()
+                self.lock.notify_all()
+        print(f"[Commission] Worker pool switched to {data_dir}")
+        threading.Thread(target=self._drain, args=(old,), daemon=True).start()
+        return True
+
+    @staticmethod
+    def _drain(workers):
+        time.sleep(DRAIN_GRACE)
+        deadline = time.time() + QUERY_TIMEOUT
+        while time.time() < deadline and any(w is not None and w.alive and w.load for w in workers):
+            time.sleep(0.1)
+        for worker in workers:
+            if worker is not None:
+                worker.stop()
+
+    def _health_loop(self):
+        while True:
+            time.sleep(HEALTH_CHECK_INTERVAL)
+            # Dataset activated by another process (CLI / watcher elsewhere)
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"[Commission] Dataset reload failed - keeping {self.data_dir}: {e}")
+            for slot in range(self.size):
+                worker = self.workers[slot]
+                if worker is not None and worker.alive and worker.ping():
+                    continue
+                with self.lock:
+                    if slot in self.restarting:
+                        continue
+                    self.restarting.add(slot)
+                    workers, data_dir = self.workers, self.data_dir
+                print(f"[Commission] Worker {slot} failed health check - restarting")
+                try:
+                    self._restart(slot, workers, data_dir)
+                except Exception as e:
+                    # Never let a failed restart end the health check thread
+                    print(f"[Commission] Worker {slot} restart failed: {e}")
+
+    def query(self, user_query: str, timeout: float = QUERY_TIMEOUT) -> dict:
+        for attempt in range(self.size + 1):
+            worker = self._pick()
+            try:
+                return worker.request("query", timeout=timeout, query=user_query)
+            except CommissionWorkerError:
+                if worker.alive or attempt == self.size:
+                    raise
+                # The worker died mid-request: retry on another (or a restarted) one
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool() -> CommissionWorkerPool:
+    """Process-wide worker pool, started on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = CommissionWorkerPool()
+        return _pool
+
+
+def reload_commission_data(manifest: Optional[dict] = None):
+    """Switch serving to the active dataset; in-flight requests finish on the old data."""
+    if COMMISSION_BACKEND == "python":
+        from commission_index import reload_commission_index
+
+        reload_commission_index()
+    elif _pool is not None:
+        _pool.reload()
+
+
+_watcher = None
+
+
+def start_dataset_watcher() -> DatasetWatcher:
+    """Build + activate workbooks dropped into the dataset inbox, then reload (once per process)."""
+    global _watcher
+    with _pool_lock:
+        if _watcher is None:
+            _watcher = DatasetWatcher(on_activate=reload_commission_data).start()
+        return _watcher
 
 
 def query_commission(user_query: str) -> dict:
@@ -26,64 +378,16 @@ def query_commission(user_query: str) -> dict:
     try:
         print(f"[Commission] Querying: {user_query}")
 
-        # Create a temporary script to run the commission query
-        temp_script = COMMISSION_SYSTEM_PATH / "temp_query.js"
-        script_content = f"""
-import {{ NaturalLanguageCommissionSystem }} from './src/nl_query_system_dynamic.js';
-
-async function main() {{
-    const system = new NaturalLanguageCommissionSystem();
-    const result = await system.executeQuery('{user_query}');
-    console.log('__RESULT_START__');
-    console.log(JSON.stringify(result, null, 2));
-    console.log('__RESULT_END__');
-}}
-
-main().catch(error => {{
-    console.error('Error:', error);
-    process.exit(1);
-}});
-"""
+        if COMMISSION_BACKEND == "python":
+            from commission_index import get_commission_index
 
-        # Write temporary script
-        temp_script.write_text(script_content, encoding='utf-8')
-
-        # Run the Node.js script (use full path to node)
-        result = subprocess.run(
-            ['/opt/bitnami/node/bin/node', str(temp_script)],
-            cwd=str(COMMISSION_SYSTEM_PATH),
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
-
-        # Clean up temp file
-        if temp_script.exists():
-            temp_script.unlink()
-
-        # Parse output
-        output = result.stdout
-
-        # Extract JSON result
-        if '__RESULT_START__' in output and '__RESULT_END__' in output:
-            start_idx = output.index('__RESULT_START__') + len('__RESULT_START__')
-            end_idx = output.index('__RESULT_END__')
-            json_str = output[start_idx:end_idx].strip()
-
-            commission_result = json.loads(json_str)
-            print(f"[Commission] Query successful: {commission_result['status']}")
-            return commission_result
+            commission_result = get_commission_index().execute_query(user_query)
         else:
-            print(f"[Commission] Failed to parse output")
-            print(f"[Commission] stdout: {output}")
-            print(f"[Commission] stderr: {result.stderr}")
-            return {
-                'status': 'error',
-                'message': '수수료 정보를 가져오는 데 실패했습니다.',
-                'error': 'Parse error'
-            }
-
-    except subprocess.TimeoutExpired:
+            commission_result = get_worker_pool().query(user_query)
+        print(f"[Commission] Query successful: {commission_result['status']}")
+        return commission_result
+
+    except FutureTimeoutError:
         print("[Commission] Timeout error")
         return {
             'status': 'error',
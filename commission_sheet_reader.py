@@ -0,0 +1,300 @@
+"""
+Streaming reader for the commission workbook (file.xlsx).
+
+The regeneration and analysis scripts used to load every sheet as a whole
+pandas DataFrame (read_excel(header=None)), and the Excel validation tests
+load the whole workbook with openpyxl.load_workbook(data_only=True). Both keep
+every cell of a sheet (or of the workbook) in memory, which grows with the
+FC column range (FC계 spans up to 60 columns) and with the number of months
+merged into one workbook.
+
+CommissionSheetReader opens the workbook in openpyxl read-only mode (sheet
+XML is parsed as rows are iterated) and reads a sheet in two passes:
+
+1. detect_layout: only the first HEAD_ROWS rows - the rate marker
+   ('0.6' / '0.65' in rows 8-9) is the FC start column, the 'FC계' header
+   (or, without one, the last numeric column of the first product rows) the
+   FC end column, and header rows 8-10 give the rate key of every FC column
+2. iter_products: rows from the sheet's data start row, in blocks of
+   CHUNK_ROWS; product rows and their numeric FC cells are selected by
+   column slicing within the block and yielded as compact ProductRow records
+
+Peak memory is the workbook's shared strings plus one block of
+CHUNK_ROWS x (FC end column) cells, whatever the sheet length or the number
+of sheets.
+
+Cells are converted like pandas' openpyxl reader (empty / error / NA strings
+-> None, integral numbers -> int), and numeric header cells are rendered as
+floats ('13.0', as they came out of the float64 DataFrame columns), so rate
+keys and the regenerated JSON stay unchanged.
+"""
+
+from collections import Counter
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import openpyxl
+from openpyxl.cell.cell import ERROR_CODES
+
+HEAD_ROWS = 25
+CHUNK_ROWS = 512
+RATE_MARKERS = ('0.6', '0.65')
+SKIP_PRODUCT_WORDS = ('합계', 'subtotal', 'total', '소계', '상품명', '상품분류')
+
+# pandas' default NA strings (read_excel turns these cells into NaN)
+NA_STRINGS = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+}
+
+
+def col_name(idx: int) -> str:
+    """Convert column index to Excel column name"""
+    if idx < 26:
+        return chr(65 + idx)
+    first = (idx - 26) // 26
+    second = (idx - 26) % 26
+    return chr(65 + first) + chr(65 + second)
+
+
+def _convert(value):
+    """Cell value as the DataFrame reader saw it (None for empty / error / NA cells)."""
+    if isinstance(value, str):
+        return None if value in NA_STRINGS or value in ERROR_CODES else value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and value == value
+
+
+_number_mask = np.frompyfunc(_is_number, 1, 1)
+
+
+def _block(rows: List[tuple], width: int, header: bool = False) -> np.ndarray:
+    """Rows as a rows x width object array (None padded)."""
+    block = np.full((len(rows), width), None, dtype=object)
+    for r, row in enumerate(rows):
+        for c, value in enumerate(row[:width]):
+            value = _convert(value)
+            if header and _is_number(value):
+                value = float(value)
+            block[r, c] = value
+    return block
+
+
+def _text(head: np.ndarray, row_idx: int, col_idx: int) -> str:
+    if row_idx >= head.shape[0] or col_idx >= head.shape[1] or head[row_idx, col_idx] is None:
+        return ''
+    return str(head[row_idx, col_idx])
+
+
+@dataclass
+class SheetLayout:
+    """FC column range and rate keys of one sheet."""
+
+    fc_start: int
+    fc_end: int
+    rate: str
+    fc_end_from_header: bool
+    keys: List[str]
+
+    @property
+    def num_cols(self) -> int:
+        return self.fc_end - self.fc_start + 1
+
+    def fc_info(self) -> dict:
+        return {'fc_start': self.fc_start, 'fc_end': self.fc_end, 'num_cols': self.num_cols}
+
+
+@dataclass
+class ProductRow:
+    """One product row: metadata cells and the numeric FC cells as (column offset, value)."""
+
+    row_number: int
+    product_name: str
+    payment_period: object
+    conversion_rate: object
+    fc_values: Tuple[Tuple[int, float], ...]
+
+    def commission_rates(self, layout: SheetLayout) -> Dict[str, float]:
+        """Rate dict in sheet column order; the FC계 column also yields Total."""
+        rates = {}
+        last = layout.fc_end - layout.fc_start
+        for offset, value in self.fc_values:
+            if offset == last:
+                rates["FC계"] = value
+                rates["Total"] = value
+            rates[layout.keys[offset]] = value
+        return rates
+
+
+def find_fc_columns(head: np.ndarray) -> Optional[Tuple[int, int, str, bool]]:
+    """(fc_start, fc_end, rate marker, fc_end found by header) from the head block, or None."""
+    n_rows, n_cols = head.shape
+
+    # Rate column (0.6 or 0.65)
+    fc_start = rate = None
+    for col_idx in range(min(20, n_cols)):
+        for row_idx in (7, 8):
+            if _text(head, row_idx, col_idx) in RATE_MARKERS:
+                fc_start, rate = col_idx, _text(head, row_idx, col_idx)
+                break
+        if fc_start:
+            break
+    if fc_start is None:
+        return None
+
+    # Method 1: FC계 header
+    scan_end = min(fc_start + 60, n_cols)
+    for col_idx in range(fc_start, scan_end):
+        if any(_text(head, row_idx, col_idx) in ('FC계', 'FC 계') for row_idx in (7, 8, 9, 10)):
+            return fc_start, col_idx, rate, True
+
+    # Method 2: most common last numeric column of the first product rows (rows 11-25)
+    data_start_rows = []
+    for idx in range(10, min(HEAD_ROWS, n_rows)):
+        for col in (0, 1):
+            value = head[idx, col] if col < n_cols else None
+            if isinstance(value, str) and len(value) > 3:
+                if '합계' not in value and '상품명' not in value:
+                    data_start_rows.append(idx)
+                break
+        if len(data_start_rows) >= 5:
+            break
+
+    last_numeric_cols = []
+    for row_idx in data_start_rows:
+        consecutive_empty = 0
+        last_numeric = None
+        for col_idx in range(fc_start, scan_end):
+            value = head[row_idx, col_idx]
+            if _is_number(value) and value != 0:
+                last_numeric = col_idx
+                consecutive_empty = 0
+            else:
+                consecutive_empty += 1
+                if consecutive_empty >= 3:
+                    break
+        if last_numeric:
+            last_numeric_cols.append(last_numeric)
+
+    if last_numeric_cols:
+        return fc_start, Counter(last_numeric_cols).most_common(1)[0][0], rate, False
+    return None
+
+
+def header_keys(head: np.ndarray, fc_start: int, fc_end: int) -> List[str]:
+    """Rate key of every FC column from header rows 8-10."""
+    keys = []
+    for col_idx in range(fc_start, min(fc_end + 1, head.shape[1])):
+        if col_idx == fc_end:
+            keys.append("FC계")
+            continue
+        key_parts = []
+        if col_idx == fc_start and '수수료' in _text(head, 7, col_idx):
+            key_parts.append("2025년 FC 수수료_0.6")
+        for row_idx in (8, 9):
+            value = head[row_idx, col_idx] if row_idx < head.shape[0] else None
+            # Falsy cells (0, '') are skipped like empty ones
+            if value and str(value).strip():
+                key_parts.append(str(value).strip())
+        keys.append("_".join(key_parts) if key_parts else f"col_{col_idx}")
+    return keys
+
+
+class CommissionSheetReader:
+    """Read-only, streaming access to the commission workbook."""
+
+    def __init__(self, xlsx_path: Union[str, Path]):
+        self.workbook = openpyxl.load_workbook(xlsx_path, read_only=True, data_only=True)
+
+    @property
+    def sheet_names(self) -> List[str]:
+        return self.workbook.sheetnames
+
+    def close(self):
+        self.workbook.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def detect_layout(self, sheet: str) -> Optional[SheetLayout]:
+        """
+        First pass: FC column range and rate keys from the first HEAD_ROWS rows.
+
+        Args:
+            sheet: Sheet (company) name
+
+        Returns:
+            SheetLayout, or None when the sheet has no FC columns
+        """
+        rows = list(self.workbook[sheet].iter_rows(max_row=HEAD_ROWS, values_only=True))
+        width = max((len(row) for row in rows), default=0)
+        head = _block(rows, width, header=True)
+
+        found = find_fc_columns(head)
+        if not found:
+            return None
+        fc_start, fc_end, rate, from_header = found
+        return SheetLayout(fc_start, fc_end, rate, from_header, header_keys(head, fc_start, fc_end))
+
+    def iter_products(self, sheet: str, layout: SheetLayout, data_start_row: int,
+                      product_col: int, payment_col: int, rate_col: int) -> Iterator[ProductRow]:
+        """
+        Second pass: product rows (name of 3+ characters, not a total / header
+        row, at least one numeric FC cell), streamed in CHUNK_ROWS blocks.
+
+        Args:
+            sheet: Sheet (company) name
+            layout: Result of detect_layout
+            data_start_row: First data row (1-based)
+            product_col / payment_col / rate_col: 0-based columns of 상품명 / 납입기간 / 환산율
+
+        Yields:
+            ProductRow per product, in sheet order
+        """
+        fc_stop = layout.fc_start + len(layout.keys)
+        width = max(fc_stop, product_col + 1, payment_col + 1, rate_col + 1)
+        rows = self.workbook[sheet].iter_rows(min_row=data_start_row, values_only=True)
+
+        first_row = data_start_row
+        while True:
+            chunk = list(islice(rows, CHUNK_ROWS))
+            if not chunk:
+                break
+            block = _block(chunk, width)
+            names = block[:, product_col]
+            fc_block = block[:, layout.fc_start:fc_stop]
+
+            is_product = np.array([
+                isinstance(name, str) and len(name) >= 3
+                and not any(word in name.lower() for word in SKIP_PRODUCT_WORDS)
+                for name in names
+            ], dtype=bool)
+            numeric = _number_mask(fc_block).astype(bool) if fc_block.size else np.zeros(fc_block.shape, dtype=bool)
+
+            for r in np.flatnonzero(is_product & numeric.any(axis=1)):
+                columns = np.flatnonzero(numeric[r])
+                yield ProductRow(
+                    row_number=first_row + int(r),
+                    product_name=names[r],
+                    payment_period=block[r, payment_col],
+                    conversion_rate=block[r, rate_col],
+                    fc_values=tuple((int(c), float(fc_block[r, c])) for c in columns),
+                )
+            first_row += len(chunk)
+
+    def row_values(self, sheet: str, row_number: int) -> tuple:
+        """Raw cell values of one row (1-based), streamed up to that row."""
+        for row in self.workbook[sheet].iter_rows(min_row=row_number, max_row=row_number, values_only=True):
+            return row
+        return ()
@@ -0,0 +1,123 @@
+"""
+Context assembly for Gemini: cross-granularity deduplication + token budget.
+
+The ultra-granular Hanwha index stores the same facts at several
+granularities (table_cell_commission < table_row_summary < table_full <
+page_full), so a top-10 retrieval is often the same rows several times over.
+Before formatting, matches are grouped by document / page / table / row:
+- a row summary makes the cells of its row redundant (it lists every value
+  with its label); several cells of a row without a summary are all kept
+- table_full / page_full are dropped when a finer chunk of the same table or
+  page was retrieved
+- chunks with identical text are kept once
+The surviving matches are then packed in score order under a token budget.
+"""
+
+import os
+import re
+from typing import Callable, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Approximate token budget for the retrieved context (0 = unlimited)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "6000"))
+
+_HANGUL = re.compile(r"[가-힣㄰-㆏]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough Gemini token estimate: ~1 token per Hangul syllable, ~4 characters per token otherwise."""
+    hangul = len(_HANGUL.findall(text))
+    return hangul + (len(text) - hangul + 3) // 4
+
+
+def _document(meta: dict) -> str:
+    return meta.get('document_title') or meta.get('source_file') or meta.get('title') or ''
+
+
+def _text(meta: dict) -> str:
+    return meta.get('searchable_text') or meta.get('natural_description') or meta.get('full_text') or meta.get('text') or ''
+
+
+def select_matches(matches) -> List:
+    """
+    Drop matches made redundant by another retrieved chunk, preserving order.
+
+    Args:
+        matches: Retrieved matches (best first)
+
+    Returns:
+        The non-redundant matches, in their original order
+    """
+    rows_with_summary = set()
+    finer_tables = set()
+    finer_pages = set()
+
+    for match in matches:
+        meta = match.metadata or {}
+        chunk_type = meta.get('chunk_type')
+        doc, page, table = _document(meta), meta.get('page_number'), meta.get('table_index')
+
+        if chunk_type == 'table_row_summary':
+            rows_with_summary.add((doc, page, table, meta.get('row_index')))
+        if chunk_type in ('table_cell_commission', 'table_row_summary', 'table_column_summary'):
+            finer_tables.add((doc, page, table))
+        if chunk_type not in (None, 'page_full') and page is not None:
+            finer_pages.add((doc, page))
+
+    selected = []
+    seen_texts = set()
+    for match in matches:
+        meta = match.metadata or {}
+        chunk_type = meta.get('chunk_type')
+        doc, page, table = _document(meta), meta.get('page_number'), meta.get('table_index')
+
+        if chunk_type == 'table_cell_commission' and (doc, page, table, meta.get('row_index')) in rows_with_summary:
+            continue
+        if chunk_type == 'table_full' and (doc, page, table) in finer_tables:
+            continue
+        if chunk_type == 'page_full' and (doc, page) in finer_pages:
+            continue
+
+        text = _text(meta)
+        if text:
+            if text in seen_texts:
+                continue
+            seen_texts.add(text)
+
+        selected.append(match)
+
+    return selected
+
+
+def pack_context(matches, format_block: Callable, token_budget: Optional[int] = None) -> List[str]:
+    """
+    Format non-redundant matches in order until the token budget is used up.
+
+    Args:
+        matches: Retrieved matches (best first)
+        format_block: Callable (number, match) -> formatted context block
+        token_budget: Approximate token limit (default: RAG_CONTEXT_TOKEN_BUDGET, 0 = unlimited)
+
+    Returns:
+        List of formatted blocks (the best match is always included)
+    """
+    token_budget = CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget
+    selected = select_matches(matches)
+
+    blocks = []
+    used = 0
+    for match in selected:
+        block = format_block(len(blocks) + 1, match)
+        cost = estimate_tokens(block)
+        if blocks and token_budget and used + cost > token_budget:
+            # A smaller block further down may still fit
+            continue
+        blocks.append(block)
+        used += cost
+
+    print(f"   📦 컨텍스트 구성: {len(matches)}개 중 중복 제거 후 {len(selected)}개, "
+          f"예산 내 {len(blocks)}개 (약 {used} 토큰)")
+    return blocks
@@ -0,0 +1,223 @@
+"""
+Persistent embedding cache shared by the serving path and the ingestion scripts.
+
+Vectors are content-addressed by (model, dimensions, sha256(text)) and stored as
+compact float32 or float16 blobs in a local SQLite file, with an in-memory LRU
+tier in front of it. Repeated queries and unchanged chunks never hit the
+OpenAI embeddings API again.
+"""
+
+import os
+import sqlite3
+import struct
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SCRIPT_DIR = Path(__file__).parent
+
+# Configuration
+CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+CACHE_PATH = Path(os.getenv("EMBEDDING_CACHE_PATH", str(SCRIPT_DIR / ".cache" / "embeddings.sqlite3")))
+CACHE_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE", "float32")  # float32 | float16
+CACHE_MEMORY_ITEMS = int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", "1024"))
+
+# OpenAI accepts up to 2048 inputs per embeddings.create call
+EMBEDDING_BATCH_SIZE = 256
+
+_DTYPE_FORMATS = {"float32": "f", "float16": "e"}
+
+
+def cache_key(model: str, dimensions: Optional[int], text: str) -> str:
+    """Content address for one embedding: model, dimensions and text hash."""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{model}:{dimensions or 'default'}:{digest}"
+
+
+def _encode(vector, dtype: str) -> bytes:
+    fmt = _DTYPE_FORMATS[dtype]
+    return struct.pack(f"<{len(vector)}{fmt}", *vector)
+
+
+def _decode(blob: bytes, dtype: str) -> array:
+    fmt = _DTYPE_FORMATS[dtype]
+    count = len(blob) // struct.calcsize(fmt)
+    # array('f') keeps the memory tier at 4 bytes per dimension
+    return array("f", struct.unpack(f"<{count}{fmt}", blob))
+
+
+class EmbeddingCache:
+    """Two-tier (LRU memory + SQLite blob) embedding store."""
+
+    def __init__(self, path: Path = CACHE_PATH, dtype: str = CACHE_DTYPE,
+                 memory_items: int = CACHE_MEMORY_ITEMS):
+        if dtype not in _DTYPE_FORMATS:
+            raise ValueError(f"Unsupported embedding cache dtype: {dtype}")
+
+        self.path = Path(path)
+        self.dtype = dtype
+        self.memory_items = memory_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                dimensions INTEGER,
+                dtype TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _remember(self, key: str, vector: array):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, model: str, dimensions: Optional[int], text: str) -> Optional[List[float]]:
+        """Return the cached vector for text, or None on a miss."""
+        key = cache_key(model, dimensions, text)
+
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return vector.tolist()
+
+            row = self._conn.execute(
+                "SELECT dtype, vector FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            vector = _decode(row[1], row[0])
+            self._remember(key, vector)
+            self.hits += 1
+            return vector.tolist()
+
+    def put(self, model: str, dimensions: Optional[int], text: str, vector: List[float]):
+        """Store a vector in both tiers."""
+        self.put_many(model, dimensions, [(text, vector)])
+
+    def put_many(self, model: str, dimensions: Optional[int], items):
+        """Store (text, vector) pairs in one transaction."""
+        rows = []
+        with self._lock:
+            for text, vector in items:
+                key = cache_key(model, dimensions, text)
+                blob = _encode(vector, self.dtype)
+                self._remember(key, _decode(blob, self.dtype))
+                rows.append((key, model, dimensions, self.dtype, blob))
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, dimensions, dtype, vector) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """Hit/miss counters and store size."""
+        with self._lock:
+            stored = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_items": len(self._memory),
+                "stored_items": stored,
+                "dtype": self.dtype,
+                "path": str(self.path)
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[EmbeddingCache]:
+    """Process-wide cache instance (None when disabled)."""
+    global _default_cache
+    if not CACHE_ENABLED:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = EmbeddingCache()
+        return _default_cache
+
+
+def embed_texts(client, texts: List[str], model: str, dimensions: Optional[int] = None) -> List[List[float]]:
+    """
+    Embed a list of texts, serving hits from the cache and sending all misses
+    to the embeddings API as list input.
+
+    Args:
+        client: OpenAI client
+        texts: Texts to embed
+        model: Embedding model name
+        dimensions: Output dimensions (None = model default)
+
+    Returns:
+        List of vectors in the same order as texts
+    """
+    cache = get_cache()
+    vectors = [None] * len(texts)
+    missing = {}
+
+    for i, text in enumerate(texts):
+        cached = cache.get(model, dimensions, text) if cache else None
+        if cached is not None:
+            vectors[i] = cached
+        else:
+            missing.setdefault(text, []).append(i)
+
+    pending = list(missing.keys())
+    for start in range(0, len(pending), EMBEDDING_BATCH_SIZE):
+        batch = pending[start:start + EMBEDDING_BATCH_SIZE]
+        kwargs = {"model": model, "input": batch}
+        if dimensions:
+            kwargs["dimensions"] = dimensions
+        response = client.embeddings.create(**kwargs)
+
+        fresh = []
+        for item in response.data:
+            text = batch[item.index]
+            fresh.append((text, item.embedding))
+            for i in missing[text]:
+                vectors[i] = item.embedding
+
+        if cache:
+            cache.put_many(model, dimensions, fresh)
+
+    return vectors
+
+
+def embed_text(client, text: str, model: str, dimensions: Optional[int] = None) -> List[float]:
+    """Embed a single text through the cache."""
+    return embed_texts(client, [text], model, dimensions)[0]
+
+
+if __name__ == "__main__":
+    cache = get_cache()
+    if cache is None:
+        print("Embedding cache disabled (EMBEDDING_CACHE_ENABLED=false)")
+    else:
+        print(cache.stats())
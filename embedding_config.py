@@ -0,0 +1,89 @@
+"""
+Embedding model / dimension settings per Pinecone namespace.
+
+text-embedding-3-large vectors can be shortened with the `dimensions`
+parameter (equivalently: truncated and re-normalized) with little loss, so a
+namespace can be stored at 1024 or 512 dimensions instead of 3072. A Pinecone
+index has a single fixed dimension, so a namespace stored at reduced
+dimensions lives in a sibling index named "<base index>-<dimensions>".
+
+Configuration (.env):
+    EMBEDDING_MODEL=text-embedding-3-large
+    EMBEDDING_DIMENSIONS=3072                       # default for all namespaces
+    EMBEDDING_NAMESPACE_DIMENSIONS=hof-knowledge-base-max=1024,hanwha-november-2025=3072
+"""
+
+import os
+import time
+from dotenv import load_dotenv
+from pinecone import ServerlessSpec
+
+load_dotenv()
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-large")
+# Dimension of the existing Pinecone indexes (hof-branch-chatbot etc.)
+BASE_INDEX_DIMENSIONS = 3072
+DEFAULT_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", str(BASE_INDEX_DIMENSIONS)))
+
+
+def _parse_namespace_dimensions(raw: str) -> dict:
+    mapping = {}
+    for entry in raw.split(","):
+        if "=" not in entry:
+            continue
+        namespace, dimensions = entry.split("=", 1)
+        mapping[namespace.strip()] = int(dimensions)
+    return mapping
+
+
+NAMESPACE_DIMENSIONS = _parse_namespace_dimensions(os.getenv("EMBEDDING_NAMESPACE_DIMENSIONS", ""))
+
+
+def dimensions_for(namespace: str) -> int:
+    """Embedding dimensions configured for a namespace."""
+    return NAMESPACE_DIMENSIONS.get(namespace, DEFAULT_DIMENSIONS)
+
+
+def index_name_for(base_index_name: str, namespace: str) -> str:
+    """
+    Pinecone index holding a namespace at its configured dimensions.
+
+    Args:
+        base_index_name: Index used at full (3072) dimensions
+        namespace: Pinecone namespace
+
+    Returns:
+        base_index_name, or "<base_index_name>-<dimensions>" for reduced namespaces
+    """
+    dimensions = dimensions_for(namespace)
+    if dimensions == BASE_INDEX_DIMENSIONS:
+        return base_index_name
+    return f"{base_index_name}-{dimensions}"
+
+
+def ensure_index(pc, index_name: str, dimensions: int):
+    """
+    Create the Pinecone index for a reduced-dimension namespace if it is missing.
+
+    Args:
+        pc: Pinecone client
+        index_name: Index name from index_name_for()
+        dimensions: Vector dimension of the index
+    """
+    existing_indexes = [index.name for index in pc.list_indexes()]
+    if index_name in existing_indexes:
+        return
+
+    print(f"Creating new index: {index_name} (dimension {dimensions})")
+    pc.create_index(
+        name=index_name,
+        dimension=dimensions,
+        metric="cosine",
+        spec=ServerlessSpec(
+            cloud="aws",
+            region="us-east-1"
+        )
+    )
+    while not pc.describe_index(index_name).status["ready"]:
+        time.sleep(2)
+    print(f"Index {index_name} is ready")
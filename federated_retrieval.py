@@ -0,0 +1,263 @@
+"""
+Federated retrieval over several Pinecone (index, namespace) targets.
+
+Data lives in more than one place: namespaces of hof-branch-chatbot (which can
+be kept small and sharded by month or document - a target's namespace may be
+a glob such as "hof-2025-*") and the legacy kakaotalk-qa index. Instead of
+copying vectors into one namespace (consolidate_namespaces.py), the targets in
+retrieval_targets.json are queried concurrently:
+
+- each target waits at most its own deadline_ms; late or failing targets are
+  skipped (the Pinecone call finishes in the background)
+- the query embedding is truncated + re-normalized for smaller target
+  dimensions (text-embedding-3 embeddings are prefix-truncatable) and
+  re-embedded through the cache for larger ones
+- scores are normalized per target (minmax / zscore / none; raw scores for
+  targets with fewer than 2 matches), scaled by the target weight and merged;
+  matches keep their raw similarity as `score`, so RELEVANCE_THRESHOLD keeps
+  its meaning
+- when every target times out or fails, search returns None and the caller
+  falls back to its direct single-index query
+"""
+
+import fnmatch
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from embedding_config import dimensions_for, index_name_for
+from retrieval_results import Match, QueryResults
+
+load_dotenv()
+
+TARGETS_PATH = Path(os.getenv("RAG_RETRIEVAL_TARGETS", str(Path(__file__).parent / "retrieval_targets.json")))
+NAMESPACE_CACHE_SECONDS = int(os.getenv("RAG_FEDERATED_NAMESPACE_TTL", "300"))
+
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("RAG_FEDERATED_WORKERS", "16")))
+# Namespace shards of one target; separate so target tasks never wait on their own pool
+_shard_executor = ThreadPoolExecutor(max_workers=int(os.getenv("RAG_FEDERATED_WORKERS", "16")))
+
+
+@dataclass
+class RetrievalTarget:
+    name: str
+    index: str
+    namespace: str
+    weight: float = 1.0
+    deadline_ms: int = 2000
+    top_k: Optional[int] = None
+    dimensions: Optional[int] = None
+    min_score: float = 0.0
+    normalization: str = "minmax"
+    apply_filters: bool = True
+    text_template: Optional[str] = None
+    enabled: bool = True
+
+    @property
+    def index_name(self) -> str:
+        return index_name_for(self.index, self.namespace) if self.dimensions is None else self.index
+
+    @property
+    def vector_dimensions(self) -> int:
+        return self.dimensions or dimensions_for(self.namespace)
+
+
+def load_targets(path: Path = TARGETS_PATH) -> List[RetrievalTarget]:
+    """Enabled targets from retrieval_targets.json."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    targets = [RetrievalTarget(**spec) for spec in data["targets"]]
+    return [t for t in targets if t.enabled]
+
+
+def normalize_scores(scores: List[float], method: str) -> List[float]:
+    """Per-target score normalization to a comparable scale (raw scores below 2 matches)."""
+    # A lone match would be stretched to the top of the scale (1.0 / 0.5)
+    if len(scores) < 2 or method == "none":
+        return list(scores)
+    values = np.asarray(scores, dtype=np.float64)
+    if method == "zscore":
+        std = values.std()
+        # Squash z-scores into (0, 1) so weights stay meaningful
+        z = (values - values.mean()) / std if std > 0 else np.zeros_like(values)
+        return list(1.0 / (1.0 + np.exp(-z)))
+    low, high = values.min(), values.max()
+    if high - low <= 1e-9:
+        return [1.0] * len(scores)
+    return list((values - low) / (high - low))
+
+
+def _resize(vector, dimensions: int) -> List[float]:
+    head = np.asarray(vector[:dimensions], dtype=np.float32)
+    norm = np.linalg.norm(head)
+    return (head / norm if norm else head).tolist()
+
+
+class _Missing(dict):
+    """format_map helper: missing metadata fields render as empty strings."""
+
+    def __missing__(self, key):
+        return ""
+
+
+class FederatedRetriever:
+    """Concurrent fan-out over retrieval targets with per-target deadlines."""
+
+    def __init__(self, pc, targets: List[RetrievalTarget], embed: Callable[[str, int], List[float]]):
+        """
+        Args:
+            pc: Pinecone client
+            targets: Targets to query
+            embed: Callable (text, dimensions) -> embedding, for targets wider than the query embedding
+        """
+        self.pc = pc
+        self.targets = targets
+        self.embed = embed
+        self._indexes = {}
+        self._namespaces = {}
+        self._lock = threading.Lock()
+
+    def _index(self, name: str):
+        with self._lock:
+            index = self._indexes.get(name)
+            if index is None:
+                index = self._indexes[name] = self.pc.Index(name)
+            return index
+
+    def namespaces(self, target: RetrievalTarget) -> List[str]:
+        """Concrete namespaces of a target (glob patterns expanded from the index stats)."""
+        if not any(ch in target.namespace for ch in "*?["):
+            return [target.namespace]
+        key = (target.index_name, target.namespace)
+        now = time.time()
+        with self._lock:
+            cached = self._namespaces.get(key)
+        if cached and now - cached[0] < NAMESPACE_CACHE_SECONDS:
+            return cached[1]
+        stats = self._index(target.index_name).describe_index_stats()
+        names = sorted(fnmatch.filter(list(stats.namespaces.keys()), target.namespace))
+        with self._lock:
+            self._namespaces[key] = (now, names)
+        return names
+
+    def _query_target(self, target: RetrievalTarget, query_text: str, query_embedding, top_k: int,
+                      filters: Optional[dict]) -> List[Match]:
+        dimensions = target.vector_dimensions
+        if len(query_embedding) == dimensions:
+            vector = list(query_embedding)
+        elif len(query_embedding) > dimensions:
+            vector = _resize(query_embedding, dimensions)
+        else:
+            vector = self.embed(query_text, dimensions)
+
+        index = self._index(target.index_name)
+
+        def query_namespace(namespace):
+            return namespace, index.query(
+                vector=vector,
+                top_k=target.top_k or top_k,
+                namespace=namespace,
+                include_metadata=True,
+                filter=filters if target.apply_filters else None
+            )
+
+        namespaces = self.namespaces(target)
+        if len(namespaces) == 1:
+            responses = [query_namespace(namespaces[0])]
+        else:
+            responses = list(_shard_executor.map(query_namespace, namespaces))
+
+        matches = []
+        for namespace, response in responses:
+            for match in response.matches:
+                if match.score < target.min_score:
+                    continue
+                metadata = dict(match.metadata or {})
+                if target.text_template and not metadata.get("full_text"):
+                    try:
+                        metadata["full_text"] = target.text_template.format_map(_Missing(metadata))
+                    except (ValueError, IndexError):
+                        pass
+                metadata["retrieval_target"] = target.name
+                metadata.setdefault("namespace", namespace)
+                matches.append(Match(id=match.id, score=match.score, metadata=metadata))
+        return matches
+
+    def search(self, query_text: str, query_embedding, top_k: int = 10,
+               filters: Optional[dict] = None) -> Optional[QueryResults]:
+        """
+        Query all targets concurrently and merge by weighted normalized score.
+
+        Args:
+            query_text: Search text (for re-embedding wider targets)
+            query_embedding: Query embedding
+            top_k: Number of merged matches
+            filters: Pinecone metadata filters (for targets with apply_filters)
+
+        Returns:
+            QueryResults ordered by fused score, carrying raw similarity scores,
+            or None when every target timed out or failed
+        """
+        start = time.perf_counter()
+        futures = {
+            target.name: (target, _executor.submit(self._query_target, target, query_text, query_embedding, top_k, filters))
+            for target in self.targets
+        }
+
+        ranked = []
+        summary = []
+        answered = 0
+        for name, (target, future) in futures.items():
+            remaining = target.deadline_ms / 1000 - (time.perf_counter() - start)
+            try:
+                matches = future.result(timeout=max(0.0, remaining))
+            except FutureTimeoutError:
+                summary.append(f"{name}: 시간 초과({target.deadline_ms}ms)")
+                continue
+            except Exception as e:
+                summary.append(f"{name}: 실패({e})")
+                continue
+
+            answered += 1
+            normalized = normalize_scores([m.score for m in matches], target.normalization)
+            ranked.extend((target.weight * n, m) for n, m in zip(normalized, matches))
+            summary.append(f"{name}: {len(matches)}개")
+
+        if not answered:
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"   ⚠️ 연합 검색 전체 실패 ({elapsed:.0f}ms): {', '.join(summary)} - 기본 인덱스로 대체")
+            return None
+
+        best: Dict[tuple, tuple] = {}
+        for fused, match in ranked:
+            key = (match.metadata.get("retrieval_target"), match.id)
+            if key not in best or fused > best[key][0]:
+                best[key] = (fused, match)
+
+        merged = sorted(best.values(), key=lambda item: (item[0], item[1].score), reverse=True)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"   🌐 연합 검색 ({elapsed:.0f}ms): {', '.join(summary)}")
+        return QueryResults(matches=[match for _, match in merged[:top_k]])
+
+
+_retriever: Optional[FederatedRetriever] = None
+_retriever_lock = threading.Lock()
+
+
+def get_federated_retriever(pc, embed: Callable[[str, int], List[float]]) -> FederatedRetriever:
+    """Process-wide retriever for retrieval_targets.json."""
+    global _retriever
+    with _retriever_lock:
+        if _retriever is None:
+            _retriever = FederatedRetriever(pc, load_targets(), embed)
+            print(f"🌐 연합 검색 대상: {', '.join(t.name for t in _retriever.targets)}")
+        return _retriever
@@ -0,0 +1,461 @@
+"""
+Schema-aware linter for LLM-generated Pinecone filters.
+
+Gemini regularly proposes filters on fields that do not exist
+(`is_instruction`, `is_resource`), on fields that never appear on the chunk
+family it is targeting (`companies` on Hanwha table chunks), or uses string
+`$gte`/`$lte` on dates. Each of these costs a zero-result query plus a
+re-query. The linter repairs the filter before retrieval:
+- unknown fields / operators and unknown enum values are dropped
+- operator and type mismatches are fixed (`"true"` -> true, `$eq` list -> `$in`,
+  string date ranges -> `$in` of the enumerated dates)
+- clauses that can never match the targeted chunk family are dropped
+- conjunctions that can never match at all collapse to no filter
+
+The field catalog is built from metadata_key.json plus the metadata layout of
+the upload scripts, and is refined with observed index metadata whenever a
+local mirror (local_vector_index) is available. Repairs are counted per kind.
+"""
+
+import json
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+SCRIPT_DIR = Path(__file__).parent
+METADATA_KEY_PATH = SCRIPT_DIR / "metadata_key.json"
+
+HANWHA_CHUNK_TYPES = {
+    "table_cell_commission", "table_row_summary", "table_column_summary", "table_full",
+    "page_full", "heading_with_context", "text_sentence_group"
+}
+SCHEDULE_CHUNK_TYPES = {"event_individual", "day_summary", "event_range"}
+# General documents were uploaded without a chunk_type
+GENERAL = ""
+
+_HANWHA_DOC = {
+    "document_title", "document_date", "company", "category", "sub_category", "month",
+    "is_promotion", "is_policy", "has_financial_data", "content_type", "chunk_type",
+    "page_number", "searchable_text", "chunk_index", "total_chunks", "upload_timestamp",
+    "extraction_version"
+}
+
+# Which chunk types carry each field (from upload_hanwha_ultragranular.py,
+# upload_schedules_ultragranular.py and the general knowledge-base documents)
+STATIC_FIELD_CHUNK_TYPES: Dict[str, Set[str]] = {}
+
+
+def _register(fields, chunk_types):
+    for field in fields:
+        STATIC_FIELD_CHUNK_TYPES.setdefault(field, set()).update(chunk_types)
+
+
+_register(_HANWHA_DOC, HANWHA_CHUNK_TYPES)
+_register({"table_index"}, {"table_cell_commission", "table_row_summary", "table_column_summary", "table_full"})
+_register({"row_index", "product_name", "product_name_clean", "payment_term"},
+          {"table_cell_commission", "table_row_summary"})
+_register({"column_index"}, {"table_cell_commission", "table_column_summary"})
+_register({"commission_type", "commission_label", "commission_value", "commission_category",
+           "commission_period", "natural_description", "is_current_month", "is_13th_month",
+           "is_fc_policy", "is_hq_policy", "is_comprehensive"}, {"table_cell_commission"})
+_register({"all_commission_values"}, {"table_row_summary"})
+_register({"column_header", "product_count"}, {"table_column_summary"})
+_register({"row_count", "column_count", "products"}, {"table_full"})
+_register({"heading", "heading_level"}, {"heading_with_context"})
+_register({"sentence_group_index", "sentence_count"}, {"text_sentence_group"})
+_register({"chunk_type", "source_file", "month", "date_start", "date_end", "searchable_text",
+           "natural_description"}, SCHEDULE_CHUNK_TYPES)
+_register({"date", "weekday", "day_of_month"}, {"event_individual", "day_summary"})
+_register({"title", "category", "is_training", "is_exam", "is_ceremony", "has_time", "has_location",
+           "time", "location", "companies"}, {"event_individual", "event_range"})
+_register({"is_orientation", "is_partner_education", "is_kblp", "is_zoom", "has_presenter",
+           "presenter", "time_start", "time_end"}, {"event_individual"})
+_register({"duration_days", "is_appointment", "is_deadline", "is_conference", "has_regions",
+           "regions", "business_days"}, {"event_range"})
+_register({"event_count", "event_titles"}, {"day_summary"})
+_register({"companies", "products", "locations", "month", "date", "date_start", "date_end",
+           "content_type", "primary_category", "sub_category", "semantic_tags", "keywords",
+           "is_training", "is_exam", "is_promotion", "is_policy", "title", "category", "type",
+           "doc_type", "people", "insurance_company", "company", "provider", "url"}, {GENERAL})
+
+LIST_FIELDS = {"companies", "products", "locations", "regions", "event_titles", "all_commission_values",
+               "semantic_tags", "keywords", "people"}
+NUMBER_FIELDS = {"day_of_month", "page_number", "table_index", "row_index", "column_index",
+                 "duration_days", "business_days", "event_count", "product_count", "row_count",
+                 "column_count", "chunk_index", "total_chunks", "heading_level", "sentence_group_index",
+                 "sentence_count", "payout_amount"}
+DATE_FIELDS = {"date", "date_start", "date_end", "document_date"}
+MAX_DATE_RANGE_DAYS = 62
+
+SUPPORTED_OPERATORS = {"$eq", "$ne", "$in", "$nin", "$gt", "$gte", "$lt", "$lte", "$exists"}
+
+# Process-wide repair counters (unknown_field, type_coerced, ...)
+REPAIR_COUNTERS = Counter()
+_counters_lock = threading.Lock()
+
+
+class _Impossible:
+    """Marker for a clause or conjunction that can never match."""
+
+
+IMPOSSIBLE = _Impossible()
+
+
+class FilterLinter:
+    """Validates and repairs Pinecone filters against a field catalog."""
+
+    def __init__(self, metadata_key: dict, observed: Optional[dict] = None):
+        self.field_chunk_types = {f: set(c) for f, c in STATIC_FIELD_CHUNK_TYPES.items()}
+        self.boolean_fields = set(metadata_key.get("boolean_filters", [])) | {
+            f for f in STATIC_FIELD_CHUNK_TYPES if f.startswith(("is_", "has_"))
+        }
+        self.chunk_types = set(metadata_key.get("chunk_types", [])) | HANWHA_CHUNK_TYPES | SCHEDULE_CHUNK_TYPES
+        self.observed_values: Dict[str, set] = {}
+
+        # Boolean flags listed in metadata_key.json but not in the static map
+        for field in self.boolean_fields - set(self.field_chunk_types):
+            self.field_chunk_types[field] = {GENERAL}
+
+        if observed:
+            # Observed index metadata is authoritative for which fields exist where
+            self.field_chunk_types = {f: set(c) for f, c in observed["field_chunk_types"].items()}
+            self.observed_values = observed["field_values"]
+            self.boolean_fields = {f for f, kind in observed["field_kinds"].items() if kind == "bool"}
+            self.chunk_types = observed["field_values"].get("chunk_type", self.chunk_types)
+
+    # ------------------------------------------------------------------
+
+    def _kind(self, field: str) -> str:
+        if field in self.boolean_fields:
+            return "bool"
+        if field in LIST_FIELDS:
+            return "list"
+        if field in NUMBER_FIELDS:
+            return "number"
+        return "str"
+
+    def _coerce(self, field: str, value, repairs: Counter):
+        kind = self._kind(field)
+        if kind == "bool" and not isinstance(value, bool):
+            if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+                repairs["type_coerced"] += 1
+                return value.strip().lower() == "true"
+            if value in (0, 1):
+                repairs["type_coerced"] += 1
+                return bool(value)
+            return IMPOSSIBLE
+        if kind == "number" and isinstance(value, str):
+            try:
+                number = float(value)
+            except ValueError:
+                return IMPOSSIBLE
+            repairs["type_coerced"] += 1
+            return int(number) if number.is_integer() else number
+        return value
+
+    @staticmethod
+    def _date_range(low: str, high: str):
+        try:
+            start = datetime.strptime(low, "%Y-%m-%d")
+            end = datetime.strptime(high, "%Y-%m-%d")
+        except (TypeError, ValueError):
+            return None
+        days = (end - start).days
+        if days < 0 or days > MAX_DATE_RANGE_DAYS:
+            return None
+        return [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days + 1)]
+
+    def _lint_field(self, field: str, condition, scope: Optional[Set[str]], repairs: Counter):
+        """Returns a repaired {field: condition} clause, None (dropped) or IMPOSSIBLE."""
+        if field not in self.field_chunk_types:
+            repairs["unknown_field"] += 1
+            print(f"   🧹 필터 수정: 존재하지 않는 필드 '{field}' 제거")
+            return None
+
+        if scope is not None and field != "chunk_type" and not (self.field_chunk_types[field] & scope):
+            repairs["family_mismatch"] += 1
+            print(f"   🧹 필터 수정: '{field}' 필드는 {sorted(scope)} 청크에 없음 - 제거")
+            return None
+
+        ops = dict(condition) if isinstance(condition, dict) else {"$eq": condition}
+        fixed = {}
+
+        # String range on dates -> enumerated $in; other string ranges are dropped
+        range_ops = {op: ops.pop(op) for op in ("$gt", "$gte", "$lt", "$lte") if op in ops}
+        if range_ops:
+            if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in range_ops.values()):
+                fixed.update(range_ops)
+            else:
+                low = range_ops.get("$gte", range_ops.get("$gt"))
+                high = range_ops.get("$lte", range_ops.get("$lt"))
+                dates = self._date_range(low, high) if field in DATE_FIELDS and low and high else None
+                if dates:
+                    if "$gt" in range_ops:
+                        dates = dates[1:]
+                    if "$lt" in range_ops:
+                        dates = dates[:-1]
+                    fixed["$in"] = dates
+                    repairs["string_range_to_in"] += 1
+                    print(f"   🧹 필터 수정: '{field}' 문자열 범위 → $in ({len(dates)}일)")
+                else:
+                    repairs["string_range_dropped"] += 1
+                    print(f"   🧹 필터 수정: '{field}' 문자열 비교 연산 제거")
+
+        for op, operand in ops.items():
+            if op not in SUPPORTED_OPERATORS:
+                repairs["unknown_operator"] += 1
+                print(f"   🧹 필터 수정: 지원하지 않는 연산자 {op} 제거")
+                continue
+
+            if op in ("$eq", "$ne") and isinstance(operand, list):
+                op = "$in" if op == "$eq" else "$nin"
+                repairs["operator_fixed"] += 1
+            elif op in ("$in", "$nin") and not isinstance(operand, list):
+                operand = [operand]
+                repairs["operator_fixed"] += 1
+
+            if op == "$exists":
+                fixed[op] = bool(operand)
+                continue
+
+            if op in ("$in", "$nin"):
+                values = [self._coerce(field, v, repairs) for v in operand]
+                values = [v for v in values if v is not IMPOSSIBLE]
+                if field == "chunk_type":
+                    known = [v for v in values if v in self.chunk_types]
+                    if len(known) != len(values):
+                        repairs["unknown_value"] += 1
+                    values = known
+                if not values:
+                    if op == "$in":
+                        return IMPOSSIBLE
+                    continue
+                fixed[op] = values
+            else:
+                value = self._coerce(field, operand, repairs)
+                if value is IMPOSSIBLE:
+                    repairs["type_mismatch_dropped"] += 1
+                    print(f"   🧹 필터 수정: '{field}' 타입 불일치 값 {operand!r} 제거")
+                    continue
+                if field == "chunk_type" and value not in self.chunk_types:
+                    repairs["unknown_value"] += 1
+                    print(f"   🧹 필터 수정: 알 수 없는 chunk_type '{value}' 제거")
+                    continue
+                fixed[op] = value
+
+        if not fixed:
+            return None
+
+        # Values never observed in the index can never match
+        observed = self.observed_values.get(field)
+        if observed is not None and self._kind(field) != "list":
+            wanted = [fixed["$eq"]] if "$eq" in fixed else fixed.get("$in")
+            if wanted is not None and not any(v in observed for v in wanted):
+                repairs["unseen_value"] += 1
+                print(f"   🧹 필터 수정: '{field}' 값 {wanted} 은(는) 인덱스에 없음 - 제거")
+                return None
+
+        if list(fixed) == ["$eq"]:
+            return {field: fixed["$eq"]}
+        return {field: fixed}
+
+    @staticmethod
+    def _allowed_values(condition):
+        if not isinstance(condition, dict):
+            return {json.dumps(condition)}
+        if "$eq" in condition:
+            return {json.dumps(condition["$eq"])}
+        if "$in" in condition:
+            return {json.dumps(v) for v in condition["$in"]}
+        return None
+
+    def _scope(self, clauses) -> Optional[Set[str]]:
+        for clause in clauses:
+            if "chunk_type" in clause:
+                allowed = self._allowed_values(clause["chunk_type"])
+                if allowed is not None:
+                    return {json.loads(v) for v in allowed}
+        return None
+
+    def _collect_clauses(self, node: dict, raw_clauses: list, repairs: Counter):
+        """Flatten a conjunction, including nested $and, into single-key clauses."""
+        for key, value in node.items():
+            if key == "$and" and isinstance(value, list):
+                for item in value:
+                    if isinstance(item, dict):
+                        self._collect_clauses(item, raw_clauses, repairs)
+            elif key == "$or":
+                raw_clauses.append({"$or": value})
+            elif key.startswith("$"):
+                repairs["unknown_operator"] += 1
+                print(f"   🧹 필터 수정: 지원하지 않는 최상위 연산자 {key} 제거")
+            else:
+                raw_clauses.append({key: value})
+
+    def _lint_node(self, node: dict, scope: Optional[Set[str]], repairs: Counter):
+        """Lint one conjunction. Returns a filter dict, None (no constraint) or IMPOSSIBLE."""
+        raw_clauses = []
+        self._collect_clauses(node, raw_clauses, repairs)
+
+        # chunk_type clauses first: they define the family scope for the rest
+        raw_clauses.sort(key=lambda c: 0 if "chunk_type" in c else 1)
+
+        clauses = []
+        for clause in raw_clauses:
+            (key, value), = clause.items()
+            if key == "$or":
+                branches = []
+                unconstrained = False
+                for branch in value if isinstance(value, list) else []:
+                    linted = self._lint_node(branch, scope, repairs) if isinstance(branch, dict) else None
+                    if linted is None:
+                        unconstrained = True
+                    elif linted is not IMPOSSIBLE:
+                        branches.append(linted)
+                if unconstrained:
+                    # One branch matches everything, so the whole $or does
+                    continue
+                if not branches:
+                    return IMPOSSIBLE
+                clauses.append(branches[0] if len(branches) == 1 else {"$or": branches})
+            else:
+                linted = self._lint_field(key, value, scope, repairs)
+                if linted is IMPOSSIBLE:
+                    return IMPOSSIBLE
+                if linted is not None:
+                    clauses.append(linted)
+                    if key == "chunk_type" and scope is None:
+                        scope = self._scope([linted])
+
+        # Conflicting equality constraints on one field can never match together
+        allowed_by_field = {}
+        for clause in clauses:
+            (key, value), = clause.items()
+            if key.startswith("$"):
+                continue
+            allowed = self._allowed_values(value)
+            if allowed is None:
+                continue
+            if key in allowed_by_field and self._kind(key) != "list":
+                allowed_by_field[key] &= allowed
+                if not allowed_by_field[key]:
+                    return IMPOSSIBLE
+            else:
+                allowed_by_field[key] = set(allowed)
+
+        if not clauses:
+            return None
+        if len(clauses) == 1:
+            return clauses[0]
+        return {"$and": clauses}
+
+    def lint(self, filters: Optional[dict]):
+        """
+        Repair a filter.
+
+        Returns:
+            (repaired_filter_or_None, Counter of repairs applied)
+        """
+        repairs = Counter()
+        if not filters or not isinstance(filters, dict):
+            return None, repairs
+
+        linted = self._lint_node(filters, None, repairs)
+        if linted is IMPOSSIBLE:
+            repairs["impossible_conjunction"] += 1
+            print("   🧹 필터 수정: 만족할 수 없는 조건 조합 - 필터 없이 검색")
+            linted = None
+        return linted, repairs
+
+
+def observed_schema(local_index) -> dict:
+    """
+    Field catalog observed in a LocalVectorIndex: chunk types per field,
+    value kinds, and the distinct values of low-cardinality scalar fields.
+    """
+    chunk_column = local_index.columns.get("chunk_type", [None] * local_index.size)
+    field_chunk_types, field_kinds, field_values = {}, {}, {}
+
+    for field, values in local_index.columns.items():
+        types, distinct, kinds = set(), set(), set()
+        for row, value in enumerate(values):
+            if value is None:
+                continue
+            types.add(chunk_column[row] or GENERAL)
+            if isinstance(value, bool):
+                kinds.add("bool")
+            elif isinstance(value, (list, tuple)):
+                kinds.add("list")
+            elif isinstance(value, (int, float)):
+                kinds.add("number")
+            else:
+                kinds.add("str")
+            if not isinstance(value, (list, tuple)) and len(distinct) <= 200:
+                distinct.add(value)
+        field_chunk_types[field] = types
+        field_kinds[field] = kinds.pop() if len(kinds) == 1 else "mixed"
+        if len(distinct) <= 200:
+            field_values[field] = distinct
+
+    return {"field_chunk_types": field_chunk_types, "field_kinds": field_kinds, "field_values": field_values}
+
+
+_linter_cache = {}
+_linter_lock = threading.Lock()
+
+
+def get_linter(metadata_key: dict, local_index=None) -> FilterLinter:
+    """Linter for the current catalog, rebuilt when the local mirror changes."""
+    version = (id(local_index), getattr(local_index, "size", None), getattr(local_index, "synced_at", None))
+    with _linter_lock:
+        linter = _linter_cache.get(version)
+        if linter is None:
+            observed = observed_schema(local_index) if local_index is not None and local_index.size else None
+            linter = FilterLinter(metadata_key, observed)
+            _linter_cache.clear()
+            _linter_cache[version] = linter
+        return linter
+
+
+def lint_filters(filters: Optional[dict], metadata_key: Optional[dict] = None, local_index=None) -> Optional[dict]:
+    """
+    Repair LLM-generated filters before retrieval and update REPAIR_COUNTERS.
+
+    Args:
+        filters: Filter proposed by the rewrite step
+        metadata_key: Contents of metadata_key.json (loaded if omitted)
+        local_index: Optional LocalVectorIndex supplying observed metadata
+
+    Returns:
+        Repaired filter, or None when nothing usable remains
+    """
+    if metadata_key is None:
+        with open(METADATA_KEY_PATH, "r", encoding="utf-8") as f:
+            metadata_key = json.load(f)
+
+    linted, repairs = get_linter(metadata_key, local_index).lint(filters)
+    if repairs:
+        with _counters_lock:
+            REPAIR_COUNTERS.update(repairs)
+            totals = ", ".join(f"{k}={v}" for k, v in sorted(REPAIR_COUNTERS.items()))
+        print(f"   📊 필터 수정 누적: {totals}")
+    return linted
+
+
+if __name__ == "__main__":
+    # Filters observed in server.log
+    samples = [
+        {"is_instruction": True},
+        {"$and": [{"is_instruction": True}, {"is_policy": True}]},
+        {"$and": [{"companies": {"$in": ["KB손보", "KB손해보험"]}}, {"locations": {"$in": ["서울", "수도권"]}},
+                  {"$or": [{"primary_category": {"$eq": "resource"}}, {"primary_category": {"$eq": "instruction"}}]}]},
+        {"chunk_type": "table_cell_commission", "companies": ["한화생명"], "is_comprehensive": "true"},
+        {"date": {"$gte": "2025-11-04", "$lte": "2025-11-07"}},
+        {"$and": [{"chunk_type": "table_cell_commission"}, {"chunk_type": "event_individual"}]},
+        {"$and": [{"is_training": True}, {"month": "2025-11"}]},
+    ]
+    for sample in samples:
+        print(f"\nIN : {json.dumps(sample, ensure_ascii=False)}")
+        print(f"OUT: {json.dumps(lint_filters(sample), ensure_ascii=False)}")
@@ -0,0 +1,20 @@
+"""
+Metadata of the Hanwha monthly policy (시책) document.
+
+Attached to every vector the Hanwha uploaders create and to the rates served
+by hanwha_policy_tables. Kept in its own module so the serving side can use it
+without importing an uploader (which creates API clients at import time).
+"""
+
+DOCUMENT_METADATA = {
+    "document_title": "HO&F지사 11월 시책공지 - 한화생명 추가",
+    "document_date": "2025-11-06",
+    "company": "한화생명",
+    "category": "insurance_commission_table",
+    "sub_category": "promotion",
+    "month": "2025-11",
+    "is_promotion": True,
+    "is_policy": True,
+    "has_financial_data": True,
+    "content_type": "insurance_commission_table"
+}
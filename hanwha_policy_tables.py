@@ -0,0 +1,348 @@
+"""
+Structured lookup over the Hanwha monthly policy (시책) commission tables.
+
+The parsed policy document (MODIFIED/*Ho&F*.json) holds the commission table
+as `table` items whose first row is the header (상품명, 납기, then six
+commission columns: 종합 / 1차시책(FC시책) / 2차시책(본부시책) x 익월 / 13차월).
+This module loads those tables into memory - carrying the product name down
+to continuation rows such as ('', '20년납↑', ...) - and indexes every rate by
+normalized product name, payment term, category and period.
+
+Questions like "레이디H보장보험 종합 익월" or "제로백H종신 20년납 13차월"
+are answered by direct lookup (lookup_policy_rates); vector search is left for
+the free-text policy sentences. The same table detection
+(is_commission_table) lets upload_hanwha_ultragranular.py skip the
+per-cell and per-row vectors of these tables (TABLE_STORE_CHUNK_TYPES).
+"""
+
+import glob
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from hanwha_document_metadata import DOCUMENT_METADATA
+from retrieval_results import Match, QueryResults
+
+SCRIPT_DIR = Path(__file__).parent
+POLICY_FILE_PATTERN = str(SCRIPT_DIR / "MODIFIED" / "*Ho&F*.json")
+
+# Commission columns 2-7: (commission_type, label, category, period)
+COMMISSION_COLUMNS = [
+    ("comprehensive_current", "종합 익월", "종합", "익월"),
+    ("comprehensive_13th", "종합 13차월", "종합", "13차월"),
+    ("fc_policy_current", "1차시책(FC시책) 익월", "1차시책", "익월"),
+    ("fc_policy_13th", "1차시책(FC시책) 13차월", "1차시책", "13차월"),
+    ("hq_policy_current", "2차시책(본부시책) 익월", "2차시책", "익월"),
+    ("hq_policy_13th", "2차시책(본부시책) 13차월", "2차시책", "13차월"),
+]
+
+# Query words -> category / period
+CATEGORY_WORDS = {
+    "종합": "종합",
+    "1차시책": "1차시책", "1차": "1차시책", "fc시책": "1차시책",
+    "2차시책": "2차시책", "2차": "2차시책", "본부시책": "2차시책", "본부": "2차시책",
+}
+PERIOD_WORDS = {"익월": "익월", "초회": "익월", "13차월": "13차월", "13차": "13차월", "13회차": "13차월"}
+POLICY_WORDS = ("시책", "수수료", "수당", "%", "퍼센트", "프로")
+# Other insurers: their questions belong to the commission system, not this table
+OTHER_COMPANIES = ("kb", "삼성", "미래에셋", "교보", "db", "메리츠", "현대", "im라이프", "라이나", "흥국", "동양", "메트라이프")
+
+_PRODUCT_NOISE = re.compile(r"\(일반/간편\)|일반/간편|新|상기外")
+_NON_WORD = re.compile(r"[^0-9a-z가-힣]")
+
+
+def normalize_product(name: str) -> str:
+    """Case-folded product key without the (일반/간편) / 新 markers, spaces and punctuation."""
+    return _NON_WORD.sub("", _PRODUCT_NOISE.sub("", name or "").lower())
+
+
+def _product_aliases(name: str) -> set:
+    """Keys a query may use for a product: full key, without brackets, without trailing 보험."""
+    full = normalize_product(name)
+    bare = normalize_product(re.sub(r"\(.*?\)|\[.*?\]", "", _PRODUCT_NOISE.sub("", name or "")))
+    aliases = {full, bare}
+    for key in list(aliases):
+        if key.endswith("보험") and len(key) > 4:
+            aliases.add(key[:-2])
+    return {a for a in aliases if len(a) >= 3}
+
+
+def is_commission_table(table_item: dict) -> bool:
+    """Policy commission tables: first header cell is 상품명, with 익월/13차월 columns."""
+    rows = table_item.get("rows") or []
+    if len(rows) < 2 or not rows[0]:
+        return False
+    headers = " ".join(str(h) for h in rows[0])
+    return str(rows[0][0]).startswith("상품명") and "익월" in headers and "13차월" in headers
+
+
+def _parse_rate(value: str) -> Optional[float]:
+    try:
+        return float(str(value).replace("%", "").replace(",", "").strip())
+    except ValueError:
+        return None
+
+
+def term_matches(term: str, years: List[int]) -> bool:
+    """
+    Whether a table payment term covers the requested payment years.
+
+    '' and '납기무관' cover everything; '20년납↑' means >= 20, '20년납미만' < 20,
+    '5, 7년납' / '5,10,15년납' list exact terms.
+    """
+    if not years or not term or "무관" in term:
+        return True
+    numbers = [int(n) for n in re.findall(r"\d+", term)]
+    if not numbers:
+        return True
+    if "↑" in term or "이상" in term:
+        return all(y >= numbers[0] for y in years)
+    if "미만" in term:
+        return all(y < numbers[0] for y in years)
+    return all(y in numbers for y in years)
+
+
+@dataclass
+class PolicyRate:
+    product_name: str
+    product_key: str
+    payment_term: str
+    commission_type: str
+    label: str
+    category: str
+    period: str
+    value: str
+    rate: Optional[float]
+    page_number: int
+    table_index: int
+    row_index: int
+    column_index: int
+
+
+class PolicyTableStore:
+    """In-memory commission rates indexed by product, payment term, category and period."""
+
+    def __init__(self, rates: List[PolicyRate], document_metadata: Optional[dict] = None):
+        self.rates = rates
+        self.document_metadata = document_metadata or {}
+        self.by_alias: Dict[str, List[int]] = {}
+        for rate_id, rate in enumerate(rates):
+            for alias in _product_aliases(rate.product_name):
+                self.by_alias.setdefault(alias, []).append(rate_id)
+        # Longest aliases first so "제로백h종신" wins over "h종신"
+        self.aliases = sorted(self.by_alias, key=len, reverse=True)
+
+    @classmethod
+    def from_document(cls, json_file_path: str, document_metadata: Optional[dict] = None) -> "PolicyTableStore":
+        with open(json_file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        rates = []
+        for page in data.get("pages", []):
+            page_num = page.get("page", 0)
+            for table_idx, item in enumerate(page.get("items", [])):
+                if item.get("type") != "table" or not is_commission_table(item):
+                    continue
+                product_name = ""
+                for row_idx, row in enumerate(item["rows"][1:], start=1):
+                    if not row:
+                        continue
+                    if row[0] and row[0].strip():
+                        product_name = row[0].strip()
+                    if not product_name:
+                        continue
+                    payment_term = row[1].strip() if len(row) > 1 and row[1] else ""
+                    for col_idx, (commission_type, label, category, period) in enumerate(COMMISSION_COLUMNS, start=2):
+                        if col_idx >= len(row):
+                            break
+                        rates.append(PolicyRate(
+                            product_name=product_name,
+                            product_key=normalize_product(product_name),
+                            payment_term=payment_term,
+                            commission_type=commission_type,
+                            label=label,
+                            category=category,
+                            period=period,
+                            value=row[col_idx],
+                            rate=_parse_rate(row[col_idx]),
+                            page_number=page_num,
+                            table_index=table_idx,
+                            row_index=row_idx,
+                            column_index=col_idx
+                        ))
+        return cls(rates, document_metadata)
+
+    def match_products(self, compact_query: str) -> List[str]:
+        """Product keys named in a compacted, case-folded query (longest alias wins)."""
+        matched_spans = []
+        products = []
+        for alias in self.aliases:
+            start = compact_query.find(alias)
+            if start < 0:
+                continue
+            end = start + len(alias)
+            if any(s <= start and end <= e for s, e in matched_spans):
+                continue
+            matched_spans.append((start, end))
+            for rate_id in self.by_alias[alias]:
+                key = self.rates[rate_id].product_key
+                if key not in products:
+                    products.append(key)
+        return products
+
+    def lookup(self, product_keys: List[str], years: Optional[List[int]] = None,
+               category: Optional[str] = None, period: Optional[str] = None) -> List[PolicyRate]:
+        """Rates for the given products, filtered by payment years, category and period."""
+        keys = set(product_keys)
+        return [
+            rate for rate in self.rates
+            if rate.product_key in keys
+            and term_matches(rate.payment_term, years or [])
+            and (category is None or rate.category == category)
+            and (period is None or rate.period == period)
+        ]
+
+
+@dataclass
+class PolicyAnswer:
+    query: str
+    rates: List[PolicyRate]
+    category: Optional[str]
+    period: Optional[str]
+    document_metadata: dict
+
+    def rows(self) -> Dict[tuple, List[PolicyRate]]:
+        grouped: Dict[tuple, List[PolicyRate]] = {}
+        for rate in self.rates:
+            grouped.setdefault((rate.product_name, rate.payment_term, rate.row_index), []).append(rate)
+        return grouped
+
+    def as_results(self) -> QueryResults:
+        """
+        Rates as retrieval matches shaped like the uploaded vectors
+        (table_cell_commission for single cells, table_row_summary otherwise).
+        """
+        matches = []
+        for (product_name, payment_term, row_index), rates in self.rows().items():
+            base = {
+                **self.document_metadata,
+                "page_number": rates[0].page_number,
+                "table_index": rates[0].table_index,
+                "row_index": row_index,
+                "product_name": product_name,
+                "product_name_clean": _PRODUCT_NOISE.sub("", product_name).strip(),
+                "payment_term": payment_term,
+            }
+            if len(rates) == 1:
+                rate = rates[0]
+                text = f"{base['product_name_clean']} {payment_term} {rate.label} 수수료율은 {rate.value}입니다.".replace("  ", " ")
+                metadata = {
+                    **base,
+                    "chunk_type": "table_cell_commission",
+                    "column_index": rate.column_index,
+                    "commission_type": rate.commission_type,
+                    "commission_label": rate.label,
+                    "commission_value": rate.value,
+                    "commission_category": rate.category,
+                    "commission_period": rate.period,
+                    "searchable_text": text,
+                }
+            else:
+                lines = "\n".join(f"{rate.label}: {rate.value}" for rate in rates)
+                metadata = {
+                    **base,
+                    "chunk_type": "table_row_summary",
+                    "all_commission_values": [rate.value for rate in rates],
+                    "searchable_text": f"상품: {product_name}\n{f'납기: {payment_term}' if payment_term else ''}\n\n수수료율:\n{lines}",
+                }
+            matches.append(Match(id=f"policy-table-{rates[0].page_number}-{row_index}", score=1.0, metadata=metadata))
+        return QueryResults(matches=matches)
+
+
+def render_policy_answer(answer: PolicyAnswer) -> str:
+    """Render a PolicyAnswer as a chat reply."""
+    title = answer.document_metadata.get("document_title", "한화생명 시책")
+    lines = [f"💰 {title}"]
+    for (product_name, payment_term, _), rates in answer.rows().items():
+        header = f"\n[{_PRODUCT_NOISE.sub('', product_name).strip()}{f' / {payment_term}' if payment_term else ''}]"
+        lines.append(header)
+        lines.extend(f"• {rate.label}: {rate.value}" for rate in rates)
+    return "\n".join(lines)
+
+
+# ----------------------------------------------------------------------
+# Serving
+# ----------------------------------------------------------------------
+
+_store: Optional[PolicyTableStore] = None
+_store_mtime = None
+_store_lock = threading.Lock()
+
+
+def get_policy_store() -> Optional[PolicyTableStore]:
+    """Store for the current policy document, reloaded when the file changes."""
+    global _store, _store_mtime
+    files = sorted(glob.glob(POLICY_FILE_PATTERN))
+    if not files:
+        return _store
+    mtime = os.path.getmtime(files[0])
+
+    with _store_lock:
+        if _store is None or mtime != _store_mtime:
+            try:
+                _store = PolicyTableStore.from_document(files[0], DOCUMENT_METADATA)
+            except Exception as e:
+                print(f"⚠️ 시책 테이블 로드 실패: {e}")
+                return _store
+            _store_mtime = mtime
+            print(f"💰 시책 테이블 로드: {len(_store.rates)}개 수수료율")
+        return _store
+
+
+def lookup_policy_rates(user_query: str) -> Optional[PolicyAnswer]:
+    """
+    Answer a policy-table question by direct lookup.
+
+    A question qualifies when it names a product from the table and asks about
+    the policy (category / period words such as 종합, 1차시책, 익월, 13차월 or
+    시책 / 수수료). Questions naming another insurer are left alone.
+
+    Returns:
+        PolicyAnswer, or None when the question is not a table lookup
+    """
+    store = get_policy_store()
+    if store is None:
+        return None
+
+    lowered = user_query.lower()
+    compact = _NON_WORD.sub("", lowered.replace("%", "퍼센트"))
+    if any(company in compact for company in OTHER_COMPANIES):
+        return None
+
+    products = store.match_products(compact)
+    if not products:
+        return None
+
+    category = next((c for w, c in sorted(CATEGORY_WORDS.items(), key=lambda kv: -len(kv[0])) if w in compact), None)
+    period = next((p for w, p in sorted(PERIOD_WORDS.items(), key=lambda kv: -len(kv[0])) if w in compact), None)
+    if category is None and period is None and not any(w in lowered for w in POLICY_WORDS):
+        return None
+
+    years = [int(y) for y in re.findall(r"(\d+)\s*년\s*납", lowered)]
+    rates = store.lookup(products, years, category, period)
+    if not rates:
+        return None
+    return PolicyAnswer(user_query, rates, category, period, store.document_metadata)
+
+
+def is_policy_table_query(user_query: str) -> bool:
+    """
+    True for questions about policy-table specifics (category / period) of a
+    Hanwha product; plain "수수료" questions keep going to the commission system.
+    """
+    answer = lookup_policy_rates(user_query)
+    return answer is not None and (answer.category is not None or answer.period is not None or "시책" in user_query)
@@ -0,0 +1,161 @@
+"""
+Pre-retrieval intent gate for greetings, profanity and scanner junk.
+
+Greetings ("안녕"), abuse and junk (bot scans, bare punctuation, "ㅋㅋㅋㅋ")
+used to go through the Gemini rewrite, an embedding and a Pinecone query
+only to get the canned "구체적인 질문을 해주시면" reply. The gate rejects them
+locally before any upstream call:
+
+1. negative cache - recently rejected utterances (normalized) are answered
+   from an LRU without re-scoring
+2. keyword automaton - one keyword_matcher pass for the greeting / profanity
+   classes and the domain classes (commission, schedule, hanwha, ...); short
+   Hangul profanity only counts at the start of a word ("출시발표" is fine)
+3. small classifier - per-category logistic scores over a handful of features
+   (greeting-only residue, profanity, domain hits, character mix, scanner
+   patterns, repeated characters); domain hits always pull towards "allow"
+
+A question that mixes a greeting or profanity with real content
+("안녕하세요 수수료 알려줘") passes through.
+"""
+
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+from keyword_matcher import scan_keywords
+
+load_dotenv()
+
+INTENT_GATE_ENABLED = os.getenv("RAG_INTENT_GATE", "true").lower() not in ("0", "false", "no")
+NEGATIVE_CACHE_SIZE = int(os.getenv("INTENT_GATE_CACHE_SIZE", "2048"))
+REJECT_PROBABILITY = float(os.getenv("INTENT_GATE_THRESHOLD", "0.5"))
+
+# Keyword classes that signal a real question
+DOMAIN_CLASSES = ("domain", "commission", "schedule", "hanwha", "list_context")
+
+# Logistic weights per rejected category (features in _features)
+CATEGORY_WEIGHTS = {
+    "greeting": {"bias": -2.0, "greeting_only": 5.0, "domain": -3.0},
+    "abuse": {"bias": -2.0, "profanity": 4.0, "domain": -3.0},
+    "junk": {"bias": -3.0, "scanner": 6.0, "no_letters": 4.0, "symbol_ratio": 3.0,
+             "repeat": 1.5, "hangul_ratio": -2.0, "domain": -3.0},
+}
+
+_SCANNER = re.compile(
+    r"(?:\.\./|/etc/passwd|wp-(?:admin|login)|\.php\b|\.env\b|<\s*script|"
+    r"\bselect\b.+\bfrom\b|\bunion\b.+\bselect\b|\bdrop\s+table\b|%00|\$\{jndi:|"
+    r"^\s*(?:get|post|head)\s+/|https?://\S+$|[A-Za-z0-9+/]{40,}={0,2})",
+    re.IGNORECASE
+)
+_REPEAT = re.compile(r"(.)\1{4,}")
+_GREETING_FILLER = re.compile(r"[\W_ㅎㅋㅠㅜ^]+|요|님|봇|챗봇")
+_SYLLABLE = re.compile(r"[가-힣]")
+_LETTER = re.compile(r"[가-힣a-zA-Z0-9]")
+# Profanity of at most this many syllables also occurs inside ordinary words
+# ("출시발표", "시발점"): it only counts at the start of a Hangul word that is
+# not a profanity_exempt word
+SHORT_PROFANITY_SYLLABLES = 2
+
+
+@dataclass
+class GateDecision:
+    allowed: bool
+    category: Optional[str] = None
+    probability: float = 0.0
+    cached: bool = False
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _has_profanity(text: str, hits) -> bool:
+    lowered = text.lower()
+    exempt = [word.lower() for word in hits.get("profanity_exempt")]
+    for keyword in hits.get("profanity"):
+        keyword = keyword.lower()
+        if len(keyword) > SHORT_PROFANITY_SYLLABLES or not _SYLLABLE.fullmatch(keyword[0]):
+            return True
+        for match in re.finditer(r"(?<![가-힣])" + re.escape(keyword), lowered):
+            if not any(lowered.startswith(word, match.start()) for word in exempt):
+                return True
+    return False
+
+
+def _features(text: str) -> Dict[str, float]:
+    hits = scan_keywords(text)
+    compact = "".join(text.split())
+    length = len(compact)
+
+    residue = text
+    for keyword in sorted(hits.get("greeting"), key=len, reverse=True):
+        residue = residue.replace(keyword.lower(), "")
+    residue = _GREETING_FILLER.sub("", residue)
+
+    letters = len(_LETTER.findall(compact))
+    return {
+        "bias": 1.0,
+        "greeting_only": float(hits.has("greeting") and len(residue) <= 2),
+        "profanity": float(_has_profanity(text, hits)),
+        "domain": float(min(3, sum(len(hits.get(name)) for name in DOMAIN_CLASSES))),
+        "scanner": float(_SCANNER.search(text) is not None),
+        "no_letters": float(letters == 0),
+        "symbol_ratio": (length - letters) / length if length else 1.0,
+        "hangul_ratio": len(_SYLLABLE.findall(compact)) / length if length else 0.0,
+        "repeat": float(_REPEAT.search(compact) is not None),
+    }
+
+
+def classify(text: str) -> GateDecision:
+    """Score an utterance with the keyword automaton + logistic classifier (no cache)."""
+    features = _features(text)
+    best, best_probability = None, 0.0
+    for category, weights in CATEGORY_WEIGHTS.items():
+        z = sum(weight * features.get(name, 0.0) for name, weight in weights.items())
+        probability = 1.0 / (1.0 + math.exp(-z))
+        if probability > best_probability:
+            best, best_probability = category, probability
+
+    if best_probability >= REJECT_PROBABILITY:
+        return GateDecision(allowed=False, category=best, probability=round(best_probability, 3))
+    return GateDecision(allowed=True, probability=round(best_probability, 3))
+
+
+_negative_cache: "OrderedDict[str, GateDecision]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def check_intent(user_query: str) -> GateDecision:
+    """
+    Decide whether an utterance should reach the retrieval pipeline.
+
+    Args:
+        user_query: Raw user utterance
+
+    Returns:
+        GateDecision (allowed=False with a category: greeting | abuse | junk)
+    """
+    if not INTENT_GATE_ENABLED:
+        return GateDecision(allowed=True)
+
+    key = _normalize(user_query)
+    with _cache_lock:
+        cached = _negative_cache.get(key)
+        if cached is not None:
+            _negative_cache.move_to_end(key)
+            return GateDecision(allowed=False, category=cached.category, probability=cached.probability, cached=True)
+
+    decision = classify(key)
+    if not decision.allowed:
+        with _cache_lock:
+            _negative_cache[key] = decision
+            while len(_negative_cache) > NEGATIVE_CACHE_SIZE:
+                _negative_cache.popitem(last=False)
+    return decision
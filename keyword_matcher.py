@@ -0,0 +1,148 @@
+"""
+Single-pass multi-pattern keyword matching for the routing heuristics.
+
+detect_commission_query, detect_question_type, get_relevant_pdfs and the
+low-quality check in rag_answer all ask "which of these keywords occur in the
+query?". Instead of one substring scan per keyword and per list, every keyword
+class in keyword_vocab.json is compiled into one Aho-Corasick automaton and
+the query is scanned once (O(query length + hits), independent of vocabulary
+size); the per-classifier keyword lists are read off the result.
+
+Matching is case-insensitive, and scans are memoized so the classifiers of a
+single request share one pass.
+"""
+
+import json
+import os
+import threading
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+KEYWORD_VOCAB_PATH = Path(os.getenv("KEYWORD_VOCAB_PATH", str(Path(__file__).parent / "keyword_vocab.json")))
+SCAN_CACHE_SIZE = int(os.getenv("KEYWORD_SCAN_CACHE_SIZE", "1024"))
+
+
+class KeywordHits:
+    """Keywords found in one text, per class, in vocabulary order."""
+
+    def __init__(self, by_class: Dict[str, List[str]]):
+        self.by_class = by_class
+
+    def get(self, keyword_class: str) -> List[str]:
+        return self.by_class.get(keyword_class, [])
+
+    def has(self, keyword_class: str) -> bool:
+        return bool(self.by_class.get(keyword_class))
+
+    def __repr__(self):
+        return f"KeywordHits({self.by_class})"
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over all keyword classes."""
+
+    def __init__(self, classes: Dict[str, Iterable[str]]):
+        self.classes = {name: list(keywords) for name, keywords in classes.items()}
+
+        # keyword id -> [(class, position in class list)]
+        self.keywords: List[str] = []
+        self.memberships: List[List[tuple]] = []
+        keyword_ids: Dict[str, int] = {}
+        for name, keywords in self.classes.items():
+            for position, keyword in enumerate(keywords):
+                folded = keyword.lower()
+                if not folded:
+                    continue
+                if folded not in keyword_ids:
+                    keyword_ids[folded] = len(self.keywords)
+                    self.keywords.append(folded)
+                    self.memberships.append([])
+                self.memberships[keyword_ids[folded]].append((name, position))
+
+        # Trie
+        self.goto: List[Dict[str, int]] = [{}]
+        self.output: List[List[int]] = [[]]
+        for keyword_id, keyword in enumerate(self.keywords):
+            state = 0
+            for ch in keyword:
+                next_state = self.goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][ch] = next_state
+                    self.goto.append({})
+                    self.output.append([])
+                state = next_state
+            self.output[state].append(keyword_id)
+
+        # Failure links (BFS), merging the outputs of suffix states
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())  # depth-1 states fail to the root
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(ch, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+        self.scan = lru_cache(maxsize=SCAN_CACHE_SIZE)(self._scan)
+
+    @classmethod
+    def from_file(cls, path: Path) -> "KeywordMatcher":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["classes"])
+
+    def find(self, text: str) -> set:
+        """Ids of every keyword occurring in text (one pass)."""
+        found = set()
+        state = 0
+        goto, fail, output = self.goto, self.fail, self.output
+        for ch in text.lower():
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+    def _scan(self, text: str) -> KeywordHits:
+        positions: Dict[str, List[int]] = {}
+        for keyword_id in self.find(text):
+            for name, position in self.memberships[keyword_id]:
+                positions.setdefault(name, []).append(position)
+        return KeywordHits({
+            name: [self.classes[name][p] for p in sorted(found)]
+            for name, found in positions.items()
+        })
+
+
+_matcher: Optional[KeywordMatcher] = None
+_matcher_mtime = None
+_matcher_lock = threading.Lock()
+
+
+def get_keyword_matcher() -> KeywordMatcher:
+    """Matcher for keyword_vocab.json, rebuilt when the file changes."""
+    global _matcher, _matcher_mtime
+    mtime = os.path.getmtime(KEYWORD_VOCAB_PATH)
+    if _matcher is not None and mtime == _matcher_mtime:
+        return _matcher
+    with _matcher_lock:
+        if _matcher is None or mtime != _matcher_mtime:
+            _matcher = KeywordMatcher.from_file(KEYWORD_VOCAB_PATH)
+            _matcher_mtime = mtime
+        return _matcher
+
+
+def scan_keywords(text: str) -> KeywordHits:
+    """All keyword-class hits for a text (memoized per text)."""
+    return get_keyword_matcher().scan(text)
@@ -0,0 +1,138 @@
+"""
+BM25 inverted index over Korean character n-grams.
+
+Product names such as "제로백H종신", "레이디H보장보험" or "H건강플러스" match
+exactly in text but only fuzzily in embedding space. This index tokenizes each
+chunk's `searchable_text`, `product_name_clean` and `title` metadata into
+character bi-grams and tri-grams (per whitespace token, case-folded, NFKC) and
+scores queries with BM25. The corpus is the metadata already held by the local
+mirror (local_vector_index), so no extra Pinecone traffic is needed, and the
+mirror's filter_mask applies the same Pinecone filters to lexical hits.
+
+Results are fused with vector results by reciprocal rank fusion (see
+retrieval_results.reciprocal_rank_fusion).
+"""
+
+import math
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from retrieval_results import Match, QueryResults
+
+# Metadata fields indexed, with their term-frequency weight
+INDEXED_FIELDS = {
+    "searchable_text": 1.0,
+    "product_name_clean": 3.0,
+    "title": 2.0,
+}
+NGRAM_SIZES = (2, 3)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def ngrams(text: str) -> List[str]:
+    """Character bi-/tri-grams of each whitespace token (single characters kept as-is)."""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    terms = []
+    for token in text.split():
+        token = "".join(ch for ch in token if ch.isalnum() or ch == "%" or ch == ".")
+        if not token:
+            continue
+        if len(token) < min(NGRAM_SIZES):
+            terms.append(token)
+            continue
+        for n in NGRAM_SIZES:
+            terms.extend(token[i:i + n] for i in range(len(token) - n + 1))
+    return terms
+
+
+class LexicalIndex:
+    """BM25 over n-grams of the local mirror's text metadata."""
+
+    def __init__(self, local_index):
+        self.local_index = local_index
+        self.size = local_index.size
+
+        postings = defaultdict(dict)
+        lengths = np.zeros(self.size, dtype=np.float32)
+        for field, weight in INDEXED_FIELDS.items():
+            values = local_index.columns.get(field)
+            if values is None:
+                continue
+            for row, value in enumerate(values):
+                if not isinstance(value, str) or not value:
+                    continue
+                terms = Counter(ngrams(value))
+                lengths[row] += weight * sum(terms.values())
+                for term, tf in terms.items():
+                    row_postings = postings[term]
+                    row_postings[row] = row_postings.get(row, 0.0) + weight * tf
+
+        self.average_length = float(lengths[lengths > 0].mean()) if (lengths > 0).any() else 1.0
+        self.length_norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / self.average_length)
+
+        # term -> (rows, tf, idf) as arrays for vectorized scoring
+        self.postings: Dict[str, tuple] = {}
+        for term, row_postings in postings.items():
+            rows = np.fromiter(row_postings.keys(), dtype=np.int64, count=len(row_postings))
+            tf = np.fromiter(row_postings.values(), dtype=np.float32, count=len(row_postings))
+            idf = math.log(1 + (self.size - rows.size + 0.5) / (rows.size + 0.5))
+            self.postings[term] = (rows, tf, idf)
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every row for a query (0 = no shared n-gram)."""
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term, query_tf in Counter(ngrams(query)).items():
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            rows, tf, idf = posting
+            scores[rows] += query_tf * idf * tf * (BM25_K1 + 1) / (tf + self.length_norm[rows])
+        return scores
+
+    def search(self, query: str, top_k: int = 10, filter: Optional[dict] = None) -> QueryResults:
+        """
+        Top-k BM25 search.
+
+        Args:
+            query: Search text
+            top_k: Number of matches
+            filter: Pinecone-style metadata filter (applied via the local mirror)
+
+        Returns:
+            QueryResults whose match scores are BM25 scores
+        """
+        scores = self.scores(query)
+        if filter:
+            scores[~self.local_index.filter_mask(filter)] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if candidates.size == 0:
+            return QueryResults(matches=[])
+
+        k = min(top_k, candidates.size)
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return QueryResults(matches=[
+            Match(id=self.local_index.ids[row], score=float(scores[row]), metadata=self.local_index.metadata(row))
+            for row in top
+        ])
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def get_lexical_index(local_index) -> LexicalIndex:
+    """Lexical index for a local mirror, rebuilt whenever the mirror changes."""
+    version = (id(local_index), local_index.size, local_index.synced_at)
+    with _cache_lock:
+        lexical_index = _cache.get(version)
+        if lexical_index is None:
+            lexical_index = LexicalIndex(local_index)
+            _cache.clear()
+            _cache[version] = lexical_index
+        return lexical_index
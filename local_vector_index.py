@@ -0,0 +1,587 @@
+"""
+In-process NumPy mirror of a Pinecone namespace.
+
+The production namespace (hof-knowledge-base-max) holds a few hundred to a few
+thousand vectors, so it fits comfortably in memory. This module keeps:
+- a contiguous, L2-normalized float32 matrix of all vectors
+- a columnar metadata store (one value list per metadata field)
+and answers top-k cosine queries with a single matrix-vector product plus the
+Pinecone filter operators used by the rewrite prompt ($eq, $ne, $in, $nin,
+$gt/$gte/$lt/$lte on numbers, $exists, $and, $or and implicit equality).
+
+With LOCAL_INDEX_QUANTIZATION=int8 (4x smaller) or binary (32x smaller) the
+resident scan runs over quantized codes; the best top_k * RESCORE_FACTOR
+candidates are then rescored exactly against the float32 vectors, which are
+memory-mapped from the snapshot so only candidate rows are paged in.
+
+Snapshots are persisted under .cache/local_index/<namespace>/ so the serving
+process starts without a full sync, and ingestion scripts refresh them
+incrementally after upserting (see refresh_snapshot).
+"""
+
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from retrieval_results import Match, QueryResults
+
+load_dotenv()
+
+SCRIPT_DIR = Path(__file__).parent
+SNAPSHOT_ROOT = Path(os.getenv("LOCAL_INDEX_DIR", str(SCRIPT_DIR / ".cache" / "local_index")))
+# Build the snapshot from Pinecone on first use when none exists on disk
+AUTO_SYNC = os.getenv("LOCAL_INDEX_AUTO_SYNC", "true").lower() not in ("0", "false", "no")
+# Background incremental refresh against Pinecone (0 = only reload snapshots written by ingestion)
+REFRESH_SECONDS = float(os.getenv("LOCAL_INDEX_REFRESH_SECONDS", "0"))
+
+# Resident representation for the similarity scan: none | int8 | binary
+QUANTIZATION = os.getenv("LOCAL_INDEX_QUANTIZATION", "none").lower()
+# Candidates kept from the quantized scan for exact float rescoring (x top_k)
+RESCORE_FACTOR = int(os.getenv("LOCAL_INDEX_RESCORE_FACTOR", "4"))
+QUANTIZED_SCAN_BLOCK = 4096
+
+FETCH_BATCH_SIZE = 100
+
+# Set bits per byte value, for Hamming distances over packed sign bits
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint16)
+
+_MISSING = None
+
+
+def _value_key(value):
+    """Hashable key that keeps booleans distinct from 0/1."""
+    return (type(value) is bool, value)
+
+
+class LocalVectorIndex:
+    """Dense float32 matrix + columnar metadata mirror of one namespace."""
+
+    def __init__(self, namespace: str, dimensions: Optional[int] = None, quantization: Optional[str] = None):
+        self.namespace = namespace
+        self.dimensions = dimensions
+        self.quantization = (quantization or QUANTIZATION).lower()
+        if self.quantization not in ("none", "int8", "binary"):
+            raise ValueError(f"Unknown quantization: {self.quantization}")
+        self._codes = None
+        self._code_scale = 1.0
+        self.ids: List[str] = []
+        self.vectors = np.zeros((0, dimensions or 0), dtype=np.float32)
+        self.columns: Dict[str, List[Any]] = {}
+        self._positions: Dict[str, int] = {}
+        self._encoded: Dict[str, tuple] = {}
+        self._lock = threading.RLock()
+        self.synced_at = None
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        """Reassemble one row's metadata from the columnar store."""
+        return {
+            field: values[row]
+            for field, values in self.columns.items()
+            if values[row] is not _MISSING
+        }
+
+    def upsert(self, records):
+        """
+        Insert or replace vectors.
+
+        Args:
+            records: Iterable of (id, values, metadata) tuples
+        """
+        records = list(records)
+        if not records:
+            return
+
+        with self._lock:
+            matrix = np.asarray([values for _, values, _ in records], dtype=np.float32)
+            if self.dimensions is None:
+                self.dimensions = matrix.shape[1]
+                self.vectors = np.zeros((0, self.dimensions), dtype=np.float32)
+            matrix = matrix[:, :self.dimensions]
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(norms == 0, 1, norms)
+
+            appended = []
+            for (vector_id, _, metadata), row_vector in zip(records, matrix):
+                metadata = metadata or {}
+                row = self._positions.get(vector_id)
+                if row is None:
+                    row = len(self.ids)
+                    self._positions[vector_id] = row
+                    self.ids.append(vector_id)
+                    for values in self.columns.values():
+                        values.append(_MISSING)
+                    appended.append(row_vector)
+                else:
+                    self.vectors[row] = row_vector
+                    for values in self.columns.values():
+                        values[row] = _MISSING
+
+                for field, value in metadata.items():
+                    if field not in self.columns:
+                        self.columns[field] = [_MISSING] * len(self.ids)
+                    self.columns[field][row] = value
+
+            if appended:
+                self.vectors = np.ascontiguousarray(np.vstack([self.vectors, np.asarray(appended)]))
+            self._encoded.clear()
+            self._codes = None
+
+    def remove(self, ids):
+        """Drop vectors by ID."""
+        drop = {self._positions[i] for i in ids if i in self._positions}
+        if not drop:
+            return
+
+        with self._lock:
+            keep = [row for row in range(len(self.ids)) if row not in drop]
+            self.ids = [self.ids[row] for row in keep]
+            self.vectors = np.ascontiguousarray(self.vectors[keep])
+            self.columns = {
+                field: [values[row] for row in keep]
+                for field, values in self.columns.items()
+            }
+            self.columns = {f: v for f, v in self.columns.items() if any(x is not _MISSING for x in v)}
+            self._positions = {vector_id: row for row, vector_id in enumerate(self.ids)}
+            self._encoded.clear()
+            self._codes = None
+
+    # ------------------------------------------------------------------
+    # Pinecone synchronisation
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _list_remote_ids(index, namespace: str) -> List[str]:
+        remote_ids = []
+        for page in index.list(namespace=namespace):
+            remote_ids.extend(page)
+        return remote_ids
+
+    def _fetch(self, index, ids: List[str]):
+        for start in range(0, len(ids), FETCH_BATCH_SIZE):
+            batch = ids[start:start + FETCH_BATCH_SIZE]
+            response = index.fetch(ids=batch, namespace=self.namespace)
+            self.upsert(
+                (vector_id, vector.values, dict(vector.metadata or {}))
+                for vector_id, vector in response.vectors.items()
+            )
+
+    def sync(self, index):
+        """Full sync of the namespace from a Pinecone Index."""
+        with self._lock:
+            self.ids, self._positions, self.columns = [], {}, {}
+            self.vectors = np.zeros((0, self.dimensions or 0), dtype=np.float32)
+            self._encoded.clear()
+            self._codes = None
+        self._fetch(index, self._list_remote_ids(index, self.namespace))
+        self.synced_at = time.time()
+        print(f"✅ 로컬 인덱스 동기화 완료: {self.namespace} ({self.size}개 벡터)")
+
+    def refresh(self, index) -> dict:
+        """
+        Incremental refresh: fetch IDs that are new in Pinecone and drop IDs that
+        no longer exist. Existing vectors are not re-downloaded.
+        """
+        remote_ids = self._list_remote_ids(index, self.namespace)
+        remote_set = set(remote_ids)
+        added = [i for i in remote_ids if i not in self._positions]
+        removed = [i for i in self.ids if i not in remote_set]
+
+        self.remove(removed)
+        self._fetch(index, added)
+        self.synced_at = time.time()
+        print(f"🔄 로컬 인덱스 갱신: +{len(added)} / -{len(removed)} (총 {self.size}개)")
+        return {"added": len(added), "removed": len(removed), "total": self.size}
+
+    # ------------------------------------------------------------------
+    # Filtering
+    # ------------------------------------------------------------------
+
+    def _encode_column(self, field: str):
+        """Dictionary-encode a scalar column (codes, vocab) or flag it as a list column."""
+        cached = self._encoded.get(field)
+        if cached is not None:
+            return cached
+
+        values = self.columns.get(field, [_MISSING] * self.size)
+        if any(isinstance(v, (list, tuple)) for v in values):
+            encoded = ("list", [set(_value_key(x) for x in v) if isinstance(v, (list, tuple))
+                                else ({_value_key(v)} if v is not _MISSING else set()) for v in values])
+        else:
+            vocab = {}
+            codes = np.full(len(values), -1, dtype=np.int32)
+            numeric = np.full(len(values), np.nan, dtype=np.float64)
+            for row, value in enumerate(values):
+                if value is _MISSING:
+                    continue
+                codes[row] = vocab.setdefault(_value_key(value), len(vocab))
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    numeric[row] = value
+            encoded = ("scalar", codes, vocab, numeric)
+
+        self._encoded[field] = encoded
+        return encoded
+
+    def _field_mask(self, field: str, condition) -> np.ndarray:
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+
+        encoded = self._encode_column(field)
+        mask = np.ones(self.size, dtype=bool)
+
+        for op, operand in condition.items():
+            if encoded[0] == "list":
+                sets = encoded[1]
+                if op in ("$eq", "$in"):
+                    wanted = {_value_key(v) for v in (operand if op == "$in" else [operand])}
+                    op_mask = np.fromiter((bool(s & wanted) for s in sets), dtype=bool, count=self.size)
+                elif op in ("$ne", "$nin"):
+                    unwanted = {_value_key(v) for v in (operand if op == "$nin" else [operand])}
+                    op_mask = np.fromiter((not (s & unwanted) for s in sets), dtype=bool, count=self.size)
+                elif op == "$exists":
+                    present = np.fromiter((bool(s) for s in sets), dtype=bool, count=self.size)
+                    op_mask = present if operand else ~present
+                else:
+                    raise ValueError(f"Unsupported operator {op} on list field '{field}'")
+            else:
+                _, codes, vocab, numeric = encoded
+                if op == "$eq":
+                    op_mask = codes == vocab.get(_value_key(operand), -2)
+                elif op == "$ne":
+                    op_mask = codes != vocab.get(_value_key(operand), -2)
+                elif op in ("$in", "$nin"):
+                    wanted = [vocab[_value_key(v)] for v in operand if _value_key(v) in vocab]
+                    op_mask = np.isin(codes, wanted)
+                    if op == "$nin":
+                        op_mask = ~op_mask
+                elif op in ("$gt", "$gte", "$lt", "$lte"):
+                    if not isinstance(operand, (int, float)) or isinstance(operand, bool):
+                        raise ValueError(f"{op} requires a number, got {operand!r} for '{field}'")
+                    with np.errstate(invalid="ignore"):
+                        op_mask = {
+                            "$gt": numeric > operand,
+                            "$gte": numeric >= operand,
+                            "$lt": numeric < operand,
+                            "$lte": numeric <= operand,
+                        }[op]
+                elif op == "$exists":
+                    op_mask = (codes >= 0) if operand else (codes < 0)
+                else:
+                    raise ValueError(f"Unsupported filter operator: {op}")
+            mask &= op_mask
+
+        return mask
+
+    def filter_mask(self, flt: Optional[dict]) -> np.ndarray:
+        """Boolean row mask for a Pinecone-style metadata filter."""
+        mask = np.ones(self.size, dtype=bool)
+        if not flt:
+            return mask
+
+        for key, value in flt.items():
+            if key == "$and":
+                for clause in value:
+                    mask &= self.filter_mask(clause)
+            elif key == "$or":
+                any_mask = np.zeros(self.size, dtype=bool)
+                for clause in value:
+                    any_mask |= self.filter_mask(clause)
+                mask &= any_mask
+            elif key.startswith("$"):
+                raise ValueError(f"Unsupported top-level operator: {key}")
+            else:
+                mask &= self._field_mask(key, value)
+        return mask
+
+    # ------------------------------------------------------------------
+    # Query
+    # ------------------------------------------------------------------
+
+    def similarity(self, vector, ids) -> Dict[str, float]:
+        """Exact cosine similarity between a query vector and the given stored IDs."""
+        with self._lock:
+            query = np.asarray(vector, dtype=np.float32)[:self.dimensions]
+            norm = np.linalg.norm(query)
+            if norm:
+                query = query / norm
+            rows = [self._positions[i] for i in ids if i in self._positions]
+            if not rows:
+                return {}
+            scores = self.vectors[rows] @ query
+            return {self.ids[row]: float(score) for row, score in zip(rows, scores)}
+
+    def _quantized_codes(self):
+        """Build (lazily) the resident int8 / packed-binary codes of all vectors."""
+        if self._codes is None:
+            if self.quantization == "int8":
+                peak = float(np.abs(self.vectors).max()) if self.size else 1.0
+                self._code_scale = 127.0 / peak if peak else 1.0
+                self._codes = np.round(self.vectors * self._code_scale).astype(np.int8)
+            else:
+                self._codes = np.packbits(self.vectors > 0, axis=1)
+        return self._codes
+
+    def _approximate_scores(self, query: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        """Scores from the quantized codes (higher is better), scanned in blocks."""
+        codes = self._quantized_codes()
+        scores = np.empty(candidates.size, dtype=np.float32)
+
+        if self.quantization == "int8":
+            for start in range(0, candidates.size, QUANTIZED_SCAN_BLOCK):
+                block = codes[candidates[start:start + QUANTIZED_SCAN_BLOCK]]
+                scores[start:start + block.shape[0]] = block.astype(np.float32) @ query
+        else:
+            query_bits = np.packbits(query > 0)
+            for start in range(0, candidates.size, QUANTIZED_SCAN_BLOCK):
+                block = codes[candidates[start:start + QUANTIZED_SCAN_BLOCK]]
+                hamming = _POPCOUNT[np.bitwise_xor(block, query_bits)].sum(axis=1, dtype=np.int32)
+                scores[start:start + block.shape[0]] = -hamming
+        return scores
+
+    @staticmethod
+    def _top(scores: np.ndarray, k: int) -> np.ndarray:
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])]
+
+    def query(self, vector, top_k: int = 10, filter: Optional[dict] = None,
+              include_metadata: bool = True) -> QueryResults:
+        """
+        Top-k cosine similarity search.
+
+        Args:
+            vector: Query embedding
+            top_k: Number of matches
+            filter: Pinecone-style metadata filter
+            include_metadata: Attach metadata to matches
+
+        Returns:
+            QueryResults with Pinecone-compatible matches
+        """
+        with self._lock:
+            if self.size == 0:
+                return QueryResults(matches=[])
+
+            query = np.asarray(vector, dtype=np.float32)[:self.dimensions]
+            norm = np.linalg.norm(query)
+            if norm:
+                query = query / norm
+
+            candidates = np.flatnonzero(self.filter_mask(filter))
+            if candidates.size == 0:
+                return QueryResults(matches=[])
+
+            k = min(top_k, candidates.size)
+            if self.quantization == "none":
+                candidate_scores = (self.vectors @ query)[candidates]
+            else:
+                # Quantized scan for a shortlist, exact float scores for the shortlist only
+                shortlist = min(candidates.size, k * max(RESCORE_FACTOR, 1))
+                approximate = self._approximate_scores(query, candidates)
+                candidates = candidates[np.sort(self._top(approximate, shortlist))]
+                candidate_scores = self.vectors[candidates] @ query
+            top = self._top(candidate_scores, k)
+
+            return QueryResults(matches=[
+                Match(
+                    id=self.ids[candidates[i]],
+                    score=float(candidate_scores[i]),
+                    metadata=self.metadata(candidates[i]) if include_metadata else {}
+                )
+                for i in top
+            ])
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    def save(self, directory: Path):
+        """Persist the mirror (vectors.npy + columns.json + manifest.json)."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        with self._lock:
+            tmp_vectors = directory / "vectors.tmp.npy"
+            np.save(tmp_vectors, self.vectors)
+            os.replace(tmp_vectors, directory / "vectors.npy")
+
+            tmp_columns = directory / "columns.json.tmp"
+            with open(tmp_columns, "w", encoding="utf-8") as f:
+                json.dump({"ids": self.ids, "columns": self.columns}, f, ensure_ascii=False)
+            os.replace(tmp_columns, directory / "columns.json")
+
+            # Manifest last: readers reload when it changes
+            tmp_manifest = directory / "manifest.json.tmp"
+            with open(tmp_manifest, "w", encoding="utf-8") as f:
+                json.dump({
+                    "namespace": self.namespace,
+                    "dimensions": self.dimensions,
+                    "count": self.size,
+                    "synced_at": self.synced_at,
+                    "saved_at": time.time()
+                }, f)
+            os.replace(tmp_manifest, directory / "manifest.json")
+
+    @classmethod
+    def load(cls, directory: Path, quantization: Optional[str] = None) -> "LocalVectorIndex":
+        """Load a snapshot written by save()."""
+        directory = Path(directory)
+        with open(directory / "manifest.json", "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        with open(directory / "columns.json", "r", encoding="utf-8") as f:
+            stored = json.load(f)
+
+        local_index = cls(manifest["namespace"], manifest["dimensions"], quantization)
+        local_index.ids = stored["ids"]
+        local_index.columns = stored["columns"]
+        if local_index.quantization == "none":
+            local_index.vectors = np.ascontiguousarray(np.load(directory / "vectors.npy"))
+        else:
+            # Copy-on-write map: only rescored rows are read from disk
+            local_index.vectors = np.load(directory / "vectors.npy", mmap_mode="c")
+        local_index._positions = {vector_id: row for row, vector_id in enumerate(local_index.ids)}
+        local_index.synced_at = manifest.get("synced_at")
+        return local_index
+
+
+def snapshot_dir(namespace: str) -> Path:
+    return SNAPSHOT_ROOT / namespace
+
+
+def refresh_snapshot(index, namespace: str) -> LocalVectorIndex:
+    """
+    Ingestion hook: bring the on-disk snapshot up to date after an upload.
+    Serving processes pick the new snapshot up on their next query.
+    """
+    directory = snapshot_dir(namespace)
+    if (directory / "manifest.json").exists():
+        local_index = LocalVectorIndex.load(directory)
+        local_index.refresh(index)
+    else:
+        local_index = LocalVectorIndex(namespace)
+        local_index.sync(index)
+    local_index.save(directory)
+    return local_index
+
+
+class _ServingMirror:
+    """Snapshot-backed mirror used by the serving process."""
+
+    def __init__(self, namespace: str, index_factory):
+        self.namespace = namespace
+        self.index_factory = index_factory
+        self.local_index: Optional[LocalVectorIndex] = None
+        self.manifest_mtime = None
+        self.last_refresh = time.time()
+        self.refreshing = False
+        self.loading = False
+        self.lock = threading.Lock()
+
+    def _manifest_mtime(self):
+        manifest = snapshot_dir(self.namespace) / "manifest.json"
+        return manifest.stat().st_mtime if manifest.exists() else None
+
+    def _background_refresh(self):
+        try:
+            self.local_index.refresh(self.index_factory())
+            self.local_index.save(snapshot_dir(self.namespace))
+            self.manifest_mtime = self._manifest_mtime()
+        except Exception as e:
+            print(f"⚠️ 로컬 인덱스 갱신 실패: {e}")
+        finally:
+            self.last_refresh = time.time()
+            self.refreshing = False
+
+    def get(self, sync: bool = True) -> Optional[LocalVectorIndex]:
+        # Snapshot loads and Pinecone syncs run outside the lock: callers that
+        # arrive meanwhile get the index currently published (possibly None,
+        # i.e. Pinecone) instead of waiting for the build
+        mtime = self._manifest_mtime()
+        with self.lock:
+            load = mtime is not None and mtime != self.manifest_mtime
+            build = (not load and self.local_index is None and sync and AUTO_SYNC
+                     and self.index_factory is not None)
+            if self.loading:
+                load = build = False
+            if load or build:
+                self.loading = True
+            local_index = self.local_index
+
+        if load or build:
+            try:
+                if load:
+                    local_index = LocalVectorIndex.load(snapshot_dir(self.namespace))
+                    print(f"📦 로컬 인덱스 스냅샷 로드: {self.namespace} ({local_index.size}개 벡터)")
+                else:
+                    # Publish only a fully synced and saved index; a failed sync
+                    # leaves the mirror empty instead of serving a partial one
+                    local_index = LocalVectorIndex(self.namespace)
+                    local_index.sync(self.index_factory())
+                    local_index.save(snapshot_dir(self.namespace))
+                    mtime = self._manifest_mtime()
+                with self.lock:
+                    self.local_index = local_index
+                    self.manifest_mtime = mtime
+            finally:
+                with self.lock:
+                    self.loading = False
+
+        with self.lock:
+            if (REFRESH_SECONDS > 0 and self.local_index is not None and not self.refreshing
+                    and time.time() - self.last_refresh >= REFRESH_SECONDS):
+                self.refreshing = True
+                threading.Thread(target=self._background_refresh, daemon=True).start()
+
+        return local_index
+
+
+_mirrors: Dict[str, _ServingMirror] = {}
+_mirrors_lock = threading.Lock()
+
+
+def get_local_index(namespace: str, index_factory=None, sync: bool = True) -> Optional[LocalVectorIndex]:
+    """
+    Serving-side accessor. Loads (or reloads, after ingestion) the snapshot for
+    a namespace; builds it from Pinecone on first use when LOCAL_INDEX_AUTO_SYNC
+    is on.
+
+    Args:
+        namespace: Pinecone namespace
+        index_factory: Zero-argument callable returning a Pinecone Index
+        sync: Allow the full Pinecone sync; request handlers pass False so they
+            only ever load snapshots and never wait on a sync
+
+    Returns:
+        LocalVectorIndex, or None if no snapshot is available
+    """
+    with _mirrors_lock:
+        mirror = _mirrors.get(namespace)
+        if mirror is None:
+            mirror = _mirrors[namespace] = _ServingMirror(namespace, index_factory)
+        elif mirror.index_factory is None:
+            mirror.index_factory = index_factory
+    return mirror.get(sync=sync)
+
+
+if __name__ == "__main__":
+    import sys
+    from pinecone import Pinecone
+
+    index_name = "hof-branch-chatbot"
+    namespace = sys.argv[1] if len(sys.argv) > 1 else "hof-knowledge-base-max"
+
+    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+    local_index = refresh_snapshot(pc.Index(index_name), namespace)
+    print(f"Snapshot: {snapshot_dir(namespace)} ({local_index.size} vectors, {local_index.dimensions} dims)")
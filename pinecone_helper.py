@@ -5,6 +5,8 @@ import os
 from pinecone import Pinecone
 from openai import OpenAI
 from dotenv import load_dotenv
+from embedding_cache import embed_text
+from embedding_config import BASE_INDEX_DIMENSIONS, EMBEDDING_MODEL, NAMESPACE_DIMENSIONS, dimensions_for, index_name_for
 
 load_dotenv()
 
@@ -35,7 +37,15 @@ def query_pinecone(question: str, top_k: int = 10, rerank_top_n: int = 3, index_
         pc = Pinecone(api_key=pinecone_api_key)
         openai_client = OpenAI(api_key=openai_api_key)
         
-        # Get the index with proper host
+        # Get the index with proper host. Only namespaces listed in
+        # EMBEDDING_NAMESPACE_DIMENSIONS live in a reduced-dimension sibling
+        # index; the legacy kakaotalk-qa index stays at the full 3072 dimensions
+        # whatever EMBEDDING_DIMENSIONS says
+        if namespace in NAMESPACE_DIMENSIONS:
+            dimensions = dimensions_for(namespace)
+            index_name = index_name_for(index_name, namespace)
+        else:
+            dimensions = BASE_INDEX_DIMENSIONS
         index_info = pc.describe_index(index_name)
         index_host = index_info.host
         
@@ -46,11 +56,7 @@ def query_pinecone(question: str, top_k: int = 10, rerank_top_n: int = 3, index_
         
         # Generate embedding for the question using OpenAI
         print("🧠 Generating question embedding...")
-        embedding_response = openai_client.embeddings.create(
-            model="text-embedding-3-large",
-            input=question
-        )
-        query_embedding = embedding_response.data[0].embedding
+        query_embedding = embed_text(openai_client, question, EMBEDDING_MODEL, dimensions)
         
         # Query Pinecone with the embedding vector
         print(f"🔎 Searching Pinecone...")
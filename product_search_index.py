@@ -0,0 +1,247 @@
+"""
+Candidate-generation index for fuzzy commission product matching.
+
+fuzzyMatchProduct scores every product: for each query keyword it adds 1.0
+when the keyword is contained in the normalized name, 0.5 x the Levenshtein
+similarity (longer - distance) / longer, and 0.8 when the keyword is one of
+the product's keywords; +2.0 for a payment-period match and +1.5 for a company
+hint. A full scan computes an edit distance against every product name, and
+the catalog grows every month.
+
+ProductSearchIndex returns the same top-k (same scores, same tie order) while
+computing edit distances for a handful of products only:
+
+- names are normalized once (product_name_normalized); a character
+  (unigram) inverted index with per-name counts gives the shared-character
+  count of every product in one pass over the keyword's postings (both
+  precomputed in the columnar artifact, see commission_columnar). Since distance >= longer - shared, the
+  similarity is bounded by shared / longer (and is exactly 0 without shared
+  characters)
+- a bigram inverted index generates "contains" candidates (verified with `in`)
+- period / company bonuses come from the distinct period / company values
+- products are visited by descending score upper bound; each keyword's edit
+  distance is a bounded two-row DP that exits as soon as the product can no
+  longer reach the current top-k (a min-heap), and the visit stops once the
+  bound drops below the k-th score
+"""
+
+import heapq
+import os
+from collections import Counter
+from functools import lru_cache
+from typing import List, Optional
+
+import numpy as np
+
+from commission_columnar import ColumnarCatalog
+
+KEYWORD_CACHE_SIZE = int(os.getenv("COMMISSION_KEYWORD_CACHE_SIZE", "1024"))
+_EPS = 1e-9
+
+
+def normalize(text: str) -> str:
+    """Lowercase without whitespace (product_name_normalized / keywordNorm)."""
+    return "".join(str(text).lower().split())
+
+
+def bounded_levenshtein(a: str, b: str, max_distance: Optional[int] = None) -> int:
+    """
+    Edit distance with two rows and early exit.
+
+    Args:
+        a, b: Strings to compare
+        max_distance: Stop once the distance is known to exceed this (None: exact)
+
+    Returns:
+        The distance, or max_distance + 1 when it exceeds max_distance
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if max_distance is not None and len(a) - len(b) > max_distance:
+        return max_distance + 1
+    if not b:
+        return len(a)
+
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        row_min = i
+        for j, cb in enumerate(b, 1):
+            value = min(previous[j - 1] + (ca != cb), current[j - 1] + 1, previous[j] + 1)
+            current.append(value)
+            if value < row_min:
+                row_min = value
+        if max_distance is not None and row_min > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+def string_similarity(str1: str, str2: str) -> float:
+    """(longer - distance) / longer, as _stringSimilarity in the JS engine."""
+    longer = max(len(str1), len(str2))
+    if longer == 0:
+        return 1.0
+    return (longer - bounded_levenshtein(str1, str2)) / longer
+
+
+class ProductSearchIndex:
+    """Inverted n-gram index over product_name_normalized with top-k search."""
+
+    def __init__(self, catalog: ColumnarCatalog):
+        """
+        Args:
+            catalog: Commission products; names and postings are read from its
+                columns (precomputed by commission_columnar), products are
+                materialized only for search results
+        """
+        self.catalog = catalog
+        self.names = catalog.names_normalized
+        self.name_lengths = catalog.name_length.astype(np.int64)
+        self._keyword_bounds = lru_cache(maxsize=KEYWORD_CACHE_SIZE)(self._compute_keyword_bounds)
+
+    def __len__(self) -> int:
+        return len(self.catalog)
+
+    def _compute_keyword_bounds(self, keyword: str) -> tuple:
+        """(contains mask, listed mask, similarity upper bound) over all products for one keyword."""
+        n = len(self.catalog)
+        unigrams, bigrams = self.catalog.unigrams, self.catalog.bigrams
+        contains = np.zeros(n, dtype=bool)
+        if not keyword:
+            contains[:] = True
+        elif len(keyword) == 1:
+            ids = unigrams.get(keyword)
+            if ids is not None:
+                contains[ids] = True
+        else:
+            postings = [bigrams.get(keyword[k:k + 2]) for k in range(len(keyword) - 1)]
+            if all(p is not None for p in postings):
+                postings.sort(key=len)
+                ids = postings[0]
+                for other in postings[1:]:
+                    ids = np.intersect1d(ids, other, assume_unique=True)
+                for i in ids:
+                    if keyword in self.names[i]:
+                        contains[i] = True
+
+        listed = np.zeros(n, dtype=bool)
+        ids = self.catalog.keyword_postings.get(keyword)
+        if ids is not None:
+            listed[ids] = True
+
+        shared = np.zeros(n, dtype=np.int64)
+        for ch, count in Counter(keyword).items():
+            posting = unigrams.get_counts(ch)
+            if posting is not None:
+                ids, counts = posting
+                shared[ids] += np.minimum(counts, count)
+        longer = np.maximum(self.name_lengths, len(keyword))
+        similarity = np.divide(shared, longer, out=np.ones(n, dtype=np.float64), where=longer > 0)
+
+        for array in (contains, listed, similarity):
+            array.setflags(write=False)
+        return contains, listed, similarity
+
+    def containing(self, keyword: str) -> np.ndarray:
+        """Products whose normalized name contains keyword (used as given)."""
+        return np.flatnonzero(self._keyword_bounds(keyword)[0])
+
+    def contains_any(self, keyword: str) -> bool:
+        """Whether any product name contains the (normalized) keyword."""
+        return bool(self._keyword_bounds(normalize(keyword))[0].any())
+
+    def _bonuses(self, payment_period: Optional[str], company_hint) -> tuple:
+        catalog = self.catalog
+        period_match = np.zeros(len(catalog), dtype=bool)
+        if payment_period:
+            period_norm = normalize(payment_period)
+            codes = [code for code, (_, period) in enumerate(catalog.periods) if period and period_norm in period]
+            period_match = np.isin(catalog.period_code, codes)
+        company_match = np.zeros(len(catalog), dtype=bool)
+        if company_hint:
+            hint = str(company_hint)
+            codes = [code for code, company in enumerate(catalog.companies) if hint in company]
+            company_match = np.isin(catalog.company_code, codes)
+        return period_match, company_match
+
+    def search(self, keywords: List[str], payment_period: Optional[str] = None,
+               company_hint=None, limit: int = 5) -> List[dict]:
+        """
+        Top products by fuzzyMatchProduct score.
+
+        Args:
+            keywords: Product keywords from the parsed query
+            payment_period: Payment period (e.g. "5년납")
+            company_hint: Company name fragment
+            limit: Number of products to return
+
+        Returns:
+            Product dicts with match_score, best first (score > 0 only)
+        """
+        keyword_norms = [normalize(k) for k in keywords or []]
+        bounds = [self._keyword_bounds(k) for k in keyword_norms]
+        period_match, company_match = self._bonuses(payment_period, company_hint)
+
+        upper = period_match * 2.0 + company_match * 1.5
+        for contains, listed, similarity in bounds:
+            upper = upper + contains * 1.0 + similarity * 0.5 + listed * 0.8
+
+        candidates = np.flatnonzero(upper > 0)
+        order = candidates[np.lexsort((candidates, -upper[candidates]))]
+
+        heap: List[tuple] = []  # (score, -index): heap[0] is the current k-th best
+        for i in order:
+            i = int(i)
+            bound = float(upper[i])
+            threshold = heap[0][0] if len(heap) == limit else None
+            if threshold is not None and bound + _EPS < threshold:
+                break
+
+            similarities = []
+            for keyword, (contains, listed, similarity) in zip(keyword_norms, bounds):
+                name = self.names[i]
+                longer = max(len(name), len(keyword))
+                sim_bound = float(similarity[i])
+                if longer == 0:
+                    similarities.append(1.0)
+                    continue
+                if sim_bound == 0.0:
+                    similarities.append(0.0)
+                    continue
+                max_distance = None
+                if threshold is not None:
+                    slack = longer * (1.0 - sim_bound + 2.0 * (bound - threshold))
+                    max_distance = int(np.floor(slack + _EPS))
+                    if max_distance < 0:
+                        break
+                distance = bounded_levenshtein(keyword, name, max_distance)
+                if max_distance is not None and distance > max_distance:
+                    break
+                sim = (longer - distance) / longer
+                bound -= 0.5 * (sim_bound - sim)
+                similarities.append(sim)
+            else:
+                # Same accumulation order as the JS engine (identical floats)
+                score = 0
+                for (contains, listed, _), sim in zip(bounds, similarities):
+                    if contains[i]:
+                        score += 1.0
+                    score += sim * 0.5
+                    if listed[i]:
+                        score += 0.8
+                if period_match[i]:
+                    score += 2.0
+                if company_match[i]:
+                    score += 1.5
+                if score <= 0:
+                    continue
+
+                entry = (score, -i)
+                if len(heap) < limit:
+                    heapq.heappush(heap, entry)
+                elif entry > heap[0]:
+                    heapq.heapreplace(heap, entry)
+
+        ranked = sorted(heap, reverse=True)
+        return [{**self.catalog.product(-neg_i), "match_score": score} for score, neg_i in ranked]
@@ -8,11 +8,26 @@ Complete RAG Chatbot Pipeline for HO&F JISA App:
 
 import os
 import json
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from pathlib import Path
 from dotenv import load_dotenv
 from pinecone import Pinecone
 from openai import OpenAI
 from google import genai
+from embedding_cache import embed_text, embed_texts
+from embedding_config import EMBEDDING_MODEL, dimensions_for, index_name_for
+from retrieval_results import merge_by_score, reciprocal_rank_fusion
+from local_vector_index import get_local_index
+from filter_linter import lint_filters
+from lexical_index import get_lexical_index
+from context_packer import pack_context
+from schedule_service import lookup_schedule, render_schedule_answer
+from hanwha_policy_tables import lookup_policy_rates, render_policy_answer
+from keyword_matcher import scan_keywords
+from intent_gate import check_intent
+from federated_retrieval import get_federated_retriever
 
 load_dotenv()
 
@@ -22,10 +37,59 @@ openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 genai_client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
 
 # Constants
-INDEX_NAME = "hof-branch-chatbot"
 NAMESPACE = "hof-knowledge-base-max"
-EMBEDDING_MODEL = "text-embedding-3-large"
-EMBEDDING_DIMENSIONS = 3072
+INDEX_NAME = index_name_for("hof-branch-chatbot", NAMESPACE)
+EMBEDDING_DIMENSIONS = dimensions_for(NAMESPACE)
+
+# Retrieval mode when the LLM proposes filters:
+#   sequential        - filtered query, then an unfiltered re-query only if it returned nothing
+#   speculative       - filtered and unfiltered queries run concurrently; filtered wins when non-empty
+#   speculative_merge - both queries run concurrently and are merged by score
+RETRIEVAL_MODE = os.getenv("RAG_RETRIEVAL_MODE", "speculative")
+
+# Vector backend for retrieve_from_pinecone:
+#   pinecone - always query Pinecone
+#   local    - in-process NumPy mirror of NAMESPACE first, Pinecone as the fallback
+VECTOR_BACKEND = os.getenv("RAG_VECTOR_BACKEND", "pinecone")
+
+# Structured schedule questions (schedule_service):
+#   context - answer from the schedule files via Gemini Pro, skipping rewrite + vector search
+#   render  - reply with the rendered schedule directly (no LLM call)
+#   off     - always use the RAG pipeline
+SCHEDULE_MODE = os.getenv("RAG_SCHEDULE_MODE", "context")
+
+# Hanwha policy commission tables (hanwha_policy_tables), same modes as RAG_SCHEDULE_MODE:
+# "레이디H보장보험 종합 익월" is answered from the parsed table instead of vector search
+POLICY_TABLE_MODE = os.getenv("RAG_POLICY_TABLE_MODE", "context")
+
+# Hybrid retrieval: fuse BM25 n-gram matches (lexical_index) with vector matches by RRF.
+# Uses the local mirror's metadata; without a saved snapshot only vector results are used.
+HYBRID_RETRIEVAL = os.getenv("RAG_HYBRID_RETRIEVAL", "false").lower() in ("1", "true", "yes")
+RRF_K = int(os.getenv("RAG_RRF_K", "60"))
+
+# Federated retrieval: query every target in retrieval_targets.json (indexes / namespaces,
+# sharded namespaces via globs) concurrently instead of NAMESPACE alone
+FEDERATED_RETRIEVAL = os.getenv("RAG_FEDERATED_RETRIEVAL", "false").lower() in ("1", "true", "yes")
+
+# Query pipeline:
+#   sequential - rewrite, then embed the rewrite, then query Pinecone
+#   overlapped - embed the raw utterance and run a speculative Pinecone query while the rewrite runs
+QUERY_PIPELINE_MODE = os.getenv("RAG_QUERY_PIPELINE", "overlapped")
+# Rewrites at least this similar to the raw utterance (character bigram Jaccard) reuse its embedding
+REWRITE_SIMILARITY_THRESHOLD = float(os.getenv("RAG_REWRITE_SIMILARITY", "0.6"))
+# Unfiltered speculative results whose best score reaches this are accepted without re-embedding
+SPECULATIVE_ACCEPT_SCORE = float(os.getenv("RAG_SPECULATIVE_ACCEPT_SCORE", "0.6"))
+
+MAX_WORKERS = int(os.getenv("RAG_MAX_WORKERS", "8"))
+# Shared pool for concurrent upstream calls (Pinecone queries, embeddings)
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+# Separate pool for tasks that wait on other futures, so they never starve leaf calls
+_pipeline_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+
+# Max questions in flight in rag_answer_batch (Gemini / Pinecone calls), capped at RAG_MAX_WORKERS
+BATCH_CONCURRENCY = int(os.getenv("RAG_BATCH_CONCURRENCY", "8"))
+# Max questions accepted in one rag_answer_batch call (/batch-answer rejects larger batches)
+BATCH_MAX_QUERIES = int(os.getenv("RAG_BATCH_MAX_QUERIES", "1000"))
 
 # Get the directory where this script is located
 SCRIPT_DIR = Path(__file__).parent
@@ -59,13 +123,11 @@ def get_relevant_pdfs(user_query: str, results) -> list:
     pdf_config = load_pdf_urls()
     relevant_pdfs = []
 
-    # Check if query is about schedules/training/education
-    schedule_keywords = ['일정', '스케줄', '교육', '강의', '시험', '행사', 'KRS', '입문과정', '시간표']
-    is_schedule_query = any(keyword in user_query for keyword in schedule_keywords)
-
-    # Check if query is about Hanwha commissions/policies
-    hanwha_keywords = ['한화생명', '한화', '시책', '수수료', '커미션', '익월', '13차월']
-    is_hanwha_query = any(keyword in user_query for keyword in hanwha_keywords)
+    # Check if query is about schedules/training/education or Hanwha commissions/policies
+    # (keyword classes 'schedule' / 'hanwha' in keyword_vocab.json)
+    hits = scan_keywords(user_query)
+    is_schedule_query = hits.has('schedule')
+    is_hanwha_query = hits.has('hanwha')
 
     # Check results for schedule or Hanwha data
     has_schedule_results = False
@@ -85,7 +147,7 @@ def get_relevant_pdfs(user_query: str, results) -> list:
         relevant_pdfs.append(pdf_config['schedule_pdfs'][0])  # 24년 호앤에프지사 일정표
 
         # Add KRS PDF if KRS-related
-        if 'KRS' in user_query or 'krs' in user_query.lower() or '입문' in user_query:
+        if hits.has('krs'):
             relevant_pdfs.append(pdf_config['schedule_pdfs'][1])  # KRS 시간표
 
     # Add policy PDFs if relevant
@@ -422,16 +484,31 @@ Return ONLY valid JSON, no markdown.
 
 
 def get_embedding(text: str):
-    """Generate embedding for query text."""
-    response = openai_client.embeddings.create(
-        model=EMBEDDING_MODEL,
-        input=text,
-        dimensions=EMBEDDING_DIMENSIONS
-    )
-    return response.data[0].embedding
+    """Generate embedding for query text (served from the embedding cache when possible)."""
+    return embed_text(openai_client, text, EMBEDDING_MODEL, EMBEDDING_DIMENSIONS)
 
 
-def retrieve_from_pinecone(enhanced_query: str, filters: dict = None, top_k: int = 4):
+def warm_local_index():
+    """
+    Build the local mirror snapshot in the background at startup when the local
+    backend or hybrid retrieval needs one. Request handlers only load snapshots
+    (sync=False), so they never wait on a Pinecone sync or its lock.
+    """
+    if VECTOR_BACKEND != "local" and not HYBRID_RETRIEVAL:
+        return
+
+    def _warm():
+        try:
+            local_index = get_local_index(NAMESPACE, index_factory=lambda: pc.Index(INDEX_NAME))
+            if local_index is not None:
+                print(f"📦 로컬 인덱스 준비 완료: {NAMESPACE} ({local_index.size}개 벡터)")
+        except Exception as e:
+            print(f"⚠️ 로컬 인덱스 준비 실패: {e}")
+
+    threading.Thread(target=_warm, daemon=True).start()
+
+
+def retrieve_from_pinecone(enhanced_query: str, filters: dict = None, top_k: int = 4, query_embedding: list = None):
     """
     Step 2: Query Pinecone with enhanced query and filters.
 
@@ -439,141 +516,359 @@ def retrieve_from_pinecone(enhanced_query: str, filters: dict = None, top_k: int
         enhanced_query: Optimized search query
         filters: Pinecone metadata filters
         top_k: Number of results to retrieve
+        query_embedding: Precomputed embedding of enhanced_query (optional)
     """
-    index = pc.Index(INDEX_NAME)
-
     # Generate embedding
-    query_embedding = get_embedding(enhanced_query)
-
-    # Query Pinecone
-    results = index.query(
-        vector=query_embedding,
-        top_k=top_k,
-        namespace=NAMESPACE,
-        include_metadata=True,
-        filter=filters
-    )
+    if query_embedding is None:
+        query_embedding = get_embedding(enhanced_query)
+
+    local_index = None
+    if VECTOR_BACKEND == "local" or HYBRID_RETRIEVAL:
+        try:
+            local_index = get_local_index(NAMESPACE, index_factory=lambda: pc.Index(INDEX_NAME), sync=False)
+        except Exception as e:
+            print(f"   ⚠️ 로컬 인덱스 로드 실패: {e}")
+        if local_index is not None and not local_index.size:
+            local_index = None
+
+    results = None
+
+    # Local mirror first (RAG_VECTOR_BACKEND=local), Pinecone on any failure
+    if VECTOR_BACKEND == "local" and local_index is not None:
+        try:
+            results = local_index.query(query_embedding, top_k=top_k, filter=filters)
+        except Exception as e:
+            print(f"   ⚠️ 로컬 인덱스 검색 실패: {e} - Pinecone으로 대체")
+
+    if results is None and FEDERATED_RETRIEVAL:
+        retriever = get_federated_retriever(
+            pc, lambda text, dims: embed_text(openai_client, text, EMBEDDING_MODEL, dims)
+        )
+        # None when every target timed out or failed: fall through to the direct query
+        results = retriever.search(enhanced_query, query_embedding, top_k=top_k, filters=filters)
+
+    if results is None:
+        index = pc.Index(INDEX_NAME)
+
+        # Query Pinecone
+        results = index.query(
+            vector=query_embedding,
+            top_k=top_k,
+            namespace=NAMESPACE,
+            include_metadata=True,
+            filter=filters
+        )
+
+    if HYBRID_RETRIEVAL and local_index is not None:
+        results = fuse_lexical_results(results, enhanced_query, filters, top_k, query_embedding, local_index)
 
     return results
 
 
-def format_context_for_gemini(results) -> str:
+def fuse_lexical_results(vector_results, query: str, filters: dict, top_k: int, query_embedding: list,
+                         local_index):
+    """
+    Hybrid retrieval: BM25 over n-grams of searchable_text / product_name_clean /
+    title, fused with the vector results by reciprocal rank fusion.
+
+    Lexical-only matches get their exact cosine similarity from the local mirror
+    as score, so RELEVANCE_THRESHOLD keeps its meaning.
+    """
+    try:
+        lexical = get_lexical_index(local_index).search(query, top_k=top_k, filter=filters)
+    except Exception as e:
+        print(f"   ⚠️ 키워드 검색 실패: {e} - 벡터 검색 결과만 사용")
+        return vector_results
+
+    if not lexical.matches:
+        return vector_results
+
+    vector_ids = {m.id for m in vector_results.matches}
+    lexical_only = [m.id for m in lexical.matches if m.id not in vector_ids]
+    cosine = local_index.similarity(query_embedding, lexical_only) if lexical_only else {}
+
+    fused = reciprocal_rank_fusion(
+        [vector_results, lexical], top_k, k=RRF_K,
+        score_of=lambda m: cosine.get(m.id, 0.0)
+    )
+    print(f"   🔤 하이브리드 검색: 키워드 {len(lexical.matches)}개 (신규 {len(lexical_only)}개) RRF 결합")
+    return fused
+
+
+def retrieve_with_fallback(enhanced_query: str, filters: dict = None, top_k: int = 4, mode: str = None,
+                           query_embedding: list = None):
+    """
+    Retrieve with the LLM's filters, falling back to pure semantic search.
+
+    In the speculative modes the filtered and unfiltered queries are issued
+    concurrently with one shared embedding, so a zero-result filter no longer
+    costs an extra Pinecone round trip.
+
+    Args:
+        enhanced_query: Optimized search query
+        filters: Pinecone metadata filters (None = unfiltered only)
+        top_k: Number of results to retrieve
+        mode: sequential | speculative | speculative_merge (default: RETRIEVAL_MODE)
+        query_embedding: Precomputed embedding of enhanced_query (optional)
+
+    Returns:
+        Pinecone-style results object with a `matches` list
+    """
+    mode = mode or RETRIEVAL_MODE
+    if query_embedding is None:
+        query_embedding = get_embedding(enhanced_query)
+
+    if not filters:
+        return retrieve_from_pinecone(enhanced_query, None, top_k=top_k, query_embedding=query_embedding)
+
+    if mode == "sequential":
+        results = retrieve_from_pinecone(enhanced_query, filters, top_k=top_k, query_embedding=query_embedding)
+        if len(results.matches) == 0:
+            print(f"   ⚠️ 필터 적용 결과 0개 - 필터 없이 재검색 중...")
+            results = retrieve_from_pinecone(enhanced_query, None, top_k=top_k, query_embedding=query_embedding)
+            print(f"   ✅ 재검색 완료: {len(results.matches)}개 문서 검색 완료 (순수 시맨틱 검색)")
+        return results
+
+    filtered_future = _executor.submit(retrieve_from_pinecone, enhanced_query, filters, top_k, query_embedding)
+    unfiltered_future = _executor.submit(retrieve_from_pinecone, enhanced_query, None, top_k, query_embedding)
+    filtered = filtered_future.result()
+    unfiltered = unfiltered_future.result()
+
+    print(f"   ⚡ 동시 검색: 필터 {len(filtered.matches)}개 / 필터 없음 {len(unfiltered.matches)}개")
+
+    if mode == "speculative_merge":
+        return merge_by_score([filtered, unfiltered], top_k)
+
+    if len(filtered.matches) == 0:
+        print(f"   ⚠️ 필터 적용 결과 0개 - 순수 시맨틱 검색 결과 사용")
+        return unfiltered
+    return filtered
+
+
+def _bigrams(text: str) -> set:
+    compact = "".join(text.lower().split())
+    return {compact[i:i + 2] for i in range(len(compact) - 1)} or {compact}
+
+
+def rewrite_similarity(original: str, rewritten: str) -> float:
+    """Character bigram Jaccard similarity between the raw utterance and its rewrite."""
+    a, b = _bigrams(original), _bigrams(rewritten)
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+
+def rewrite_query(user_query: str, metadata_key: dict) -> dict:
+    """
+    Step 1: Gemini Flash rewrite, with its filters repaired by the schema linter.
+
+    Observed metadata from the local mirror refines the catalog when it is in use.
+    """
+    gemini_flash_output = enhance_query_with_gemini_flash(user_query, metadata_key)
+
+    local_index = None
+    if VECTOR_BACKEND == "local":
+        try:
+            local_index = get_local_index(NAMESPACE, index_factory=lambda: pc.Index(INDEX_NAME), sync=False)
+        except Exception as e:
+            print(f"   ⚠️ 로컬 인덱스 로드 실패: {e} - 정적 카탈로그로 필터 검사")
+
+    gemini_flash_output['filters'] = lint_filters(gemini_flash_output.get('filters'), metadata_key, local_index)
+    return gemini_flash_output
+
+
+def enhance_and_retrieve(user_query: str, metadata_key: dict, top_k: int = 10, mode: str = None):
+    """
+    Steps 1-2: rewrite the query and retrieve matching documents.
+
+    In overlapped mode the raw utterance is embedded and searched (unfiltered)
+    while Gemini Flash is still rewriting it. Once the rewrite arrives:
+    - a rewrite close to the original reuses the raw embedding; without filters
+      the speculative results are used as-is, with filters only the filtered
+      query is added (the speculative results serve as the fallback)
+    - a rewrite that differs a lot is re-embedded, unless it has no filters and
+      the speculative results already clear SPECULATIVE_ACCEPT_SCORE
+
+    Args:
+        user_query: User's question
+        metadata_key: Metadata catalog for the rewrite prompt
+        top_k: Number of results to retrieve
+        mode: sequential | overlapped (default: QUERY_PIPELINE_MODE)
+
+    Returns:
+        (gemini_flash_output, results)
+    """
+    mode = mode or QUERY_PIPELINE_MODE
+
+    if mode != "overlapped":
+        gemini_flash_output = rewrite_query(user_query, metadata_key)
+        results = retrieve_with_fallback(
+            gemini_flash_output['enhanced_query'],
+            gemini_flash_output['filters'],
+            top_k=top_k
+        )
+        return gemini_flash_output, results
+
+    rewrite_future = _executor.submit(rewrite_query, user_query, metadata_key)
+    raw_embedding_future = _executor.submit(get_embedding, user_query)
+    speculative_future = _pipeline_executor.submit(
+        lambda: retrieve_from_pinecone(user_query, None, top_k, raw_embedding_future.result())
+    )
+
+    gemini_flash_output = rewrite_future.result()
+    enhanced_query = gemini_flash_output['enhanced_query']
+    filters = gemini_flash_output['filters']
+    similarity = rewrite_similarity(user_query, enhanced_query)
+    print(f"   ⚡ 파이프라인 중첩 모드: 원문/최적화 쿼리 유사도 {similarity:.2f}")
+
+    if similarity >= REWRITE_SIMILARITY_THRESHOLD:
+        if not filters:
+            print("   ⚡ 원문 임베딩 재사용 - 선행 검색 결과 사용")
+            return gemini_flash_output, speculative_future.result()
+
+        print("   ⚡ 원문 임베딩 재사용 - 필터 검색만 추가 실행")
+        filtered = retrieve_from_pinecone(enhanced_query, filters, top_k, raw_embedding_future.result())
+        if RETRIEVAL_MODE == "speculative_merge":
+            return gemini_flash_output, merge_by_score([filtered, speculative_future.result()], top_k)
+        if len(filtered.matches) == 0:
+            print("   ⚠️ 필터 적용 결과 0개 - 선행 시맨틱 검색 결과 사용")
+            return gemini_flash_output, speculative_future.result()
+        return gemini_flash_output, filtered
+
+    if not filters:
+        speculative = speculative_future.result()
+        best = max((m.score for m in speculative.matches), default=0.0)
+        if best >= SPECULATIVE_ACCEPT_SCORE:
+            print(f"   ⚡ 선행 검색 결과 채택 (최고 점수 {best:.3f})")
+            return gemini_flash_output, speculative
+
+    print("   🔁 최적화 쿼리가 원문과 많이 달라 재임베딩")
+    results = retrieve_with_fallback(enhanced_query, filters, top_k=top_k)
+    return gemini_flash_output, results
+
+
+def format_context_for_gemini(results, token_budget: int = None) -> str:
     """
     Format Pinecone results into context for Gemini 2.5 Pro.
     Handles both general and Hanwha-specific metadata.
+
+    Redundant granularities of the same table rows are dropped and the rest is
+    packed under the context token budget (see context_packer).
     """
     if not results.matches:
         return "검색 결과가 없습니다."
 
-    context_parts = []
+    context_parts = pack_context(results.matches, format_match_context, token_budget)
+
+    return "\n".join(context_parts)
+
 
-    for idx, match in enumerate(results.matches, 1):
-        meta = match.metadata
-        chunk_type = meta.get('chunk_type', 'N/A')
+def format_match_context(idx: int, match) -> str:
+    """Format one match as a numbered context block."""
+    meta = match.metadata
+    chunk_type = meta.get('chunk_type', 'N/A')
 
-        # Check if this is Hanwha commission data
-        is_hanwha = chunk_type in ['table_cell_commission', 'table_row_summary', 'table_column_summary']
+    # Check if this is Hanwha commission data
+    is_hanwha = chunk_type in ['table_cell_commission', 'table_row_summary', 'table_column_summary']
 
-        # Check if this is schedule data
-        is_schedule = chunk_type in ['event_individual', 'day_summary', 'event_range']
+    # Check if this is schedule data
+    is_schedule = chunk_type in ['event_individual', 'day_summary', 'event_range']
 
-        if is_schedule:
-            # Format schedule-specific data
-            context = f"""
+    if is_schedule:
+        # Format schedule-specific data
+        context = f"""
 ## 문서 {idx} (관련도: {match.score:.3f})
 
 **출처:** {meta.get('source_file', 'Schedule')}
 **유형:** {chunk_type}
 """
-            # Event details
-            if meta.get('title'):
-                context += f"**제목:** {meta.get('title')}\n"
-
-            # Date information
-            if chunk_type == 'event_individual' or chunk_type == 'day_summary':
-                date = meta.get('date', '')
-                weekday = meta.get('weekday', '')
-                if date:
-                    context += f"**날짜:** {date}"
-                    if weekday:
-                        context += f" ({weekday})"
-                    context += "\n"
-            elif chunk_type == 'event_range':
-                date_start = meta.get('date_start', '')
-                date_end = meta.get('date_end', '')
-                duration = meta.get('duration_days', 0)
-                if date_start and date_end:
-                    context += f"**기간:** {date_start} ~ {date_end}"
-                    if duration:
-                        context += f" ({duration}일간)"
-                    context += "\n"
-                if meta.get('business_days'):
-                    context += f"**영업일:** {meta.get('business_days')}일\n"
-
-            # Time, Location, Presenter
-            if meta.get('time'):
-                context += f"**시간:** {meta.get('time')}\n"
-            if meta.get('location'):
-                context += f"**장소:** {meta.get('location')}\n"
-            if meta.get('presenter'):
-                context += f"**강사:** {meta.get('presenter')}\n"
-            if meta.get('category'):
-                context += f"**카테고리:** {meta.get('category')}\n"
-
-            # Companies/Regions
-            if meta.get('companies'):
-                context += f"**보험사:** {', '.join(meta.get('companies', []))}\n"
-            if meta.get('regions'):
-                context += f"**지역:** {', '.join(meta.get('regions', []))}\n"
-
-            # Event count for day summaries
-            if chunk_type == 'day_summary' and meta.get('event_count'):
-                context += f"**행사 수:** {meta.get('event_count')}개\n"
-                if meta.get('event_titles'):
-                    context += f"**행사 목록:** {', '.join(meta.get('event_titles', []))}\n"
-
-            # Full content
-            searchable = meta.get('searchable_text', meta.get('natural_description', ''))
-            if searchable:
-                context += f"\n**상세 내용:**\n{searchable}\n"
-
-        elif is_hanwha:
-            # Format Hanwha-specific data
-            context = f"""
+        # Event details
+        if meta.get('title'):
+            context += f"**제목:** {meta.get('title')}\n"
+
+        # Date information
+        if chunk_type == 'event_individual' or chunk_type == 'day_summary':
+            date = meta.get('date', '')
+            weekday = meta.get('weekday', '')
+            if date:
+                context += f"**날짜:** {date}"
+                if weekday:
+                    context += f" ({weekday})"
+                context += "\n"
+        elif chunk_type == 'event_range':
+            date_start = meta.get('date_start', '')
+            date_end = meta.get('date_end', '')
+            duration = meta.get('duration_days', 0)
+            if date_start and date_end:
+                context += f"**기간:** {date_start} ~ {date_end}"
+                if duration:
+                    context += f" ({duration}일간)"
+                context += "\n"
+            if meta.get('business_days'):
+                context += f"**영업일:** {meta.get('business_days')}일\n"
+
+        # Time, Location, Presenter
+        if meta.get('time'):
+            context += f"**시간:** {meta.get('time')}\n"
+        if meta.get('location'):
+            context += f"**장소:** {meta.get('location')}\n"
+        if meta.get('presenter'):
+            context += f"**강사:** {meta.get('presenter')}\n"
+        if meta.get('category'):
+            context += f"**카테고리:** {meta.get('category')}\n"
+
+        # Companies/Regions
+        if meta.get('companies'):
+            context += f"**보험사:** {', '.join(meta.get('companies', []))}\n"
+        if meta.get('regions'):
+            context += f"**지역:** {', '.join(meta.get('regions', []))}\n"
+
+        # Event count for day summaries
+        if chunk_type == 'day_summary' and meta.get('event_count'):
+            context += f"**행사 수:** {meta.get('event_count')}개\n"
+            if meta.get('event_titles'):
+                context += f"**행사 목록:** {', '.join(meta.get('event_titles', []))}\n"
+
+        # Full content
+        searchable = meta.get('searchable_text', meta.get('natural_description', ''))
+        if searchable:
+            context += f"\n**상세 내용:**\n{searchable}\n"
+
+    elif is_hanwha:
+        # Format Hanwha-specific data
+        context = f"""
 ## 문서 {idx} (관련도: {match.score:.3f})
 
 **출처:** 한화생명 11월 시책공지
 **유형:** {chunk_type}
 """
-            if chunk_type == 'table_cell_commission':
-                context += f"**상품명:** {meta.get('product_name', 'N/A')}\n"
-                if meta.get('payment_term'):
-                    context += f"**납기:** {meta.get('payment_term')}\n"
-                context += f"**시책 유형:** {meta.get('commission_label', 'N/A')}\n"
-                context += f"**수수료율:** {meta.get('commission_value', 'N/A')}\n"
-                context += f"**카테고리:** {meta.get('commission_category', 'N/A')}\n"
-                context += f"**기간:** {meta.get('commission_period', 'N/A')}\n"
-
-            elif chunk_type == 'table_row_summary':
-                context += f"**상품명:** {meta.get('product_name', 'N/A')}\n"
-                if meta.get('payment_term'):
-                    context += f"**납기:** {meta.get('payment_term')}\n"
-                rates = meta.get('all_commission_values', [])
-                if rates:
-                    context += f"**전체 수수료율:** {', '.join(str(r) for r in rates)}\n"
-
-            elif chunk_type == 'table_column_summary':
-                context += f"**시책 유형:** {meta.get('column_header', 'N/A')}\n"
-                context += f"**상품 개수:** {meta.get('product_count', 0)}개\n"
-
-            # Add searchable text
-            searchable = meta.get('searchable_text', meta.get('natural_description', ''))
-            if searchable:
-                context += f"\n**상세 내용:**\n{searchable}\n"
-
-        else:
-            # Format general data (original format)
-            context = f"""
+        if chunk_type == 'table_cell_commission':
+            context += f"**상품명:** {meta.get('product_name', 'N/A')}\n"
+            if meta.get('payment_term'):
+                context += f"**납기:** {meta.get('payment_term')}\n"
+            context += f"**시책 유형:** {meta.get('commission_label', 'N/A')}\n"
+            context += f"**수수료율:** {meta.get('commission_value', 'N/A')}\n"
+            context += f"**카테고리:** {meta.get('commission_category', 'N/A')}\n"
+            context += f"**기간:** {meta.get('commission_period', 'N/A')}\n"
+
+        elif chunk_type == 'table_row_summary':
+            context += f"**상품명:** {meta.get('product_name', 'N/A')}\n"
+            if meta.get('payment_term'):
+                context += f"**납기:** {meta.get('payment_term')}\n"
+            rates = meta.get('all_commission_values', [])
+            if rates:
+                context += f"**전체 수수료율:** {', '.join(str(r) for r in rates)}\n"
+
+        elif chunk_type == 'table_column_summary':
+            context += f"**시책 유형:** {meta.get('column_header', 'N/A')}\n"
+            context += f"**상품 개수:** {meta.get('product_count', 0)}개\n"
+
+        # Add searchable text
+        searchable = meta.get('searchable_text', meta.get('natural_description', ''))
+        if searchable:
+            context += f"\n**상세 내용:**\n{searchable}\n"
+
+    else:
+        # Format general data (original format)
+        context = f"""
 ## 문서 {idx} (관련도: {match.score:.3f})
 
 **제목:** {meta.get('title', 'N/A')}
@@ -582,68 +877,66 @@ def format_context_for_gemini(results) -> str:
 **카테고리:** {meta.get('primary_category', meta.get('category', 'N/A'))} → {meta.get('sub_category', 'N/A')}
 """
 
-            # Add relevant metadata for general documents
-            if meta.get('insurance_company'):
-                context += f"**보험사:** {meta.get('insurance_company')}\n"
-            if meta.get('company'):
-                context += f"**회사:** {meta.get('company')}\n"
-            if meta.get('provider'):
-                context += f"**제공:** {meta.get('provider')}\n"
-            if meta.get('date'):
-                context += f"**날짜:** {meta.get('date')}\n"
-            if meta.get('date_start') and meta.get('date_end'):
-                context += f"**기간:** {meta.get('date_start')} ~ {meta.get('date_end')}\n"
-            if meta.get('payout_amount'):
-                context += f"**지원금:** {meta.get('payout_amount'):,.0f}원\n"
-            if meta.get('financial_tier'):
-                context += f"**금액구간:** {meta.get('financial_tier')}\n"
-            if meta.get('people'):
-                context += f"**관련인물:** {', '.join(meta.get('people', []))}\n"
-            if meta.get('locations'):
-                context += f"**장소:** {', '.join(meta.get('locations', []))}\n"
-            if meta.get('products'):
-                context += f"**상품:** {', '.join(meta.get('products', [])[:5])}\n"
-
-            # Extract URLs/links (universal for all document types)
-            url = meta.get('url') or meta.get('app_link') or meta.get('link') or meta.get('resource_url')
-            if url:
-                context += f"**링크:** {url}\n"
-
-            # For insurance_procedures type, extract structured info
-            if meta.get('category') == 'insurance_procedures' or meta.get('type') == 'guarantee_insurance_consent':
-                if meta.get('procedure_steps'):
-                    context += f"**절차:** {meta.get('procedure_steps')}\n"
-                if meta.get('required_info'):
-                    context += f"**필요정보:** {meta.get('required_info')}\n"
-                if meta.get('important_note'):
-                    context += f"**중요:** {meta.get('important_note')}\n"
-                if meta.get('warning'):
-                    context += f"**주의사항:** {meta.get('warning')}\n"
-                if meta.get('purpose_detail'):
-                    context += f"**목적:** {meta.get('purpose_detail')}\n"
-
-            # For resource_links type, add description
-            if meta.get('category') == 'resource_links':
-                if meta.get('doc_type'):
-                    context += f"**자료 유형:** {meta.get('doc_type')}\n"
-                if meta.get('keywords'):
-                    context += f"**키워드:** {meta.get('keywords')}\n"
-
-            # For zoom meetings, add meeting details
-            if meta.get('category') == 'zoom_meeting':
-                if meta.get('meeting_id'):
-                    context += f"**Meeting ID:** {meta.get('meeting_id')}\n"
-                if meta.get('passcode'):
-                    context += f"**Passcode:** {meta.get('passcode')}\n"
-
-            # Full text content - try multiple field names
-            text_content = meta.get('full_text') or meta.get('text') or meta.get('text_preview') or meta.get('searchable_text') or 'N/A'
-            if text_content and text_content != 'N/A':
-                context += f"\n**전체 내용:**\n{text_content}\n"
-
-        context_parts.append(context)
-
-    return "\n".join(context_parts)
+        # Add relevant metadata for general documents
+        if meta.get('insurance_company'):
+            context += f"**보험사:** {meta.get('insurance_company')}\n"
+        if meta.get('company'):
+            context += f"**회사:** {meta.get('company')}\n"
+        if meta.get('provider'):
+            context += f"**제공:** {meta.get('provider')}\n"
+        if meta.get('date'):
+            context += f"**날짜:** {meta.get('date')}\n"
+        if meta.get('date_start') and meta.get('date_end'):
+            context += f"**기간:** {meta.get('date_start')} ~ {meta.get('date_end')}\n"
+        if meta.get('payout_amount'):
+            context += f"**지원금:** {meta.get('payout_amount'):,.0f}원\n"
+        if meta.get('financial_tier'):
+            context += f"**금액구간:** {meta.get('financial_tier')}\n"
+        if meta.get('people'):
+            context += f"**관련인물:** {', '.join(meta.get('people', []))}\n"
+        if meta.get('locations'):
+            context += f"**장소:** {', '.join(meta.get('locations', []))}\n"
+        if meta.get('products'):
+            context += f"**상품:** {', '.join(meta.get('products', [])[:5])}\n"
+
+        # Extract URLs/links (universal for all document types)
+        url = meta.get('url') or meta.get('app_link') or meta.get('link') or meta.get('resource_url')
+        if url:
+            context += f"**링크:** {url}\n"
+
+        # For insurance_procedures type, extract structured info
+        if meta.get('category') == 'insurance_procedures' or meta.get('type') == 'guarantee_insurance_consent':
+            if meta.get('procedure_steps'):
+                context += f"**절차:** {meta.get('procedure_steps')}\n"
+            if meta.get('required_info'):
+                context += f"**필요정보:** {meta.get('required_info')}\n"
+            if meta.get('important_note'):
+                context += f"**중요:** {meta.get('important_note')}\n"
+            if meta.get('warning'):
+                context += f"**주의사항:** {meta.get('warning')}\n"
+            if meta.get('purpose_detail'):
+                context += f"**목적:** {meta.get('purpose_detail')}\n"
+
+        # For resource_links type, add description
+        if meta.get('category') == 'resource_links':
+            if meta.get('doc_type'):
+                context += f"**자료 유형:** {meta.get('doc_type')}\n"
+            if meta.get('keywords'):
+                context += f"**키워드:** {meta.get('keywords')}\n"
+
+        # For zoom meetings, add meeting details
+        if meta.get('category') == 'zoom_meeting':
+            if meta.get('meeting_id'):
+                context += f"**Meeting ID:** {meta.get('meeting_id')}\n"
+            if meta.get('passcode'):
+                context += f"**Passcode:** {meta.get('passcode')}\n"
+
+        # Full text content - try multiple field names
+        text_content = meta.get('full_text') or meta.get('text') or meta.get('text_preview') or meta.get('searchable_text') or 'N/A'
+        if text_content and text_content != 'N/A':
+            context += f"\n**전체 내용:**\n{text_content}\n"
+
+    return context
 
 
 def detect_question_type(user_query: str) -> str:
@@ -656,24 +949,19 @@ def detect_question_type(user_query: str) -> str:
         'explanation': User wants explanation or understanding
         'single': User explicitly wants one item only
     """
-    query_lower = user_query.lower()
-
-    # Keywords indicating "show me everything"
-    list_all_keywords = ['모두', '전부', '다', '전체', '모든', '몇', '뭐', '무엇', '어떤', '어떻게']
-
-    # Keywords indicating "just one" or "specific item"
-    single_keywords = ['하나만', '첫번째', '첫 번째', '가장', '제일', '최고', '주요한', '중요한']
-
-    # Question types that expect lists
-    list_context_words = ['행사', '교육', '일정', '프로모션', '시책', '워크샵', '세미나', '강의', '미팅']
+    # Keyword classes (keyword_vocab.json):
+    #   list_all     - "show me everything"
+    #   single       - "just one" or "specific item"
+    #   list_context - question types that expect lists
+    hits = scan_keywords(user_query)
 
     # Check for explicit "single item" request
-    if any(kw in query_lower for kw in single_keywords):
+    if hits.has('single'):
         return 'single'
 
     # Check for list-all request with context words
-    has_list_keyword = any(kw in query_lower for kw in list_all_keywords)
-    has_list_context = any(kw in query_lower for kw in list_context_words)
+    has_list_keyword = hits.has('list_all')
+    has_list_context = hits.has('list_context')
 
     if has_list_context and has_list_keyword:
         return 'list_all'
@@ -830,79 +1118,25 @@ def generate_answer_with_gemini_pro(user_query: str, context: str) -> str:
     return response.text
 
 
-def rag_answer(user_query: str, top_k: int = 10) -> str:
-    """
-    Complete RAG pipeline - returns just the answer string for API use.
-
-    Args:
-        user_query: User's question
-        top_k: Number of documents to retrieve (default: 10)
-
-    Returns:
-        str: Final answer from Gemini 2.5 Pro
-    """
-    try:
-        print(f"\n🔍 RAG Query: {user_query}")
-
-        # Step 1: Load metadata and enhance query
-        print("🔄 Step 1: Gemini Flash로 쿼리 최적화 중...")
-        metadata_key = load_metadata_key()
-        gemini_flash_output = enhance_query_with_gemini_flash(user_query, metadata_key)
-
-        print(f"   ✅ 최적화된 쿼리: {gemini_flash_output['enhanced_query']}")
-        if gemini_flash_output['filters']:
-            print(f"   🎯 필터: {json.dumps(gemini_flash_output['filters'], ensure_ascii=False)}")
-
-        # Step 2: Retrieve from Pinecone (retrieve top 10 for AI to choose from)
-        print(f"🔍 Step 2: Pinecone에서 관련 정보 검색 중 (namespace: {NAMESPACE}, top {top_k})...")
-        results = retrieve_from_pinecone(
-            gemini_flash_output['enhanced_query'],
-            gemini_flash_output['filters'],
-            top_k=top_k
-        )
-
-        print(f"   ✅ {len(results.matches)}개 문서 검색 완료")
-
-        # Fallback: If no results with filters, retry without filters (pure semantic search)
-        if len(results.matches) == 0 and gemini_flash_output['filters'] is not None:
-            print(f"   ⚠️ 필터 적용 결과 0개 - 필터 없이 재검색 중...")
-            results = retrieve_from_pinecone(
-                gemini_flash_output['enhanced_query'],
-                filters=None,  # No filters, pure semantic search
-                top_k=top_k
-            )
-            print(f"   ✅ 재검색 완료: {len(results.matches)}개 문서 검색 완료 (순수 시맨틱 검색)")
-
-        # Check relevance scores - if all results have low scores, ask for more specific query
-        RELEVANCE_THRESHOLD = 0.3  # Threshold for considering results relevant
-        if results.matches:
-            max_score = max(match.score for match in results.matches)
-            print(f"   📊 최고 관련도 점수: {max_score:.3f}")
-
-            # Check for generic greetings or inappropriate queries
-            low_quality_keywords = ['hey', 'hi', 'hello', '안녕', '하이', '욕', '씨발', '개새', '병신', 'fuck', 'shit']
-            is_low_quality = any(keyword in user_query.lower() for keyword in low_quality_keywords)
-
-            if max_score < RELEVANCE_THRESHOLD or (is_low_quality and max_score < 0.5):
-                print(f"   ⚠️ 낮은 관련도 감지 또는 부적절한 쿼리")
-                import datetime
-                from datetime import datetime as dt
+def low_relevance_reply() -> str:
+    """Canned reply for greetings, inappropriate or unanswerable questions (with the current time)."""
+    from datetime import datetime as dt
 
-                now = dt.now()
-                # Format time in Korean style
-                weekdays = ['월요일', '화요일', '수요일', '목요일', '금요일', '토요일', '일요일']
-                weekday = weekdays[now.weekday()]
+    now = dt.now()
+    # Format time in Korean style
+    weekdays = ['월요일', '화요일', '수요일', '목요일', '금요일', '토요일', '일요일']
+    weekday = weekdays[now.weekday()]
 
-                if now.hour < 12:
-                    ampm = "오전"
-                    hour_12 = now.hour if now.hour != 0 else 12
-                else:
-                    ampm = "오후"
-                    hour_12 = now.hour if now.hour <= 12 else now.hour - 12
+    if now.hour < 12:
+        ampm = "오전"
+        hour_12 = now.hour if now.hour != 0 else 12
+    else:
+        ampm = "오후"
+        hour_12 = now.hour if now.hour <= 12 else now.hour - 12
 
-                time_str = f"{now.year}년 {now.month}월 {now.day}일 ({weekday}) {ampm} {hour_12}시 {now.minute}분"
+    time_str = f"{now.year}년 {now.month}월 {now.day}일 ({weekday}) {ampm} {hour_12}시 {now.minute}분"
 
-                return f"""안녕하세요. HO&F 지사 AI입니다.
+    return f"""안녕하세요. HO&F 지사 AI입니다.
 
 현재 시각: {time_str}
 
@@ -918,6 +1152,74 @@ def rag_answer(user_query: str, top_k: int = 10) -> str:
 
 무엇을 도와드릴까요?"""
 
+
+def rag_answer(user_query: str, top_k: int = 10, rewrite: dict = None, query_embedding: list = None) -> str:
+    """
+    Complete RAG pipeline - returns just the answer string for API use.
+
+    Args:
+        user_query: User's question
+        top_k: Number of documents to retrieve (default: 10)
+        rewrite: Precomputed rewrite_query output (skips Step 1, used by rag_answer_batch)
+        query_embedding: Precomputed embedding of the rewritten query
+
+    Returns:
+        str: Final answer from Gemini 2.5 Pro
+    """
+    try:
+        print(f"\n🔍 RAG Query: {user_query}")
+
+        # Intent gate: greetings / abuse / junk never reach Gemini, OpenAI or Pinecone
+        gate = check_intent(user_query)
+        if not gate.allowed:
+            print(f"🚧 의도 게이트 차단: {gate.category} (p={gate.probability}{', 캐시' if gate.cached else ''})")
+            return low_relevance_reply()
+
+        # Step 0: structured schedule / policy-table lookup - no rewrite / vector round trip
+        schedule = lookup_schedule(user_query) if SCHEDULE_MODE != "off" else None
+        policy = None
+        if schedule is None and POLICY_TABLE_MODE != "off":
+            policy = lookup_policy_rates(user_query)
+        if schedule is not None:
+            print(f"📅 Step 0: 구조화 일정 조회 - {schedule.query.label} ({len(schedule.events)}개 일정, 벡터 검색 생략)")
+            if SCHEDULE_MODE == "render":
+                return render_schedule_answer(schedule)
+            results = schedule.as_results()
+        elif policy is not None:
+            print(f"💰 Step 0: 시책 테이블 조회 - {len(policy.rates)}개 수수료율 (벡터 검색 생략)")
+            if POLICY_TABLE_MODE == "render":
+                return render_policy_answer(policy)
+            results = policy.as_results()
+        else:
+            # Step 1 + 2: Enhance query with Gemini Flash and retrieve from Pinecone
+            # (overlapped unless RAG_QUERY_PIPELINE=sequential)
+            print(f"🔄 Step 1-2: Gemini Flash 쿼리 최적화 + Pinecone 검색 (namespace: {NAMESPACE}, top {top_k})...")
+            if rewrite is not None:
+                gemini_flash_output = rewrite
+                results = retrieve_with_fallback(rewrite['enhanced_query'], rewrite['filters'], top_k=top_k,
+                                                 query_embedding=query_embedding)
+            else:
+                metadata_key = load_metadata_key()
+                gemini_flash_output, results = enhance_and_retrieve(user_query, metadata_key, top_k=top_k)
+
+            print(f"   ✅ 최적화된 쿼리: {gemini_flash_output['enhanced_query']}")
+            if gemini_flash_output['filters']:
+                print(f"   🎯 필터: {json.dumps(gemini_flash_output['filters'], ensure_ascii=False)}")
+            print(f"   ✅ {len(results.matches)}개 문서 검색 완료")
+
+            # Check relevance scores - if all results have low scores, ask for more specific query
+            RELEVANCE_THRESHOLD = 0.3  # Threshold for considering results relevant
+            if results.matches:
+                max_score = max(match.score for match in results.matches)
+                print(f"   📊 최고 관련도 점수: {max_score:.3f}")
+
+                # Check for generic greetings or inappropriate queries
+                is_low_quality = scan_keywords(user_query).has('low_quality')
+
+                if max_score < RELEVANCE_THRESHOLD or (is_low_quality and max_score < 0.5):
+                    print(f"   ⚠️ 낮은 관련도 감지 또는 부적절한 쿼리")
+                    return low_relevance_reply()
+
         # Format context
         context = format_context_for_gemini(results)
 
@@ -944,6 +1246,114 @@ def rag_answer(user_query: str, top_k: int = 10) -> str:
         return f"죄송합니다. 답변을 생성하는 중 오류가 발생했습니다: {str(e)}"
 
 
+def _is_structured_query(user_query: str) -> bool:
+    """Whether rag_answer answers the question in Step 0 (no rewrite / embedding needed)."""
+    if SCHEDULE_MODE != "off" and lookup_schedule(user_query) is not None:
+        return True
+    return POLICY_TABLE_MODE != "off" and lookup_policy_rates(user_query) is not None
+
+
+class _EmbeddingBatcher:
+    """
+    Embeds the rewritten queries of concurrent batch workers: whatever is
+    pending when the previous call returns goes out as one list-input
+    embeddings call, so no question waits for the rest of the batch.
+    """
+
+    def __init__(self):
+        self.pending = []
+        self.closed = False
+        self.calls = 0
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def embed(self, text: str) -> list:
+        future = Future()
+        with self.condition:
+            self.pending.append((text, future))
+            self.condition.notify()
+        return future.result()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending or self.closed)
+                if not self.pending:
+                    return
+                batch, self.pending = self.pending, []
+            try:
+                vectors = embed_texts(openai_client, [text for text, _ in batch], EMBEDDING_MODEL, EMBEDDING_DIMENSIONS)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.calls += 1
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+
+def rag_answer_batch(queries: list, top_k: int = 10, concurrency: int = None):
+    """
+    Answer many questions with batched embeddings and bounded parallelism.
+
+    Each question runs its own pipeline on one of `concurrency` workers:
+    1. Step 0 check + Gemini Flash rewrite
+    2. Embedding, shared with the other workers' pending rewrites in one
+       list-input call (_EmbeddingBatcher)
+    3. Retrieval + Gemini Pro answer
+
+    Results are yielded as each question completes, so callers can stream them.
+
+    Args:
+        queries: Questions to answer
+        top_k: Number of documents to retrieve per question
+        concurrency: Max questions in flight (default: RAG_BATCH_CONCURRENCY,
+            clamped to 1..RAG_MAX_WORKERS)
+
+    Yields:
+        dict with index, query, answer (or error) and elapsed_ms
+    """
+    concurrency = max(1, min(concurrency or BATCH_CONCURRENCY, MAX_WORKERS))
+    started = time.perf_counter()
+    metadata_key = load_metadata_key()
+    batcher = _EmbeddingBatcher()
+
+    def answer(query):
+        # Gated and Step 0 questions are answered by rag_answer without a rewrite
+        if not check_intent(query).allowed or _is_structured_query(query):
+            return rag_answer(query, top_k=top_k)
+        rewrite = rewrite_query(query, metadata_key)
+        try:
+            embedding = batcher.embed(rewrite['enhanced_query'])
+        except Exception as e:
+            print(f"   ⚠️ 일괄 임베딩 실패: {e} - 질문별 임베딩으로 대체")
+            embedding = None
+        return rag_answer(query, top_k=top_k, rewrite=rewrite, query_embedding=embedding)
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = {pool.submit(answer, query): i for i, query in enumerate(queries)}
+            for future in as_completed(futures):
+                i = futures[future]
+                item = {"index": i, "query": queries[i]}
+                try:
+                    item["answer"] = future.result()
+                except Exception as e:
+                    item["error"] = str(e)
+                item["elapsed_ms"] = round((time.perf_counter() - started) * 1000)
+                yield item
+    finally:
+        batcher.close()
+        print(f"📦 일괄 처리: {len(queries)}개 질문, 임베딩 호출 {batcher.calls}회, 동시 처리 {concurrency}")
+
+
 # For backward compatibility with existing code
 def getTextFromGPT_RAG(prompt: str) -> str:
     """
@@ -0,0 +1,80 @@
+"""
+Lightweight result containers for retrieval backends.
+
+Mirrors the shape of Pinecone's QueryResponse (`results.matches`, with
+`match.id`, `match.score`, `match.metadata`) so merged or locally produced
+results can flow through format_context_for_gemini and get_relevant_pdfs
+unchanged.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+
+@dataclass
+class Match:
+    id: str
+    score: float
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class QueryResults:
+    matches: List[Any] = field(default_factory=list)
+
+
+def merge_by_score(result_sets, top_k: int) -> QueryResults:
+    """
+    Merge several result sets by score, keeping the best score per vector ID.
+
+    Args:
+        result_sets: Iterable of objects with a `matches` list
+        top_k: Number of merged matches to keep
+
+    Returns:
+        QueryResults sorted by descending score
+    """
+    best = {}
+    for results in result_sets:
+        if results is None:
+            continue
+        for match in results.matches:
+            current = best.get(match.id)
+            if current is None or match.score > current.score:
+                best[match.id] = match
+
+    merged = sorted(best.values(), key=lambda m: m.score, reverse=True)
+    return QueryResults(matches=merged[:top_k])
+
+
+def reciprocal_rank_fusion(result_sets, top_k: int, k: int = 60, score_of=None) -> QueryResults:
+    """
+    Fuse ranked result sets by reciprocal rank fusion: sum of 1 / (k + rank).
+
+    Matches are ordered by fused rank; their `score` is left as the first
+    result set's score (or `score_of(match)` for matches only found in later
+    sets), so similarity thresholds downstream keep working.
+
+    Args:
+        result_sets: Ranked objects with a `matches` list (first = primary)
+        top_k: Number of fused matches to keep
+        k: RRF damping constant
+        score_of: Optional callable giving a comparable score for secondary-only matches
+
+    Returns:
+        QueryResults in fused order
+    """
+    fused = {}
+    chosen = {}
+    for set_index, results in enumerate(result_sets):
+        if results is None:
+            continue
+        for rank, match in enumerate(results.matches, 1):
+            fused[match.id] = fused.get(match.id, 0.0) + 1.0 / (k + rank)
+            if match.id not in chosen:
+                if set_index > 0 and score_of is not None:
+                    match = Match(id=match.id, score=score_of(match), metadata=match.metadata)
+                chosen[match.id] = match
+
+    order = sorted(fused, key=lambda vector_id: fused[vector_id], reverse=True)
+    return QueryResults(matches=[chosen[vector_id] for vector_id in order[:top_k]])
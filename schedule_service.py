@@ -0,0 +1,581 @@
+"""
+Deterministic schedule lookup over the structured schedule files.
+
+MODIFIED/Schedule.txt (`by_date`) and MODIFIED/Schedule_2.txt (`events` with
+`date_range` / `week_window`) are already structured, so schedule questions
+do not need a query rewrite or a vector search. This module loads the events
+with the same extraction as the uploader (schedule_extractors, so the
+category / presenter / company / location / is_* fields are identical), and
+keeps:
+- a per-date index of single-day events (sorted date ordinals, bisect)
+- a centered interval tree of multi-day events (date ranges / week windows)
+
+parse_schedule_query() turns "11월 4일 일정", "이번 주 시험",
+"11월 10일부터 14일까지 교육" into date spans plus filters; lookup_schedule()
+answers them in microseconds. The result is rendered directly
+(render_schedule_answer) or handed to the generator as retrieval results
+(ScheduleAnswer.as_results).
+"""
+
+import json
+import os
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+from retrieval_results import Match, QueryResults
+from schedule_extractors import extract_individual_events_schedule1, extract_individual_events_schedule2
+
+SCRIPT_DIR = Path(__file__).parent
+SCHEDULE_FILE = SCRIPT_DIR / "MODIFIED" / "Schedule.txt"
+SCHEDULE_2_FILE = SCRIPT_DIR / "MODIFIED" / "Schedule_2.txt"
+TIMEZONE = "Asia/Seoul"
+
+WEEKDAYS = ["월요일", "화요일", "수요일", "목요일", "금요일", "토요일", "일요일"]
+
+# Words that make a question a schedule question
+SCHEDULE_WORDS = ("일정", "스케줄", "스케쥴", "행사", "언제", "몇시", "몇 시", "어디서", "시간표")
+
+def _is_lecture(event: dict) -> bool:
+    """Training sessions: flagged, categorised or titled as such, or given by a presenter."""
+    text = event.get("title", "") + " " + event.get("category", "")
+    return bool(event.get("is_training") or event.get("presenter")) or any(w in text for w in ("교육", "강의", "과정"))
+
+
+# Event-type keywords -> predicate over event metadata
+EVENT_TYPES: Dict[str, Callable[[dict], bool]] = {
+    "시험": lambda e: bool(e.get("is_exam")),
+    "수료식": lambda e: bool(e.get("is_ceremony")),
+    "오리엔테이션": lambda e: bool(e.get("is_orientation")) or "오리엔테이션" in e.get("title", ""),
+    "위촉": lambda e: bool(e.get("is_appointment")) or "위촉" in e.get("title", ""),
+    "코드발급": lambda e: "코드발급" in e.get("title", ""),
+    "마감": lambda e: bool(e.get("is_deadline")),
+    "컨퍼런스": lambda e: bool(e.get("is_conference")),
+    "conference": lambda e: bool(e.get("is_conference")),
+    "zoom": lambda e: bool(e.get("is_zoom")) or "ZOOM" in e.get("category", ""),
+    "줌": lambda e: bool(e.get("is_zoom")) or "ZOOM" in e.get("category", ""),
+    "교육": lambda e: _is_lecture(e),
+    "강의": lambda e: _is_lecture(e),
+}
+
+# Query aliases -> company names used in event metadata
+COMPANY_ALIASES = {
+    "삼성화재": "삼성화재", "삼성생명": "삼성생명", "db손보": "DB손보", "db손해보험": "DB손보",
+    "db세일즈": "DB손보", "kb라이프": "KB라이프", "kblp": "KB라이프", "한화생명": "한화생명",
+    "한화": "한화생명", "교보생명": "교보생명", "교보": "교보생명", "미래에셋": "미래에셋",
+    "im라이프": "IM라이프", "아이엠라이프": "IM라이프",
+}
+
+# Share of a query word's bigrams that must occur in a title ("법인심화과정" ~ "법인컨설팅 심화과정")
+TITLE_BIGRAM_COVERAGE = 0.75
+
+# Trailing particles stripped from query tokens before title matching
+_PARTICLES = ("에서는", "에서", "으로", "부터", "까지", "은", "는", "이", "가", "을", "를", "에", "의", "도", "랑", "과", "와", "좀")
+
+
+# ----------------------------------------------------------------------
+# Interval tree
+# ----------------------------------------------------------------------
+
+class IntervalTree:
+    """Static centered interval tree over closed integer intervals."""
+
+    def __init__(self, intervals: List[Tuple[int, int, int]]):
+        """
+        Args:
+            intervals: (start, end, payload) tuples with start <= end
+        """
+        self.center = None
+        self.left = self.right = None
+        self.by_start: List[Tuple[int, int, int]] = []
+        self.by_end: List[Tuple[int, int, int]] = []
+        if not intervals:
+            return
+
+        points = sorted(p for start, end, _ in intervals for p in (start, end))
+        self.center = points[len(points) // 2]
+        left, right, here = [], [], []
+        for interval in intervals:
+            if interval[1] < self.center:
+                left.append(interval)
+            elif interval[0] > self.center:
+                right.append(interval)
+            else:
+                here.append(interval)
+
+        self.by_start = sorted(here, key=lambda i: i[0])
+        self.by_end = sorted(here, key=lambda i: i[1], reverse=True)
+        self.left = IntervalTree(left) if left else None
+        self.right = IntervalTree(right) if right else None
+
+    def overlap(self, low: int, high: int) -> List[int]:
+        """Payloads of all intervals intersecting [low, high]."""
+        found = []
+        node = self
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node is None or node.center is None:
+                continue
+            if high < node.center:
+                for start, _, payload in node.by_start:
+                    if start > high:
+                        break
+                    found.append(payload)
+                stack.append(node.left)
+            elif low > node.center:
+                for _, end, payload in node.by_end:
+                    if end < low:
+                        break
+                    found.append(payload)
+                stack.append(node.right)
+            else:
+                found.extend(payload for _, _, payload in node.by_start)
+                stack.append(node.left)
+                stack.append(node.right)
+        return found
+
+
+# ----------------------------------------------------------------------
+# Schedule index
+# ----------------------------------------------------------------------
+
+class ScheduleIndex:
+    """Per-date index + interval tree over all schedule events."""
+
+    def __init__(self, events: List[dict]):
+        self.events = events
+        single_days = []
+        ranges = []
+        for event_id, event in enumerate(events):
+            start = date.fromisoformat(event["date_start"]).toordinal()
+            end = date.fromisoformat(event["date_end"]).toordinal()
+            if start == end:
+                single_days.append((start, event_id))
+            else:
+                ranges.append((start, end, event_id))
+
+        single_days.sort()
+        self.day_ordinals = [ordinal for ordinal, _ in single_days]
+        self.day_events = [event_id for _, event_id in single_days]
+        self.ranges = IntervalTree(ranges)
+
+        self.months = sorted({e.get("month") for e in events if e.get("month")})
+        self.title_keys = [re.sub(r"\s+", "", e.get("title", "")).lower() for e in events]
+        self.presenters = sorted({
+            e["presenter"].split()[0] for e in events if e.get("presenter") and len(e["presenter"].split()[0]) >= 2
+        })
+        self.locations = sorted({e["location"].split()[0] for e in events if e.get("location")})
+        self.categories = sorted({e["category"] for e in events if e.get("category")})
+
+    @classmethod
+    def from_files(cls, schedule_file: Path = SCHEDULE_FILE, schedule_2_file: Path = SCHEDULE_2_FILE) -> "ScheduleIndex":
+        with open(schedule_file, "r", encoding="utf-8") as f:
+            schedule1 = json.load(f)
+        with open(schedule_2_file, "r", encoding="utf-8") as f:
+            schedule2 = json.load(f)
+
+        chunks = extract_individual_events_schedule1(schedule1) + extract_individual_events_schedule2(schedule2)
+        return cls([chunk["metadata"] for chunk in chunks])
+
+    def events_between(self, start: date, end: date) -> List[int]:
+        """IDs of events on or overlapping [start, end], single-day events first."""
+        low, high = start.toordinal(), end.toordinal()
+        singles = self.day_events[bisect_left(self.day_ordinals, low):bisect_right(self.day_ordinals, high)]
+        return singles + sorted(self.ranges.overlap(low, high), key=lambda i: (self.events[i]["date_start"], i))
+
+    def query(self, spans: List[Tuple[date, date]], filters: "ScheduleFilters") -> List[dict]:
+        """Events in any of the date spans that pass the filters."""
+        seen = set()
+        matched = []
+        for start, end in spans:
+            for event_id in self.events_between(start, end):
+                if event_id in seen:
+                    continue
+                seen.add(event_id)
+                if filters.matches(self.events[event_id], self.title_keys[event_id]):
+                    matched.append(self.events[event_id])
+        return matched
+
+
+@dataclass
+class ScheduleFilters:
+    event_types: List[str] = field(default_factory=list)
+    companies: List[str] = field(default_factory=list)
+    presenter: Optional[str] = None
+    location: Optional[str] = None
+    category: Optional[str] = None
+    title_terms: List[str] = field(default_factory=list)
+
+    def matches(self, event: dict, title_key: str) -> bool:
+        if self.event_types and not any(EVENT_TYPES[t](event) for t in self.event_types):
+            return False
+        if self.companies and not set(self.companies) & set(event.get("companies", [])):
+            return False
+        if self.presenter and self.presenter not in event.get("presenter", ""):
+            return False
+        if self.location and self.location not in event.get("location", ""):
+            return False
+        if self.category and event.get("category") != self.category:
+            return False
+        return all(_term_in_title(term, title_key) for term in self.title_terms)
+
+    def describe(self) -> str:
+        parts = self.event_types + self.companies
+        parts += [v for v in (self.presenter, self.location, self.category) if v]
+        parts += self.title_terms
+        return ", ".join(parts)
+
+
+@dataclass
+class ScheduleQuery:
+    spans: List[Tuple[date, date]]
+    filters: ScheduleFilters
+    label: str
+
+
+@dataclass
+class ScheduleAnswer:
+    query: ScheduleQuery
+    events: List[dict]
+
+    def as_results(self) -> QueryResults:
+        """Events as retrieval matches (score 1.0) for format_context_for_gemini."""
+        return QueryResults(matches=[
+            Match(id=f"schedule-{i}", score=1.0, metadata=event)
+            for i, event in enumerate(self.events)
+        ])
+
+
+# ----------------------------------------------------------------------
+# Query parsing
+# ----------------------------------------------------------------------
+
+_ISO = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+_MONTH_DAY = re.compile(r"(?:(\d{4})\s*년\s*)?(\d{1,2})\s*월\s*(\d{1,2})\s*일")
+_SLASH = re.compile(r"(?<![\d/])(\d{1,2})/(\d{1,2})(?![\d/])")
+_DAY = re.compile(r"(?<![\d~\-])(\d{1,2})\s*일(?!정|간|차)")
+_MONTH = re.compile(r"(?<!\d)(\d{1,2})\s*월(?!\s*\d)")
+_RANGE_CONNECTOR = re.compile(r"~|부터|까지|사이|에서\s*\d|-\s*\d")
+
+
+def _today() -> date:
+    if ZoneInfo is not None:
+        return datetime.now(ZoneInfo(TIMEZONE)).date()
+    return date.today()
+
+
+def _month_span(year: int, month: int) -> Tuple[date, date]:
+    start = date(year, month, 1)
+    next_month = date(year + (month == 12), month % 12 + 1, 1)
+    return start, next_month - timedelta(days=1)
+
+
+def _bigrams(text: str) -> set:
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def _term_in_title(term: str, title_key: str) -> bool:
+    """Substring match, or (for longer terms) most of the term's bigrams occur in the title."""
+    if term in title_key:
+        return True
+    if len(term) < 4:
+        return False
+    grams = _bigrams(term)
+    return len(grams & _bigrams(title_key)) / len(grams) >= TITLE_BIGRAM_COVERAGE
+
+
+def _strip_particles(token: str) -> str:
+    for particle in _PARTICLES:
+        if token.endswith(particle) and len(token) > len(particle) + 1:
+            return token[:-len(particle)]
+    return token
+
+
+def parse_schedule_query(text: str, schedule_index: ScheduleIndex, today: Optional[date] = None) -> Optional[ScheduleQuery]:
+    """
+    Parse a schedule question into date spans and filters.
+
+    Args:
+        text: User question
+        schedule_index: Loaded ScheduleIndex (supplies presenters, locations, titles)
+        today: Reference date for relative expressions (default: today in Asia/Seoul)
+
+    Returns:
+        ScheduleQuery, or None if the question is not a schedule lookup
+    """
+    today = today or _today()
+    lowered = text.lower()
+    remaining = lowered
+
+    # Year for "11월 4일" without a year: the schedule's year when the month is covered
+    data_months = [(int(m[:4]), int(m[5:7])) for m in schedule_index.months]
+
+    def resolve_year(month: int) -> int:
+        for year, data_month in data_months:
+            if data_month == month:
+                return year
+        return today.year
+
+    points: List[date] = []
+    spans: List[Tuple[date, date]] = []
+    labels: List[str] = []
+    current_month = None
+
+    def take(pattern, handler):
+        nonlocal remaining
+        for m in list(pattern.finditer(remaining)):
+            try:
+                handler(m)
+            except ValueError:
+                continue
+            remaining = remaining[:m.start()] + " " * (m.end() - m.start()) + remaining[m.end():]
+
+    def iso(m):
+        nonlocal current_month
+        d = date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+        points.append(d)
+        current_month = (d.year, d.month)
+
+    def month_day(m):
+        nonlocal current_month
+        month = int(m.group(2))
+        year = int(m.group(1)) if m.group(1) else resolve_year(month)
+        points.append(date(year, month, int(m.group(3))))
+        current_month = (year, month)
+
+    def slash(m):
+        nonlocal current_month
+        month = int(m.group(1))
+        year = resolve_year(month)
+        points.append(date(year, month, int(m.group(2))))
+        current_month = (year, month)
+
+    take(_ISO, iso)
+    take(_MONTH_DAY, month_day)
+    take(_SLASH, slash)
+
+    def day_only(m):
+        year, month = current_month or (
+            (resolve_year(today.month), today.month) if not schedule_index.months
+            else (int(schedule_index.months[0][:4]), int(schedule_index.months[0][5:7]))
+        )
+        points.append(date(year, month, int(m.group(1))))
+
+    take(_DAY, day_only)
+
+    if points:
+        if len(points) >= 2 and _RANGE_CONNECTOR.search(lowered):
+            start, end = min(points), max(points)
+            spans.append((start, end))
+            labels.append(f"{start.month}월 {start.day}일 ~ {end.month}월 {end.day}일")
+        else:
+            for d in sorted(set(points)):
+                spans.append((d, d))
+                labels.append(f"{d.month}월 {d.day}일 ({WEEKDAYS[d.weekday()][0]})")
+
+    # Relative days / weeks / months
+    compact = re.sub(r"\s+", "", remaining)
+    relative_days = {"그저께": -2, "어제": -1, "오늘": 0, "금일": 0, "내일": 1, "모레": 2}
+    for word, offset in relative_days.items():
+        if word in compact:
+            d = today + timedelta(days=offset)
+            spans.append((d, d))
+            labels.append(f"{word} ({d.month}월 {d.day}일)")
+
+    week_offsets = {"지난주": -1, "저번주": -1, "이번주": 0, "금주": 0, "다음주": 1, "차주": 1, "다다음주": 2}
+    week_offset = None
+    for word, offset in sorted(week_offsets.items(), key=lambda kv: -len(kv[0])):
+        if word in compact:
+            week_offset = offset
+            break
+
+    weekday = next((i for i, name in enumerate(WEEKDAYS) if name in compact or f"{name[0]}욜" in compact), None)
+    if week_offset is not None or weekday is not None:
+        monday = today - timedelta(days=today.weekday()) + timedelta(weeks=week_offset or 0)
+        if weekday is not None:
+            d = monday + timedelta(days=weekday)
+            if week_offset is None and d < today:
+                d += timedelta(weeks=1)
+            spans.append((d, d))
+            labels.append(f"{d.month}월 {d.day}일 ({WEEKDAYS[weekday]})")
+        else:
+            spans.append((monday, monday + timedelta(days=6)))
+            labels.append(f"{monday.month}월 {monday.day}일 ~ {(monday + timedelta(days=6)).month}월 "
+                          f"{(monday + timedelta(days=6)).day}일 주간")
+
+    # Days and weeks are specific dates; a whole month ("11월", "이번달") is not
+    has_date = bool(spans)
+
+    month_offsets = {"지난달": -1, "저번달": -1, "이번달": 0, "금월": 0, "다음달": 1}
+    for word, offset in month_offsets.items():
+        if word in compact:
+            month_index = today.year * 12 + today.month - 1 + offset
+            start, end = _month_span(month_index // 12, month_index % 12 + 1)
+            spans.append((start, end))
+            labels.append(f"{start.year}년 {start.month}월")
+            break
+
+    # Bare months are blanked out of the remaining text either way, so "11월"
+    # never becomes a title term
+    months = []
+
+    def bare_month(m):
+        month = int(m.group(1))
+        if not 1 <= month <= 12:
+            raise ValueError(month)
+        months.append(month)
+
+    take(_MONTH, bare_month)
+    if not spans:
+        for month in months:
+            start, end = _month_span(resolve_year(month), month)
+            spans.append((start, end))
+            labels.append(f"{start.year}년 {month}월")
+
+    # Filters
+    filters = ScheduleFilters()
+    filters.event_types = [t for t in EVENT_TYPES if t in lowered]
+    for alias, company in COMPANY_ALIASES.items():
+        if alias in compact and company not in filters.companies:
+            filters.companies.append(company)
+    filters.presenter = next((p for p in schedule_index.presenters if p in text), None)
+    filters.location = next((loc for loc in schedule_index.locations if loc.lower() in lowered), None)
+    filters.category = next(
+        (c for c in schedule_index.categories
+         if re.sub(r"\s+", "", c).lower() in compact and c != "일반 교육" and c not in EVENT_TYPES),
+        None
+    )
+
+    # Remaining content words that occur in event titles narrow the match further
+    ignored = set(EVENT_TYPES) | set(COMPANY_ALIASES) | set(relative_days) | set(week_offsets) | set(month_offsets)
+    for token in re.findall(r"[0-9a-z가-힣]+", remaining):
+        token = _strip_particles(token)
+        if len(token) < 2 or token in ignored or any(w.replace(" ", "") in token for w in SCHEDULE_WORDS):
+            continue
+        if filters.presenter and token in filters.presenter:
+            continue
+        if any(_term_in_title(token, key) for key in schedule_index.title_keys):
+            filters.title_terms.append(token)
+
+    has_schedule_word = any(w in lowered for w in SCHEDULE_WORDS)
+    has_filters = bool(filters.event_types or filters.presenter or filters.category or filters.title_terms)
+    # Event-type words alone ("zoom링크 있어?") are not schedule lookups without a date
+    if not (has_schedule_word or (filters.event_types and spans)):
+        return None
+    # A schedule word with only a month or a company ("한화생명 11월 시책 언제까지야?",
+    # "11월 시책공지 언제 나와?") is usually about something else: without a
+    # specific date, an event type, title, presenter or category must match
+    if not has_date and not has_filters:
+        return None
+    if not spans:
+        # No date: the whole period covered by the schedule files
+        for month in schedule_index.months:
+            spans.append(_month_span(int(month[:4]), int(month[5:7])))
+        labels.append("전체 기간")
+
+    return ScheduleQuery(spans=spans, filters=filters, label=", ".join(labels))
+
+
+# ----------------------------------------------------------------------
+# Serving
+# ----------------------------------------------------------------------
+
+_index: Optional[ScheduleIndex] = None
+_index_mtimes = None
+_index_lock = threading.Lock()
+
+
+def get_schedule_index() -> Optional[ScheduleIndex]:
+    """Loaded schedule index, reloaded when either schedule file changes."""
+    global _index, _index_mtimes
+    try:
+        mtimes = (os.path.getmtime(SCHEDULE_FILE), os.path.getmtime(SCHEDULE_2_FILE))
+    except OSError:
+        return _index
+
+    with _index_lock:
+        if _index is None or mtimes != _index_mtimes:
+            try:
+                _index = ScheduleIndex.from_files()
+            except Exception as e:
+                print(f"⚠️ 일정 인덱스 로드 실패: {e}")
+                return _index
+            _index_mtimes = mtimes
+            print(f"📅 일정 인덱스 로드: {len(_index.events)}개 일정")
+        return _index
+
+
+def lookup_schedule(user_query: str, today: Optional[date] = None) -> Optional[ScheduleAnswer]:
+    """
+    Answer a schedule question from the structured schedule files.
+
+    Returns:
+        ScheduleAnswer with the matching events, or None when the question is
+        not a schedule lookup or nothing matches (the RAG pipeline handles it)
+    """
+    schedule_index = get_schedule_index()
+    if schedule_index is None:
+        return None
+
+    schedule_query = parse_schedule_query(user_query, schedule_index, today)
+    if schedule_query is None:
+        return None
+
+    filters = schedule_query.filters
+    events = schedule_index.query(schedule_query.spans, filters)
+    if not events and filters.title_terms and (filters.event_types or filters.presenter or filters.category):
+        # Title words are a soft constraint next to an event type ("신입 FC 시험 일정");
+        # when they were the only match, nothing matched well and RAG answers instead
+        filters.title_terms = []
+        events = schedule_index.query(schedule_query.spans, filters)
+    if not events:
+        return None
+    return ScheduleAnswer(query=schedule_query, events=events)
+
+
+def render_schedule_answer(answer: ScheduleAnswer) -> str:
+    """Render a ScheduleAnswer as a chat reply."""
+    title = f"📅 {answer.query.label} 일정"
+    if answer.query.filters.describe():
+        title += f" ({answer.query.filters.describe()})"
+    lines = [f"{title} - 총 {len(answer.events)}건"]
+
+    current_date = None
+    ranged = []
+    for event in answer.events:
+        if event["date_start"] != event["date_end"]:
+            ranged.append(event)
+            continue
+        if event["date_start"] != current_date:
+            current_date = event["date_start"]
+            d = date.fromisoformat(current_date)
+            lines.append(f"\n[{d.month}월 {d.day}일 {WEEKDAYS[d.weekday()]}]")
+        line = f"• {event['time'] + ' ' if event.get('time') else ''}{event['title']}"
+        details = [v for v in (event.get("location"), event.get("presenter")) if v]
+        if details:
+            line += f" ({' / '.join(details)})"
+        lines.append(line)
+
+    if ranged:
+        lines.append("\n[기간 일정]")
+        for event in ranged:
+            start, end = date.fromisoformat(event["date_start"]), date.fromisoformat(event["date_end"])
+            line = f"• {start.month}/{start.day} ~ {end.month}/{end.day} {event['title']}"
+            details = [v for v in (event.get("time"), event.get("location")) if v]
+            if event.get("regions"):
+                details.append(f"지역: {', '.join(event['regions'])}")
+            if details:
+                line += f" ({' / '.join(details)})"
+            lines.append(line)
+
+    return "\n".join(lines)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""Unit tests for filter_linter.FilterLinter (run with python -m pytest tests/)."""
+
+import json
+
+import pytest
+
+from filter_linter import METADATA_KEY_PATH, FilterLinter
+
+
+@pytest.fixture(scope="module")
+def linter():
+    with open(METADATA_KEY_PATH, "r", encoding="utf-8") as f:
+        return FilterLinter(json.load(f))
+
+
+def test_nested_and_keeps_inner_clauses(linter):
+    linted, repairs = linter.lint({
+        "$and": [
+            {"$and": [{"company": "한화생명"}, {"month": "2025-11"}]},
+            {"chunk_type": "table_row_summary"},
+        ]
+    })
+    assert linted == {"$and": [{"chunk_type": "table_row_summary"}, {"company": "한화생명"}, {"month": "2025-11"}]}
+    assert not repairs
+
+
+def test_deeply_nested_and(linter):
+    linted, _ = linter.lint({"$and": [{"$and": [{"$and": [{"company": "한화생명"}]}]}]})
+    assert linted == {"company": "한화생명"}
+
+
+def test_nested_and_inside_or_branch(linter):
+    linted, _ = linter.lint({
+        "$or": [
+            {"$and": [{"$and": [{"company": "한화생명"}, {"month": "2025-11"}]}]},
+            {"month": "2025-12"},
+        ]
+    })
+    assert linted == {"$or": [{"$and": [{"company": "한화생명"}, {"month": "2025-11"}]}, {"month": "2025-12"}]}
+
+
+def test_unknown_top_level_operator_is_dropped(linter):
+    linted, repairs = linter.lint({"$and": [{"$not": {"company": "한화생명"}}, {"month": "2025-11"}]})
+    assert linted == {"month": "2025-11"}
+    assert repairs["unknown_operator"] == 1
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""Unit tests for intent_gate.classify (run with python -m pytest tests/)."""
+
+import pytest
+
+from intent_gate import classify
+
+
+@pytest.mark.parametrize("query", [
+    "출시발표",
+    "시발점",
+    "신상품 출시발표 언제야?",
+    "안녕하세요 수수료 알려줘",
+])
+def test_allowed(query):
+    assert classify(query).allowed
+
+
+@pytest.mark.parametrize("query", [
+    "시발",
+    "시발 뭐야",
+    "씨발놈아",
+    "이 병신아",
+    "개새끼야",
+    "fuck",
+])
+def test_profanity_is_abuse(query):
+    decision = classify(query)
+    assert not decision.allowed
+    assert decision.category == "abuse"
+
+
+def test_greeting_only():
+    decision = classify("안녕하세요")
+    assert not decision.allowed
+    assert decision.category == "greeting"
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Unit tests for schedule_service.parse_schedule_query (run with python -m pytest tests/)."""
+
+from datetime import date
+
+import pytest
+
+from schedule_service import ScheduleIndex, parse_schedule_query
+
+TODAY = date(2025, 11, 5)
+
+
+def _event(day, title, **fields):
+    event = {
+        "date_start": day, "date_end": fields.pop("date_end", day), "month": "2025-11",
+        "title": title, "category": "일반 교육", "companies": [],
+    }
+    event.update(fields)
+    return event
+
+
+@pytest.fixture(scope="module")
+def schedule_index():
+    return ScheduleIndex([
+        _event("2025-11-04", "신입 FC 시험", category="시험", is_exam=True),
+        _event("2025-11-06", "한화생명 상품 교육", category="제휴사 교육", companies=["한화생명"], is_training=True),
+        _event("2025-11-11", "법인컨설팅 심화과정", presenter="김하나 강사", is_training=True),
+        _event("2025-11-10", "11월 위촉 마감", date_end="2025-11-14", is_deadline=True),
+    ])
+
+
+@pytest.mark.parametrize("query", [
+    "한화생명 11월 시책 언제까지야?",
+    "11월 시책공지 언제 나와?",
+    "KB라이프 11월 수수료 지급일 언제야?",
+    "11월 한화생명 프로모션 언제까지야?",
+    "11월 일정 알려줘",
+])
+def test_month_or_company_alone_falls_through_to_rag(schedule_index, query):
+    assert parse_schedule_query(query, schedule_index, TODAY) is None
+
+
+def test_bare_month_is_not_a_title_term(schedule_index):
+    parsed = parse_schedule_query("11월 시험 일정", schedule_index, TODAY)
+    assert parsed.spans == [(date(2025, 11, 1), date(2025, 11, 30))]
+    assert parsed.filters.event_types == ["시험"]
+    assert parsed.filters.title_terms == []
+
+
+def test_month_with_title_match(schedule_index):
+    parsed = parse_schedule_query("11월 법인심화과정 언제야?", schedule_index, TODAY)
+    assert parsed.spans == [(date(2025, 11, 1), date(2025, 11, 30))]
+    assert parsed.filters.title_terms == ["법인심화과정"]
+
+
+def test_specific_day(schedule_index):
+    parsed = parse_schedule_query("11월 4일 일정", schedule_index, TODAY)
+    assert parsed.spans == [(date(2025, 11, 4), date(2025, 11, 4))]
+
+
+def test_day_range_with_event_type(schedule_index):
+    parsed = parse_schedule_query("11월 10일부터 14일까지 교육", schedule_index, TODAY)
+    assert parsed.spans == [(date(2025, 11, 10), date(2025, 11, 14))]
+    assert parsed.filters.event_types == ["교육"]
+
+
+def test_relative_day_with_company(schedule_index):
+    parsed = parse_schedule_query("내일 한화생명 일정", schedule_index, TODAY)
+    assert parsed.spans == [(date(2025, 11, 6), date(2025, 11, 6))]
+    assert parsed.filters.companies == ["한화생명"]
+
+
+def test_event_type_without_schedule_word_or_date(schedule_index):
+    assert parse_schedule_query("zoom링크 있어?", schedule_index, TODAY) is None
@@ -17,6 +17,9 @@ from pathlib import Path
 from dotenv import load_dotenv
 from pinecone import Pinecone
 from openai import OpenAI
+from embedding_cache import embed_text
+from embedding_config import EMBEDDING_MODEL, dimensions_for, ensure_index, index_name_for
+from hanwha_document_metadata import DOCUMENT_METADATA
 from datetime import datetime
 from typing import List, Dict, Any
 
@@ -27,34 +30,14 @@ pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
 openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 # Constants
-INDEX_NAME = "hof-branch-chatbot"
 NAMESPACE = "hanwha-november-2025"  # Separate namespace for this document
-EMBEDDING_MODEL = "text-embedding-3-large"
-EMBEDDING_DIMENSIONS = 3072
-
-# Document metadata
-DOCUMENT_METADATA = {
-    "document_title": "HO&F지사 11월 시책공지 - 한화생명 추가",
-    "document_date": "2025-11-06",
-    "company": "한화생명",
-    "category": "insurance_commission_table",
-    "sub_category": "promotion",
-    "month": "2025-11",
-    "is_promotion": True,
-    "is_policy": True,
-    "has_financial_data": True,
-    "content_type": "insurance_commission_table"
-}
+INDEX_NAME = index_name_for("hof-branch-chatbot", NAMESPACE)
+EMBEDDING_DIMENSIONS = dimensions_for(NAMESPACE)
 
 
 def get_embedding(text: str, model: str = EMBEDDING_MODEL) -> List[float]:
-    """Generate embeddings using OpenAI."""
-    response = openai_client.embeddings.create(
-        input=text,
-        model=model,
-        dimensions=EMBEDDING_DIMENSIONS
-    )
-    return response.data[0].embedding
+    """Generate embeddings using OpenAI (unchanged chunks are served from the embedding cache)."""
+    return embed_text(openai_client, text, model, EMBEDDING_DIMENSIONS)
 
 
 def chunk_by_content_type(page_data: Dict[str, Any], page_num: int) -> List[Dict[str, Any]]:
@@ -221,6 +204,7 @@ def process_document(json_file_path: str) -> List[Dict[str, Any]]:
 
 def upload_to_pinecone(chunks: List[Dict[str, Any]], batch_size: int = 100):
     """Upload chunks to Pinecone with embeddings."""
+    ensure_index(pc, INDEX_NAME, EMBEDDING_DIMENSIONS)
     index = pc.Index(INDEX_NAME)
 
     print(f"\nUploading {len(chunks)} chunks to Pinecone...")
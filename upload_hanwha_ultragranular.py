@@ -12,6 +12,11 @@ Extraction Strategy:
 5. All headings with expanded context
 
 Expected: 300-500+ vectors from 5 pages
+
+With --skip-commission-cells the per-product cell / row vectors of the
+commission table are not uploaded: those questions are answered from the
+parsed table (hanwha_policy_tables). Column summaries and the full table are
+kept for cross-product questions.
 """
 
 import os
@@ -22,6 +27,11 @@ from pathlib import Path
 from dotenv import load_dotenv
 from pinecone import Pinecone
 from openai import OpenAI
+from embedding_cache import embed_text
+from embedding_config import EMBEDDING_MODEL, dimensions_for, ensure_index, index_name_for
+from local_vector_index import refresh_snapshot
+from hanwha_policy_tables import is_commission_table
+from hanwha_document_metadata import DOCUMENT_METADATA
 from datetime import datetime
 from typing import List, Dict, Any
 
@@ -32,34 +42,14 @@ pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
 openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 # Constants
-INDEX_NAME = "hof-branch-chatbot"
 NAMESPACE = "hof-knowledge-base-max"  # Combined namespace
-EMBEDDING_MODEL = "text-embedding-3-large"
-EMBEDDING_DIMENSIONS = 3072
-
-# Document metadata
-DOCUMENT_METADATA = {
-    "document_title": "HO&F지사 11월 시책공지 - 한화생명 추가",
-    "document_date": "2025-11-06",
-    "company": "한화생명",
-    "category": "insurance_commission_table",
-    "sub_category": "promotion",
-    "month": "2025-11",
-    "is_promotion": True,
-    "is_policy": True,
-    "has_financial_data": True,
-    "content_type": "insurance_commission_table"
-}
+INDEX_NAME = index_name_for("hof-branch-chatbot", NAMESPACE)
+EMBEDDING_DIMENSIONS = dimensions_for(NAMESPACE)
 
 
 def get_embedding(text: str, model: str = EMBEDDING_MODEL) -> List[float]:
-    """Generate embeddings using OpenAI."""
-    response = openai_client.embeddings.create(
-        input=text,
-        model=model,
-        dimensions=EMBEDDING_DIMENSIONS
-    )
-    return response.data[0].embedding
+    """Generate embeddings using OpenAI (unchanged chunks are served from the embedding cache)."""
+    return embed_text(openai_client, text, model, EMBEDDING_DIMENSIONS)
 
 
 def extract_table_cells(table_item: Dict[str, Any], page_num: int, table_idx: int) -> List[Dict[str, Any]]:
@@ -278,8 +268,19 @@ def chunk_text_sentences(text: str, metadata: Dict[str, Any]) -> List[Dict[str,
     return chunks
 
 
-def process_document_ultragranular(json_file_path: str) -> List[Dict[str, Any]]:
-    """Process document with ultra-granular extraction."""
+# Chunk types served by the structured policy-table lookup
+TABLE_STORE_CHUNK_TYPES = {"table_cell_commission", "table_row_summary"}
+
+
+def process_document_ultragranular(json_file_path: str, skip_commission_cells: bool = False) -> List[Dict[str, Any]]:
+    """
+    Process document with ultra-granular extraction.
+
+    Args:
+        json_file_path: Parsed document JSON
+        skip_commission_cells: Leave out cell / row vectors of commission tables
+            (answered by hanwha_policy_tables instead)
+    """
     print(f"Loading document: {json_file_path}")
 
     with open(json_file_path, 'r', encoding='utf-8') as f:
@@ -317,6 +318,8 @@ def process_document_ultragranular(json_file_path: str) -> List[Dict[str, Any]]:
         for idx, item in enumerate(items):
             if item.get('type') == 'table':
                 table_chunks = extract_table_cells(item, page_num, idx)
+                if skip_commission_cells and is_commission_table(item):
+                    table_chunks = [c for c in table_chunks if c['metadata']['chunk_type'] not in TABLE_STORE_CHUNK_TYPES]
                 all_chunks.extend(table_chunks)
                 table_count += 1
                 table_chunk_count += len(table_chunks)
@@ -387,6 +390,7 @@ def delete_namespace(namespace: str):
 
 def upload_to_pinecone(chunks: List[Dict[str, Any]], batch_size: int = 100):
     """Upload chunks to Pinecone with embeddings."""
+    ensure_index(pc, INDEX_NAME, EMBEDDING_DIMENSIONS)
     index = pc.Index(INDEX_NAME)
 
     print(f"\nUploading {len(chunks)} chunks to Pinecone...")
@@ -434,8 +438,11 @@ def upload_to_pinecone(chunks: List[Dict[str, Any]], batch_size: int = 100):
 
     print(f"\n✓ Successfully uploaded {len(chunks)} ultra-granular chunks!")
 
+    # Bring the serving-side local mirror up to date
+    refresh_snapshot(index, NAMESPACE)
+
 
-def main(auto_confirm=False):
+def main(auto_confirm=False, skip_commission_cells=False):
     """Main execution."""
     # Find the Hanwha file
     script_dir = Path(__file__).parent / "MODIFIED"
@@ -450,7 +457,7 @@ def main(auto_confirm=False):
     print(f"Found document: {json_file}")
 
     # Process document with ultra-granular extraction
-    chunks = process_document_ultragranular(json_file)
+    chunks = process_document_ultragranular(json_file, skip_commission_cells=skip_commission_cells)
 
     # Print summary
     print(f"\n{'='*80}")
@@ -502,4 +509,5 @@ def main(auto_confirm=False):
 if __name__ == "__main__":
     import sys
     auto_confirm = "--yes" in sys.argv or "-y" in sys.argv
-    main(auto_confirm=auto_confirm)
+    skip_commission_cells = "--skip-commission-cells" in sys.argv
+    main(auto_confirm=auto_confirm, skip_commission_cells=skip_commission_cells)